@@ -40,7 +40,7 @@ export const AuthProvider = ({ children }) => {
   const fetchMisPostulaciones = async (workerId) => {
     if (!workerId) return;
     try {
-      const postulacionesRes = await axios.get(`${BASE_URL}/postulaciones/?id_trabajador=${workerId}`);
+      const postulacionesRes = await axios.get(`${BASE_URL}/postulaciones/tarjetas/?id_trabajador=${workerId}`);
       setMisPostulaciones(postulacionesRes.data || []);
     } catch (err) {
       console.error("Error al cargar mis postulaciones:", err.response?.data || err.message || err);
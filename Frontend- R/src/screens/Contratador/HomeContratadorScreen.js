@@ -38,7 +38,7 @@ export default function HomeContratadorScreen() {
     }
     setLoading(true);
     try {
-      const resp = await api.get(`/trabajos/?id_contratador=${profile.id_contratador}`);
+      const resp = await api.get(`/trabajos/tarjetas/?id_contratador=${profile.id_contratador}`);
       setJobs(resp.data || []);
     } catch (e) {
       console.error("Error cargando trabajos:", e);
@@ -49,9 +49,8 @@ export default function HomeContratadorScreen() {
   };
 
   const renderJob = ({ item }) => {
-    const zona = item.zona_geografica_trabajo;
-    const ubicacion = zona
-      ? `${zona.ciudad || ""}${zona.provincia ? ", " + zona.provincia : ""}`
+    const ubicacion = item.id_zona_geografica_trabajo
+      ? `${item.zona_ciudad || ""}${item.zona_provincia ? ", " + item.zona_provincia : ""}`
       : "Sin ubicación";
 
     return (
@@ -53,7 +53,7 @@ export default function MisTrabajosScreen() {
         return;
       }
       const idContratador = profile.id_contratador;
-      const respTrabajosFiltro = await api.get(`/trabajos/?id_contratador=${idContratador}`);
+      const respTrabajosFiltro = await api.get(`/trabajos/tarjetas/?id_contratador=${idContratador}`);
       setTrabajos(Array.isArray(respTrabajosFiltro.data) ? respTrabajosFiltro.data : []);
     } catch (err) {
       console.error("MisTrabajosScreen - error general:", err?.response?.data || err.message || err);
@@ -104,9 +104,9 @@ export default function MisTrabajosScreen() {
 
     setIsSubmittingRating(true);
     const id_trabajo = selectedJobToRate.id_trabajo;
-    const id_trabajador = selectedJobToRate.trabajador?.id_trabajador;
+    const id_trabajador = selectedJobToRate.id_trabajador;
     const id_contratador = profile.id_contratador;
-    const current_estado = selectedJobToRate.estado?.id_estado;
+    const current_estado = selectedJobToRate.id_estado;
 
     if (!id_trabajador) {
       Alert.alert("Error", "No se pudo identificar al trabajador de este trabajo.");
@@ -194,11 +194,11 @@ export default function MisTrabajosScreen() {
   const renderItem = ({ item }) => {
     const titulo = item.titulo ?? "Sin título";
     const descripcion = item.descripcion ?? "";
-    const profesion = item.profesion_requerida?.nombre_profesion ?? "No especificada";
-    const ciudad = item.zona_geografica_trabajo?.ciudad ?? "-";
-    const provincia = item.zona_geografica_trabajo?.provincia ?? "-";
-    const estado = item.estado?.descripcion ?? "-";
-    const idEstado = item.estado?.id_estado ?? null;
+    const profesion = item.profesion_nombre ?? "No especificada";
+    const ciudad = item.zona_ciudad ?? "-";
+    const provincia = item.zona_provincia ?? "-";
+    const estado = item.estado_descripcion ?? "-";
+    const idEstado = item.id_estado ?? null;
     const isActivo = idEstado === 3;
     const isEsperandoValoracion = idEstado === 4;
     const isFinalizado = idEstado === 5;
@@ -225,7 +225,7 @@ export default function MisTrabajosScreen() {
       mostrarMensajeFechaFinalizacion = fechaFinalizacionTrabajo.slice(8,10) + "/" + fechaFinalizacionTrabajo.slice(5,7) + "/" + fechaFinalizacionTrabajo.slice(0,4) + " - " + fechaFinalizacionTrabajo.slice(11,13) + ":" + fechaFinalizacionTrabajo.slice(14,16) + ":" + fechaFinalizacionTrabajo.slice(17,19)
     };
 
-    const concatenacion = String(item.id_trabajo) + String(item.contratador.id_contratador) + String(item.trabajador.id_trabajador);
+    const concatenacion = String(item.id_trabajo) + String(item.id_contratador) + String(item.id_trabajador ?? '');
     const id_chat = parseInt(concatenacion);
 
     // console.log("ITEM: ", item);
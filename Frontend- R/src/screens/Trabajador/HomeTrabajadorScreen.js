@@ -41,7 +41,7 @@ export default function HomeTrabajadorScreen({ navigation }) {
     const profesionIdsString = profesionIds.join(',');
     const trabajosPublOEsCo = "1,2";
     // const url = `${BASE_URL}/trabajos/?id_estado=1&profesiones=${profesionIdsString}`;
-    const url = `${BASE_URL}/trabajos/?id_estado=${trabajosPublOEsCo}&profesiones=${profesionIdsString}`;
+    const url = `${BASE_URL}/trabajos/tarjetas/?id_estado=${trabajosPublOEsCo}&profesiones=${profesionIdsString}`;
     console.log("Cargando trabajos desde:", url);
 
     try {
@@ -124,15 +124,10 @@ export default function HomeTrabajadorScreen({ navigation }) {
   };
 
   const renderJob = ({ item }) => {
-    const zona = item.zona_geografica_trabajo;
-    const profesion = item.profesion_requerida;
-
     let ubicacion = "Sin ubicación especificada";
-    if (zona && typeof zona === 'object') {
-       const partes = [zona.ciudad, zona.provincia].filter(Boolean);
-       if (partes.length > 0) {
-           ubicacion = partes.join(", ");
-       }
+    const partes = [item.zona_ciudad, item.zona_provincia].filter(Boolean);
+    if (partes.length > 0) {
+        ubicacion = partes.join(", ");
     }
 
     const isJobAlreadyApplied = Array.isArray(misPostulaciones) && misPostulaciones.some(p => p.trabajo?.id_trabajo === item.id_trabajo);
@@ -146,7 +141,7 @@ export default function HomeTrabajadorScreen({ navigation }) {
         // disabled={isJobAlreadyApplied}
       >
         <Text style={styles.jobTitle}>{item?.titulo || "Título no disponible"}</Text>
-        <Text style={styles.jobProf}>{profesion?.nombre_profesion || "Profesión no disponible"}</Text>
+        <Text style={styles.jobProf}>{item.profesion_nombre || "Profesión no disponible"}</Text>
         <Text numberOfLines={2} style={styles.jobDescription}>{item.descripcion || "Sin descripción."}</Text>
         <Text style={styles.jobLocation}>Ubicación: {ubicacion}</Text>
         {isJobAlreadyApplied ? (
@@ -158,19 +153,19 @@ export default function HomeTrabajadorScreen({ navigation }) {
     );
   };
 
-  const getEstadoActualizadoTrabajo = async (id_trabajo) => {
+  // Detalle del trabajo elegido: el estado actualizado y el DNI del
+  // contratador, que la tarjeta del listado no trae
+  const getTrabajoActualizado = async (id_trabajo) => {
     const response = await api.get(`${BASE_URL}/trabajos/${id_trabajo}/`);
-    console.log("getEstadoActualizadoTrabajo")
+    console.log("getTrabajoActualizado")
     const data = response.data;
     console.log("response: ", data)
 
-    const estadoActualizado = data.estado?.id_estado;
-
-    return estadoActualizado;
+    return data;
   }
 
   const renderModalContent = () => {
-    const [estadoActualizado, setEstadoActualizado] = useState("");
+    const [trabajoActualizado, setTrabajoActualizado] = useState(null);
 
     /* traigo de nuevo el estado del trabajo seleccionado
     no es muy elegante pero funciona
@@ -181,12 +176,13 @@ export default function HomeTrabajadorScreen({ navigation }) {
     */ 
     const idTrabajoActual = selectedJob?.id_trabajo;
     useEffect(() => {
-      const fetchEstadoActualizado = async () => {
-        const estado_actualizado = await getEstadoActualizadoTrabajo(idTrabajoActual);
-        setEstadoActualizado(estado_actualizado);
+      const fetchTrabajoActualizado = async () => {
+        const trabajo_actualizado = await getTrabajoActualizado(idTrabajoActual);
+        setTrabajoActualizado(trabajo_actualizado);
       };
-      fetchEstadoActualizado();
+      fetchTrabajoActualizado();
     }, [idTrabajoActual]);
+    const estadoActualizado = trabajoActualizado?.estado?.id_estado ?? "";
 
     // trae correctamente el estado actualizado
     // console.log("estadoActualizado: ", estadoActualizado)
@@ -194,25 +190,24 @@ export default function HomeTrabajadorScreen({ navigation }) {
      if (!selectedJob) return null;
      
      const yaPostulado = Array.isArray(misPostulaciones) && misPostulaciones.some(p => p.trabajo?.id_trabajo === selectedJob.id_trabajo);
-     const isAssignedToMe = selectedJob?.estado?.id_estado === 3 && selectedJob?.id_trabajador === workerProfile?.id_trabajador;
+     const isAssignedToMe = selectedJob?.id_estado === 3 && selectedJob?.id_trabajador === workerProfile?.id_trabajador;
 
      let quienContrata = "No especificado";
-     if (selectedJob?.contratador) {
-          const c = selectedJob.contratador;
-          quienContrata = [c.nombre, c.apellido].filter(Boolean).join(" ");
-          if (c.dni) quienContrata += `, DNI ${c.dni}`;
+     if (selectedJob?.id_contratador) {
+          quienContrata = [selectedJob.contratador_nombre, selectedJob.contratador_apellido].filter(Boolean).join(" ");
+          const dni = trabajoActualizado?.contratador?.dni;
+          if (dni) quienContrata += `, DNI ${dni}`;
      }
      let ubicacionCompleta = "No especificada";
-     if (selectedJob?.zona_geografica_trabajo && typeof selectedJob.zona_geografica_trabajo === 'object') {
-          const z = selectedJob.zona_geografica_trabajo;
-          ubicacionCompleta = [z.calle, z.ciudad, z.provincia].filter(Boolean).join(", ");
+     if (selectedJob?.id_zona_geografica_trabajo) {
+          ubicacionCompleta = [selectedJob.zona_calle, selectedJob.zona_ciudad, selectedJob.zona_provincia].filter(Boolean).join(", ");
      }
      const fechaPublicacion = selectedJob?.fecha_creacion ? new Date(selectedJob.fecha_creacion).toLocaleDateString() : 'N/A';
 
      return (
           <ScrollView>
                 <Text style={styles.modalJobTitle}>{selectedJob.titulo || "S/Titulo"}</Text>
-                <Text style={styles.modalJobProf}>{selectedJob.profesion_requerida?.nombre_profesion || "S/Profesion"}</Text>
+                <Text style={styles.modalJobProf}>{selectedJob.profesion_nombre || "S/Profesion"}</Text>
 
                 <Text style={styles.modalLabel}>Descripción Completa:</Text>
                 <Text style={styles.modalDescription}>{selectedJob.descripcion || "No disponible."}</Text>
@@ -33,7 +33,7 @@ export default function MisPostulacionesScreen() {
   const loadMyJobs = async () => {
     setLoading(true);
     try {
-      const resp = await api.get(`${BASE_URL}/postulaciones/?id_trabajador=${workerProfile.id_trabajador}`);
+      const resp = await api.get(`${BASE_URL}/postulaciones/tarjetas/?id_trabajador=${workerProfile.id_trabajador}`);
       const postulaciones = resp.data || [];
       
       postulaciones.sort((a, b) => new Date(b.fecha_postulacion) - new Date(a.fecha_postulacion));
@@ -79,8 +79,8 @@ export default function MisPostulacionesScreen() {
     
     const id_trabajo = selectedJobToRate.id_trabajo;
     const id_trabajador = workerProfile.id_trabajador;
-    const id_contratador = selectedJobToRate.contratador?.id_contratador;
-    const current_estado = selectedJobToRate.estado?.id_estado;
+    const id_contratador = selectedJobToRate.id_contratador;
+    const current_estado = selectedJobToRate.id_estado;
 
     if (!id_contratador) {
        Alert.alert("Error", "No se pudo identificar al contratador para calificar.");
@@ -160,10 +160,9 @@ export default function MisPostulacionesScreen() {
     const trabajo = item.trabajo;
     if (!trabajo) return null;
 
-    const zona = trabajo.zona_geografica_trabajo;
-    const ubicacion = zona ? `${zona.ciudad || ""}${zona.provincia ? ", " + zona.provincia : ""}` : "Sin ubicación";
+    const ubicacion = trabajo.id_zona_geografica_trabajo ? `${trabajo.zona_ciudad || ""}${trabajo.zona_provincia ? ", " + trabajo.zona_provincia : ""}` : "Sin ubicación";
     
-    const idEstado = trabajo.estado?.id_estado;
+    const idEstado = trabajo.id_estado;
     const isActivo = idEstado === 3;
     const isEsperandoValoracion = idEstado === 4;
     const isFinalizado = idEstado === 5;
@@ -189,22 +188,22 @@ export default function MisPostulacionesScreen() {
       mostrarMensajeFechaFinalizacion = fechaFinalizacionTrabajo.slice(8,10) + "/" + fechaFinalizacionTrabajo.slice(5,7) + "/" + fechaFinalizacionTrabajo.slice(0,4) + " - " + fechaFinalizacionTrabajo.slice(11,13) + ":" + fechaFinalizacionTrabajo.slice(14,16) + ":" + fechaFinalizacionTrabajo.slice(17,19)
     };
   
-    const estadoTexto = trabajo.estado?.descripcion ?? "No definido";
+    const estadoTexto = trabajo.estado_descripcion ?? "No definido";
     let estadoStyle = styles.jobState;
     if (isActivo || isEsperandoValoracion) estadoStyle = [styles.jobState, styles.acceptedState];
     if (isFinalizado) estadoStyle = [styles.jobState, styles.finishedState];
 
     // const id_chat = trabajo.id_trabajo;
-    const concatenacion = String(trabajo.id_trabajo) + String(trabajo.contratador.id_contratador) + String(trabajo.trabajador?.id_trabajador || '');
+    const concatenacion = String(trabajo.id_trabajo) + String(trabajo.id_contratador) + String(trabajo.id_trabajador || '');
     const id_chat = parseInt(concatenacion);
 
-    const isAssignedToMe = trabajo.trabajador?.id_trabajador === workerProfile.id_trabajador;
+    const isAssignedToMe = trabajo.id_trabajador === workerProfile.id_trabajador;
 
     // console.log("TRABAJO: ", trabajo)
 
     return (
       <View style={styles.jobCard}>
-        <Text style={styles.jobProf}>{trabajo.profesion_requerida?.nombre_profesion || "S/Profesion"}</Text>
+        <Text style={styles.jobProf}>{trabajo.profesion_nombre || "S/Profesion"}</Text>
         <Text style={styles.jobTitle}>{trabajo.titulo || "S/Titulo"}</Text>
         <Text numberOfLines={2} style={styles.jobDescription}>{trabajo.descripcion ?? ""}</Text>
         <Text style={styles.jobLocation}>Ubicación: {ubicacion}</Text>
@@ -226,7 +225,7 @@ export default function MisPostulacionesScreen() {
             </TouchableOpacity>
           </View>
         ) : (
-          (trabajo.trabajador?.id_trabajador && !isAssignedToMe) ? (
+          (trabajo.id_trabajador && !isAssignedToMe) ? (
             <Text style={{ color: "red", fontSize: 16, fontWeight: "bold", textAlign: "center", marginTop: 10 }}>NO FUISTE ESCOGIDO PARA EL TRABAJO</Text>
           ) : null
         )}
@@ -7,7 +7,7 @@ Created on Fri Sep 12 17:21:13 2025
 """
 
 from django.contrib import admin
-from .models import CalificacionContratador, CalificacionTrabajador, Contratador, Estado, Postulacion, Profesion, Trabajador, TrabajadoresProfesion, Trabajo, ZonaGeografica
+from .models import CalificacionContratador, CalificacionTrabajador, Contratador, Estado, Postulacion, Profesion, ReputacionContratador, ReputacionTrabajador, Trabajador, TrabajadoresProfesion, Trabajo, ZonaGeografica
 
 admin.site.register(Trabajo)
 admin.site.register(Trabajador)
@@ -19,5 +19,7 @@ admin.site.register(Postulacion)
 admin.site.register(Profesion)
 admin.site.register(TrabajadoresProfesion)
 admin.site.register(ZonaGeografica)
+admin.site.register(ReputacionTrabajador)
+admin.site.register(ReputacionContratador)
 
 
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class ReparBackendConfig(AppConfig):
+    name = 'reparBackend'
+
+    def ready(self):
+        # Señales que mantienen el índice de búsqueda de trabajos
+        from . import busqueda  # noqa: F401
+        # Reputaciones al día cuando se borran calificaciones
+        from . import reputacion  # noqa: F401
+        # Lápidas de lo que se borra, para /api/sync/
+        from . import sincronizacion  # noqa: F401
+        # Tarjetas de trabajos (TarjetaTrabajo) al día con cada escritura
+        from . import tarjetas  # noqa: F401
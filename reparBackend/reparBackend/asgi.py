@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reparBackend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Despues de get_asgi_application, que configura Django
+from reparBackend.eventos import EventosWebSocket  # noqa: E402
+
+eventos_websocket = EventosWebSocket()
+
+
+async def application(scope, receive, send):
+    # HTTP va a Django; los WebSockets a los eventos en tiempo real
+    if scope['type'] == 'websocket':
+        return await eventos_websocket(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,73 @@
+"""
+Vistas async servidas por asgi.py.
+
+DRF despacha siempre de forma sincrónica, así que `APIViewAsync` repite el
+dispatch de APIView esperando al handler (`async def get`). La
+autenticación, permisos y throttling corren en un thread, porque verificar
+el token de Firebase puede tener que descargar las claves de Google.
+
+El ORM es sincrónico: las vistas async lo usan con `en_thread(funcion)`, que
+lo corre en un thread del pool sin frenar el event loop, y
+`en_paralelo(f, g, ...)` corre consultas independientes a la vez, cada una
+con su conexión. Las conexiones se cierran al terminar según CONN_MAX_AGE,
+igual que al final de un request. Las transacciones no cruzan threads: lo
+que tiene que ser atómico va entero en una sola función.
+
+Con WSGI (runserver, gunicorn) estas vistas también funcionan: Django las
+corre en un event loop propio por request.
+"""
+
+import asyncio
+import functools
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.views import APIView
+
+
+def _con_conexion_propia(funcion):
+    @functools.wraps(funcion)
+    def ejecutar(*args, **kwargs):
+        close_old_connections()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return ejecutar
+
+
+async def en_thread(funcion, *args, **kwargs):
+    return await sync_to_async(_con_conexion_propia(funcion), thread_sensitive=False)(*args, **kwargs)
+
+
+async def en_paralelo(*funciones):
+    # Resultados en el mismo orden que las funciones
+    return await asyncio.gather(*(en_thread(funcion) for funcion in funciones))
+
+
+class APIViewAsync(APIView):
+    # Todos los handlers (get, post, ...) tienen que ser async
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await en_thread(self.initial, request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # options() y http_method_not_allowed() de DRF son sincrónicos
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
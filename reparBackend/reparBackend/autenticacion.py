@@ -0,0 +1,210 @@
+"""
+Verificación local de los ID tokens de Firebase.
+
+En lugar de llamar a firebase_admin.auth.verify_id_token en cada request, la
+firma se valida contra las claves públicas de Google (las del proveedor de
+firebase.py), que se descargan una vez y se guardan el tiempo que indica el
+Cache-Control de la respuesta. Los claims ya verificados quedan en un LRU
+acotado hasta el 'exp' del token, así que un mismo token solo se verifica
+una vez por proceso.
+"""
+
+import json
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import authentication, exceptions
+
+from .firebase import firebase
+from .instrumentacion import medir
+
+CERTIFICADOS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+ISSUER_PREFIX = 'https://securetoken.google.com/'
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class TokenInvalido(ValueError):
+    pass
+
+
+def descargar_certificados():
+    # Devuelve ({kid: certificado PEM}, segundos de validez segun Cache-Control)
+    with urllib.request.urlopen(CERTIFICADOS_URL, timeout=5) as response:
+        certificados = json.loads(response.read().decode('utf-8'))
+        match = _MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+    max_age = int(match.group(1)) if match else 3600
+    return certificados, max_age
+
+
+class ClavesPublicas:
+    # Claves públicas de Google indexadas por 'kid'. `fuente` es cualquier
+    # callable con la misma firma que descargar_certificados; la de
+    # `claves_publicas` se las pide al proveedor de firebase.py.
+
+    def __init__(self, fuente=descargar_certificados):
+        self.fuente = fuente
+        self._claves = {}
+        self._vence = 0.0
+        self._lock = threading.Lock()
+
+    def _refrescar(self):
+        try:
+            certificados, max_age = self.fuente()
+        except Exception as e:
+            if self._claves:
+                # Si Google no responde se siguen usando las claves que ya
+                # teníamos, y se reintenta en un minuto.
+                self._vence = time.monotonic() + 60
+                return
+            raise TokenInvalido(f"No se pudieron obtener las claves públicas de Firebase: {e}")
+
+        from cryptography import x509
+        self._claves = {
+            kid: x509.load_pem_x509_certificate(pem.encode('utf-8')).public_key()
+            for kid, pem in certificados.items()
+        }
+        self._vence = time.monotonic() + max_age
+
+    def get(self, kid):
+        if time.monotonic() >= self._vence:
+            with self._lock:
+                if time.monotonic() >= self._vence:
+                    self._refrescar()
+        clave = self._claves.get(kid)
+        if clave is None:
+            raise TokenInvalido("El token fue firmado con una clave desconocida.")
+        return clave
+
+    def limpiar(self):
+        with self._lock:
+            self._claves = {}
+            self._vence = 0.0
+
+
+class CacheTokens:
+    # LRU acotado: token -> claims. Cada entrada vence con el 'exp' del token.
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            item = self._items.get(token)
+            if item is None:
+                return None
+            claims, exp = item
+            if exp <= time.time():
+                del self._items[token]
+                return None
+            self._items.move_to_end(token)
+            return claims
+
+    def set(self, token, claims):
+        with self._lock:
+            self._items[token] = (claims, claims['exp'])
+            self._items.move_to_end(token)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._items.clear()
+
+
+def certificados_del_proveedor():
+    return firebase().certificados()
+
+
+claves_publicas = ClavesPublicas(certificados_del_proveedor)
+cache_tokens = CacheTokens(getattr(settings, 'FIREBASE_TOKEN_CACHE_SIZE', 1024))
+
+
+def get_project_id():
+    project_id = getattr(settings, 'FIREBASE_PROJECT_ID', None)
+    if project_id:
+        return project_id
+    return firebase().project_id
+
+
+@medir('auth')
+def verificar_id_token(token):
+    # Mismas reglas que firebase_admin.auth.verify_id_token: RS256, 'kid'
+    # conocido, aud/iss del proyecto, exp/iat presentes y 'sub' no vacío.
+    claims = cache_tokens.get(token)
+    if claims is not None:
+        return claims
+
+    # jwt y cryptography tardan unos 40 ms en importarse: recién con el
+    # primer token que no está en el cache, no al arrancar
+    import jwt
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as e:
+        raise TokenInvalido(f"Token mal formado: {e}")
+    if header.get('alg') != 'RS256':
+        raise TokenInvalido("El token no está firmado con RS256.")
+
+    project_id = get_project_id()
+    try:
+        claims = jwt.decode(
+            token,
+            key=claves_publicas.get(header.get('kid')),
+            algorithms=['RS256'],
+            audience=project_id,
+            issuer=ISSUER_PREFIX + project_id,
+            options={'require': ['exp', 'iat', 'sub']},
+        )
+    except jwt.PyJWTError as e:
+        raise TokenInvalido(f"Token inválido: {e}")
+
+    sub = claims.get('sub')
+    if not isinstance(sub, str) or not sub or len(sub) > 128:
+        raise TokenInvalido("El token no contiene un 'sub' válido.")
+    claims['uid'] = sub
+
+    cache_tokens.set(token, claims)
+    return claims
+
+
+class UsuarioFirebase:
+    # Usuario mínimo para request.user: el perfil local (Contratador) se
+    # busca por uid cuando la vista lo necesita.
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.uid = claims['uid']
+        self.email = claims.get('email')
+
+    def __str__(self):
+        return self.uid
+
+
+class FirebaseAuthentication(authentication.BaseAuthentication):
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].decode('latin-1') != self.keyword:
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed("Header Authorization inválido.")
+
+        try:
+            claims = verificar_id_token(header[1].decode('latin-1'))
+        except TokenInvalido as e:
+            raise exceptions.AuthenticationFailed(str(e))
+        return UsuarioFirebase(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
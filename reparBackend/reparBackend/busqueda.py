@@ -0,0 +1,258 @@
+"""
+Búsqueda de trabajos por texto.
+
+Índice invertido (PosteoBusqueda) sobre el título, la descripción y el
+nombre de la profesión de cada trabajo, con los términos en minúsculas, sin
+acentos, sin palabras vacías y con el plural recortado. El índice se
+actualiza en el mismo momento en que se guarda o se borra un trabajo (o se
+renombra una profesión) mediante señales, y `reconstruir` lo arma de cero.
+
+Las consultas se puntúan con BM25 en la base: se leen solo los posteos de
+los términos buscados, agrupados por trabajo. Como longitud de un trabajo se
+usa su cantidad de términos distintos, así el largo promedio sale de sumar
+los df de TerminoBusqueda sin recorrer los posteos.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import PosteoBusqueda, Profesion, TerminoBusqueda, Trabajo, normalizar_texto
+
+K1 = 1.2
+B = 0.75
+LARGO_MAXIMO_TERMINO = 40
+# Un término presente en más de esta fracción de los trabajos casi no
+# distingue resultados; se ignora si la consulta tiene otros más raros.
+FRACCION_COMUN = 0.5
+CLAVE_ESTADISTICAS = 'busqueda:estadisticas'
+DURACION_ESTADISTICAS = 600
+
+PALABRAS_VACIAS = frozenset("""
+    a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bajo bien cada casi como con contra cual
+    cuales cuando de del desde donde dos e el ella ellas ellos en entre era es esa esas ese eso esos esta estan estas
+    este esto estos fue ha hay hace hacer hasta la las le les lo los mas me mi mis muy nada ni no nos o otra otro para
+    pero poco por porque que se sea ser si sin sobre son su sus tambien tan te tiene tengo todo todos tu un una unas
+    uno unos y ya yo
+""".split())
+
+_PALABRA_RE = re.compile(r'[a-z0-9]+')
+
+
+def raiz(palabra):
+    # Recorte mínimo de plurales, igual para singular y plural:
+    # reparaciones/reparacion -> reparacion, paredes/pared -> pared,
+    # calles/calle -> call, luces/luz -> luz, caños/caño -> cano
+    if len(palabra) <= 3:
+        return palabra
+    if palabra.endswith('ces'):
+        return palabra[:-3] + 'z'
+    if palabra.endswith('s') and not palabra.endswith('ss'):
+        palabra = palabra[:-1]
+    if palabra.endswith('e') and len(palabra) > 3:
+        palabra = palabra[:-1]
+    return palabra
+
+
+def tokenizar(texto):
+    return [
+        raiz(palabra)[:LARGO_MAXIMO_TERMINO]
+        for palabra in _PALABRA_RE.findall(normalizar_texto(texto))
+        if len(palabra) > 1 and palabra not in PALABRAS_VACIAS
+    ]
+
+
+def contar_terminos(*textos):
+    terminos = Counter()
+    for texto in textos:
+        terminos.update(tokenizar(texto))
+    return terminos
+
+
+def _ajustar_documentos(terminos, delta):
+    if not terminos:
+        return
+    if delta > 0:
+        TerminoBusqueda.objects.bulk_create([TerminoBusqueda(termino=t) for t in terminos], ignore_conflicts=True)
+    TerminoBusqueda.objects.filter(termino__in=terminos).update(documentos=F('documentos') + delta)
+
+
+def _posteos(id_trabajo, terminos):
+    longitud = len(terminos)
+    return [
+        PosteoBusqueda(id_trabajo_id=id_trabajo, termino=termino, frecuencia=frecuencia, longitud=longitud)
+        for termino, frecuencia in terminos.items()
+    ]
+
+
+@transaction.atomic
+def indexar(trabajo):
+    nuevos = contar_terminos(trabajo.titulo, trabajo.descripcion, trabajo.id_profesion_requerida.nombre_profesion)
+    anteriores = dict(PosteoBusqueda.objects.filter(id_trabajo=trabajo.pk).values_list('termino', 'frecuencia'))
+    if anteriores == dict(nuevos):
+        return
+
+    PosteoBusqueda.objects.filter(id_trabajo=trabajo.pk).delete()
+    PosteoBusqueda.objects.bulk_create(_posteos(trabajo.pk, nuevos))
+    _ajustar_documentos(nuevos.keys() - anteriores.keys(), 1)
+    _ajustar_documentos(anteriores.keys() - nuevos.keys(), -1)
+
+
+@transaction.atomic
+def reindexar_profesion(id_profesion, batch_size=2000):
+    # Los trabajos de una profesión renombrada, de a lotes: por lote se leen
+    # los posteos anteriores, se borran y se vuelven a crear con un INSERT, y
+    # los df se ajustan una sola vez al final
+    diferencias = Counter()
+    filas = (Trabajo.objects.filter(id_profesion_requerida=id_profesion).order_by('pk')
+             .values_list('pk', 'titulo', 'descripcion', 'id_profesion_requerida__nombre_profesion')
+             .iterator(chunk_size=batch_size))
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= batch_size:
+            _reindexar_lote(lote, diferencias)
+            lote = []
+    _reindexar_lote(lote, diferencias)
+
+    por_delta = defaultdict(list)
+    for termino, delta in diferencias.items():
+        if delta:
+            por_delta[delta].append(termino)
+    for delta, terminos in por_delta.items():
+        _ajustar_documentos(terminos, delta)
+
+
+def _reindexar_lote(filas, diferencias):
+    if not filas:
+        return
+    ids = [pk for pk, *_ in filas]
+    anteriores = PosteoBusqueda.objects.filter(id_trabajo__in=ids).values_list('termino', flat=True)
+    diferencias.subtract(anteriores)
+    posteos = []
+    for pk, titulo, descripcion, nombre_profesion in filas:
+        terminos = contar_terminos(titulo, descripcion, nombre_profesion)
+        diferencias.update(terminos.keys())
+        posteos.extend(_posteos(pk, terminos))
+    PosteoBusqueda.objects.filter(id_trabajo__in=ids).delete()
+    PosteoBusqueda.objects.bulk_create(posteos)
+
+
+@transaction.atomic
+def desindexar(id_trabajo):
+    terminos = list(PosteoBusqueda.objects.filter(id_trabajo=id_trabajo).values_list('termino', flat=True))
+    PosteoBusqueda.objects.filter(id_trabajo=id_trabajo).delete()
+    _ajustar_documentos(terminos, -1)
+
+
+@transaction.atomic
+def reconstruir(batch_size=2000):
+    PosteoBusqueda.objects.all().delete()
+    TerminoBusqueda.objects.all().delete()
+
+    documentos = Counter()
+    posteos = []
+    filas = (Trabajo.objects.order_by('pk')
+             .values_list('pk', 'titulo', 'descripcion', 'id_profesion_requerida__nombre_profesion')
+             .iterator(chunk_size=batch_size))
+    cantidad = 0
+    for pk, titulo, descripcion, nombre_profesion in filas:
+        terminos = contar_terminos(titulo, descripcion, nombre_profesion)
+        documentos.update(terminos.keys())
+        posteos.extend(_posteos(pk, terminos))
+        cantidad += 1
+        if len(posteos) >= batch_size:
+            PosteoBusqueda.objects.bulk_create(posteos, batch_size=batch_size)
+            posteos = []
+    PosteoBusqueda.objects.bulk_create(posteos, batch_size=batch_size)
+    TerminoBusqueda.objects.bulk_create(
+        [TerminoBusqueda(termino=t, documentos=n) for t, n in documentos.items()],
+        batch_size=batch_size,
+    )
+    cache.delete(CLAVE_ESTADISTICAS)
+    return cantidad
+
+
+def estadisticas():
+    # (cantidad de trabajos, longitud promedio). Cambian despacio, así que se
+    # cachean unos minutos.
+    datos = cache.get(CLAVE_ESTADISTICAS)
+    if datos is None:
+        cantidad = Trabajo.objects.count()
+        total = TerminoBusqueda.objects.aggregate(total=Sum('documentos'))['total'] or 0
+        datos = (cantidad, total / cantidad if cantidad else 1.0)
+        cache.set(CLAVE_ESTADISTICAS, datos, DURACION_ESTADISTICAS)
+    return datos
+
+
+def buscar(consulta, estados=None, profesiones=None, limite=20, desde=0):
+    # Devuelve [(id_trabajo, puntaje)] ordenado por puntaje BM25
+    terminos = set(tokenizar(consulta))
+    if not terminos:
+        return []
+    df = dict(TerminoBusqueda.objects.filter(termino__in=terminos, documentos__gt=0).values_list('termino', 'documentos'))
+    if not df:
+        return []
+
+    cantidad, largo_promedio = estadisticas()
+    cantidad = max(cantidad, max(df.values()))
+    idf = {t: math.log(1 + (cantidad - n + 0.5) / (n + 0.5)) for t, n in df.items()}
+    raros = {t: v for t, v in idf.items() if df[t] <= FRACCION_COMUN * cantidad}
+    if raros:
+        idf = raros
+
+    peso = Case(*[When(termino=t, then=Value(v)) for t, v in idf.items()], output_field=FloatField())
+    puntaje = ExpressionWrapper(
+        peso * F('frecuencia') * Value(K1 + 1)
+        / (F('frecuencia') + Value(K1 * (1 - B)) + F('longitud') * Value(K1 * B / max(largo_promedio, 1.0))),
+        output_field=FloatField(),
+    )
+
+    posteos = PosteoBusqueda.objects.filter(termino__in=idf.keys())
+    if estados:
+        posteos = posteos.filter(id_trabajo__id_estado__in=estados)
+    if profesiones:
+        posteos = posteos.filter(id_trabajo__id_profesion_requerida__in=profesiones)
+    filas = (posteos
+             .values('id_trabajo')
+             .annotate(puntaje=Sum(puntaje))
+             .order_by('-puntaje', '-id_trabajo')[desde:desde + limite])
+    return [(fila['id_trabajo'], fila['puntaje']) for fila in filas]
+
+
+# Lo que entra en el índice; un cambio de estado (transiciones.py) no lo toca
+CAMPOS_INDEXADOS = frozenset({'titulo', 'descripcion', 'id_profesion_requerida', 'id_profesion_requerida_id'})
+
+
+@receiver(post_save, sender=Trabajo)
+def _trabajo_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or CAMPOS_INDEXADOS & update_fields):
+        indexar(instance)
+
+
+@receiver(pre_delete, sender=Trabajo)
+def _trabajo_borrado(sender, instance, **kwargs):
+    desindexar(instance.pk)
+
+
+@receiver(pre_save, sender=Profesion)
+def _profesion_por_guardar(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or (update_fields is not None and 'nombre_profesion' not in update_fields):
+        return
+    instance._nombre_anterior = Profesion.objects.filter(pk=instance.pk).values_list('nombre_profesion', flat=True).first()
+
+
+@receiver(post_save, sender=Profesion)
+def _profesion_guardada(sender, instance, **kwargs):
+    # El nombre de la profesión es parte del texto de sus trabajos; si sus
+    # términos no cambian (el mismo nombre, o solo mayúsculas y acentos) el
+    # índice queda igual
+    anterior = instance.__dict__.pop('_nombre_anterior', None)
+    if anterior is not None and contar_terminos(anterior) != contar_terminos(instance.nombre_profesion):
+        reindexar_profesion(instance.pk)
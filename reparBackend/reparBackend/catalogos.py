@@ -0,0 +1,112 @@
+"""
+Cache de lectura para los catálogos casi estáticos (profesiones y estados).
+
+Cada catálogo se guarda serializado en dos niveles: una copia en memoria del
+proceso y otra en el cache compartido de Django (CACHES), las dos atadas a
+un número de versión que vive en el cache compartido. Un request solo lee
+esa versión; si coincide con la copia local no toca la base ni el
+serializer. Las vistas que escriben sobre el catálogo llaman a `invalidar`,
+que cambia la versión para todos los procesos.
+
+Las respuestas llevan un ETag fuerte calculado sobre el contenido, y un GET
+con If-None-Match que coincide se contesta 304 con la misma lógica.
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def calcular_etag(data):
+    contenido = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+    return '"%s"' % hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:32]
+
+
+class Catalogo:
+    # `construir` devuelve la lista serializada completa; `campo_id` es la
+    # clave de cada item, para servir también el detalle desde el cache.
+
+    def __init__(self, nombre, construir, campo_id):
+        self.nombre = nombre
+        self.construir = construir
+        self.campo_id = campo_id
+        self.clave_version = f'catalogo:{nombre}:version'
+        self._local = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        version = cache.get(self.clave_version)
+        if version is None:
+            cache.add(self.clave_version, uuid.uuid4().hex, None)
+            version = cache.get(self.clave_version)
+        return version
+
+    def _armar(self):
+        items = [dict(item) for item in self.construir()]
+        return {
+            'data': items,
+            'etag': calcular_etag(items),
+            'items': {item[self.campo_id]: (item, calcular_etag(item)) for item in items},
+        }
+
+    def obtener(self):
+        # La versión se lee antes que la base: si una escritura la cambia en
+        # el medio, lo que se arme queda guardado bajo la versión vieja.
+        version = self.version()
+        local = self._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        with self._lock:
+            clave = f'catalogo:{self.nombre}:{version}'
+            entrada = cache.get(clave)
+            if entrada is None:
+                entrada = self._armar()
+                cache.set(clave, entrada, None)
+            self._local = (version, entrada)
+        return entrada
+
+    def invalidar(self):
+        # Después del commit, para que nadie arme el catálogo nuevo con datos
+        # que todavía no se ven.
+        def cambiar_version():
+            cache.set(self.clave_version, uuid.uuid4().hex, None)
+            self._local = None
+        transaction.on_commit(cambiar_version)
+
+    def responder(self, request, id=None):
+        # Respuesta del listado (id=None) o de un item; None si el item no
+        # está en el catálogo (la vista decide el 404).
+        entrada = self.obtener()
+        if id is None:
+            data, etag = entrada['data'], entrada['etag']
+        elif id in entrada['items']:
+            data, etag = entrada['items'][id]
+        else:
+            return None
+
+        if etag_coincide(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'REPAR_CATALOGO_MAX_AGE', 300))
+        return response
+
+
+def etag_coincide(request, etag):
+    # If-None-Match usa comparación débil (RFC 9110 13.1.2)
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in (e.removeprefix('W/') for e in etags)
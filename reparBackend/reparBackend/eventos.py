@@ -0,0 +1,283 @@
+"""
+Eventos en tiempo real por WebSocket: ws://<host>/ws/eventos/.
+
+El cliente se conecta con su ID token de Firebase (header Authorization o
+`?token=`) y queda suscripto a los canales de su contratador y de sus
+perfiles de trabajador. Las vistas publican, después del commit:
+
+- `trabajo.actualizado` cuando un PATCH cambia el estado o el trabajador de
+  un trabajo: al contratador, al trabajador anterior y al nuevo y a los
+  postulados.
+- `postulacion.nueva` por cada postulación creada (de a una o en bloque): al
+  contratador del trabajo y al trabajador.
+
+Cada evento es una línea JSON chica con ids; el detalle se pide por REST
+(`?ids=`) o llega con la próxima /api/sync/. Los eventos no se guardan: al
+reconectarse el cliente hace un /api/sync/ para ponerse al día.
+
+El broker (REPAR_EVENTOS_BROKER) es un objeto con `suscribir(canales)` y
+`publicar(canales, evento)`. `BrokerEnMemoria` reparte dentro del proceso,
+así que la API y los WebSockets tienen que correr en el mismo proceso ASGI;
+con varios procesos se reemplaza por uno compartido con la misma interfaz.
+"""
+
+import asyncio
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from .autenticacion import TokenInvalido, verificar_id_token
+from .models import Contratador, Postulacion, Trabajador, Trabajo
+
+RUTA = '/ws/eventos/'
+
+# Códigos de cierre propios (4000-4999 quedan para la aplicación)
+CIERRE_NO_ENCONTRADO = 4404
+CIERRE_NO_AUTENTICADO = 4401
+CIERRE_SIN_PERFIL = 4403
+
+
+def canal_contratador(id_contratador):
+    return f'contratador:{id_contratador}'
+
+
+def canal_trabajador(id_trabajador):
+    return f'trabajador:{id_trabajador}'
+
+
+# --- Broker --------------------------------------------------------------
+
+class Suscripcion:
+    # Cola de una conexión. Se crea dentro del event loop que la consume; el
+    # broker le entrega mensajes desde cualquier thread.
+
+    def __init__(self, broker, canales, maximo):
+        self.broker = broker
+        self.canales = tuple(canales)
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=maximo)
+        # Si el cliente no lee y la cola se llena se descartan los eventos y
+        # se le avisa una sola vez que vuelva a sincronizar
+        self.desbordada = False
+
+    def entregar(self, mensaje):
+        if self.cola.full():
+            self.desbordada = True
+        else:
+            self.cola.put_nowait(mensaje)
+
+    async def siguiente(self):
+        mensaje = await self.cola.get()
+        if self.desbordada and self.cola.empty():
+            self.desbordada = False
+            return mensaje, json.dumps({'tipo': 'eventos.perdidos'})
+        return mensaje, None
+
+    def cerrar(self):
+        self.broker.desuscribir(self)
+
+
+def _entregar(suscripciones, mensaje):
+    for suscripcion in suscripciones:
+        suscripcion.entregar(mensaje)
+
+
+class BrokerEnMemoria:
+
+    def __init__(self, maximo_cola=None):
+        self.maximo_cola = maximo_cola or getattr(settings, 'REPAR_EVENTOS_COLA', 100)
+        self._canales = {}      # canal -> {Suscripcion}
+        self._lock = threading.Lock()
+
+    def suscribir(self, canales):
+        suscripcion = Suscripcion(self, canales, self.maximo_cola)
+        with self._lock:
+            for canal in suscripcion.canales:
+                self._canales.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            for canal in suscripcion.canales:
+                suscriptores = self._canales.get(canal)
+                if suscriptores is not None:
+                    suscriptores.discard(suscripcion)
+                    if not suscriptores:
+                        del self._canales[canal]
+
+    def publicar(self, canales, evento):
+        # El JSON se arma una vez para todos los destinatarios; una conexión
+        # suscripta a varios de los canales lo recibe una sola vez
+        with self._lock:
+            destinatarios = set()
+            for canal in canales:
+                destinatarios.update(self._canales.get(canal, ()))
+        if not destinatarios:
+            return 0
+        mensaje = json.dumps(evento, cls=DjangoJSONEncoder)
+        # Una sola llamada por event loop (despertarlo cuesta una syscall)
+        por_loop = {}
+        for suscripcion in destinatarios:
+            por_loop.setdefault(suscripcion.loop, []).append(suscripcion)
+        for loop, suscripciones in por_loop.items():
+            try:
+                loop.call_soon_threadsafe(_entregar, suscripciones, mensaje)
+            except RuntimeError:
+                # Event loop cerrado: esas conexiones ya no existen
+                for suscripcion in suscripciones:
+                    self.desuscribir(suscripcion)
+        return len(destinatarios)
+
+    def conexiones(self):
+        with self._lock:
+            return len({s for suscriptores in self._canales.values() for s in suscriptores})
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'REPAR_EVENTOS_BROKER', 'reparBackend.eventos.BrokerEnMemoria'))()
+    return _broker
+
+
+def publicar_al_confirmar(canales, evento):
+    # Dentro de una transacción espera al commit (y no publica si hay
+    # rollback); fuera de una, publica enseguida
+    canales = list(dict.fromkeys(canales))
+    transaction.on_commit(lambda: broker().publicar(canales, evento))
+
+
+# --- Eventos que publican las vistas -------------------------------------
+
+def publicar_trabajo_actualizado(trabajo, id_estado_anterior, id_trabajador_anterior):
+    if trabajo.id_estado_id == id_estado_anterior and trabajo.id_trabajador_id == id_trabajador_anterior:
+        return
+    postulados = Postulacion.objects.filter(id_trabajo=trabajo.pk).values_list('id_trabajador', flat=True)
+    trabajadores = {trabajo.id_trabajador_id, id_trabajador_anterior, *postulados} - {None}
+    publicar_al_confirmar(
+        [canal_contratador(trabajo.id_contratador_id), *(canal_trabajador(pk) for pk in trabajadores)],
+        {
+            'tipo': 'trabajo.actualizado',
+            'id_trabajo': trabajo.pk,
+            'id_estado': trabajo.id_estado_id,
+            'id_estado_anterior': id_estado_anterior,
+            'id_trabajador': trabajo.id_trabajador_id,
+            'id_trabajador_anterior': id_trabajador_anterior,
+        },
+    )
+
+
+def publicar_postulaciones(postulaciones):
+    postulaciones = list(postulaciones)
+    contratadores = dict(Trabajo.objects.filter(pk__in={p.id_trabajo_id for p in postulaciones})
+                         .values_list('pk', 'id_contratador'))
+    for postulacion in postulaciones:
+        publicar_al_confirmar(
+            [canal_contratador(contratadores[postulacion.id_trabajo_id]), canal_trabajador(postulacion.id_trabajador_id)],
+            {
+                'tipo': 'postulacion.nueva',
+                'id_postulacion': postulacion.pk,
+                'id_trabajo': postulacion.id_trabajo_id,
+                'id_trabajador': postulacion.id_trabajador_id,
+                'fecha_postulacion': postulacion.fecha_postulacion,
+            },
+        )
+
+
+# --- Aplicación ASGI -----------------------------------------------------
+
+def canales_de_usuario(uid):
+    close_old_connections()
+    try:
+        contratador = Contratador.objects.filter(uid_firebase=uid).values_list('pk', flat=True).first()
+        if contratador is None:
+            return []
+        trabajadores = Trabajador.objects.filter(id_contratador=contratador).values_list('pk', flat=True)
+        return [canal_contratador(contratador), *(canal_trabajador(pk) for pk in trabajadores)]
+    finally:
+        close_old_connections()
+
+
+def _token(scope):
+    for nombre, valor in scope.get('headers', ()):
+        if nombre == b'authorization':
+            partes = valor.decode('latin-1').split()
+            if len(partes) == 2 and partes[0] == 'Bearer':
+                return partes[1]
+    tokens = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+    return tokens[0] if tokens else None
+
+
+class EventosWebSocket:
+    # Una instancia atiende todas las conexiones del proceso
+
+    def __init__(self, broker=None):
+        self._broker = broker
+
+    @property
+    def broker(self):
+        return self._broker or broker()
+
+    async def canales_de_conexion(self, scope):
+        # Canales a los que se suscribe la conexión, o el código con el que
+        # se rechaza
+        token = _token(scope)
+        if not token:
+            return None, CIERRE_NO_AUTENTICADO
+        try:
+            claims = await sync_to_async(verificar_id_token, thread_sensitive=False)(token)
+        except TokenInvalido:
+            return None, CIERRE_NO_AUTENTICADO
+        canales = await sync_to_async(canales_de_usuario)(claims['uid'])
+        if not canales:
+            return None, CIERRE_SIN_PERFIL
+        return canales, None
+
+    async def __call__(self, scope, receive, send):
+        mensaje = await receive()
+        if mensaje['type'] != 'websocket.connect':
+            return
+        if scope['path'] != RUTA:
+            await send({'type': 'websocket.close', 'code': CIERRE_NO_ENCONTRADO})
+            return
+        canales, cierre = await self.canales_de_conexion(scope)
+        if cierre is not None:
+            await send({'type': 'websocket.close', 'code': cierre})
+            return
+
+        await send({'type': 'websocket.accept'})
+        suscripcion = self.broker.suscribir(canales)
+        recibir = asyncio.ensure_future(receive())
+        evento = asyncio.ensure_future(suscripcion.siguiente())
+        try:
+            while True:
+                await asyncio.wait((recibir, evento), return_when=asyncio.FIRST_COMPLETED)
+                if evento.done():
+                    texto, aviso = evento.result()
+                    await send({'type': 'websocket.send', 'text': texto})
+                    if aviso is not None:
+                        await send({'type': 'websocket.send', 'text': aviso})
+                    evento = asyncio.ensure_future(suscripcion.siguiente())
+                if recibir.done():
+                    mensaje = recibir.result()
+                    if mensaje['type'] == 'websocket.disconnect':
+                        break
+                    if mensaje.get('text') == 'ping':
+                        await send({'type': 'websocket.send', 'text': 'pong'})
+                    recibir = asyncio.ensure_future(receive())
+        finally:
+            suscripcion.cerrar()
+            recibir.cancel()
+            evento.cancel()
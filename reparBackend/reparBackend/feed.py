@@ -0,0 +1,58 @@
+"""
+Feed de trabajos para un trabajador.
+
+Reemplaza el filtrado que hacía HomeTrabajadorScreen en el dispositivo: se
+buscan los trabajos abiertos de las profesiones del trabajador (subquery
+sobre TrabajadoresProfesion) y se ordenan en la base por coincidencia de
+zona, día de publicación y promedio de calificaciones del contratador.
+
+El orden usa columnas calculadas, así que ningún índice lo resuelve: la
+base tiene que leer todos los candidatos y ordenarlos. Para que eso no
+crezca con la tabla, solo son candidatos los publicados en los últimos
+REPAR_FEED_DIAS días, un rango del índice por profesión, estado y fecha
+(trabajo_profesion_estado_idx) para cada profesión y estado abierto.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ESTADOS_ABIERTOS, TrabajadoresProfesion, Trabajo
+
+ORDEN_FEED = ('-coincidencia_zona', '-dia_creacion', '-promedio_contratador', '-fecha_creacion', '-id_trabajo')
+
+
+def coincidencia_zona(zona):
+    # 2 = misma ciudad y provincia, 1 = misma provincia, 0 = otra zona
+    if zona is None:
+        return Value(0, output_field=IntegerField())
+    misma_provincia = Q(id_zona_geografica_trabajo__provincia__iexact=zona.provincia)
+    misma_ciudad = misma_provincia & Q(id_zona_geografica_trabajo__ciudad__iexact=zona.ciudad)
+    return Case(
+        When(misma_ciudad, then=Value(2)),
+        When(misma_provincia, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def feed_trabajador(trabajador):
+    profesiones = TrabajadoresProfesion.objects.filter(id_trabajador=trabajador).values('id_profesion')
+    desde = timezone.now() - timedelta(days=settings.REPAR_FEED_DIAS)
+
+    return (Trabajo.objects
+            .filter(id_profesion_requerida__in=profesiones, id_estado__in=ESTADOS_ABIERTOS, fecha_creacion__gte=desde)
+            # Los trabajos que publicó la misma persona no le sirven como trabajador
+            .exclude(id_contratador=trabajador.id_contratador_id)
+            .annotate(
+                coincidencia_zona=coincidencia_zona(trabajador.id_zona_geografica_trabajador),
+                dia_creacion=TruncDate('fecha_creacion'),
+                promedio_contratador=Coalesce(
+                    'id_contratador__reputacion__promedio', Value(Decimal('0')),
+                    output_field=DecimalField(max_digits=3, decimal_places=2),
+                ),
+            ))
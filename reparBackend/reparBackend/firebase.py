@@ -0,0 +1,158 @@
+"""
+Acceso a Firebase detrás de un proveedor que se inicializa la primera vez
+que se usa, no al importar settings.py: los comandos de manage.py, los tests
+y el arranque de cada worker no pagan el import de firebase_admin (y de
+google-auth, requests, httpx, ...) ni la lectura de las credenciales, y
+arrancan aunque falte el archivo de la clave.
+
+REPAR_FIREBASE elige la clase del proveedor; `firebase()` devuelve la
+instancia del proceso. Un proveedor tiene:
+
+- `project_id`: el proyecto contra el que se validan los ID tokens.
+- `certificados()`: ({kid: certificado PEM}, segundos de validez), las
+  claves públicas con las que se firman los tokens.
+- `app()`: la app de firebase_admin, para lo que necesite el SDK.
+
+`FirebaseAdmin` es el real. `FirebaseLocal` no usa la red ni credenciales:
+firma sus propios tokens (`crear_token(uid)`) con una clave generada al
+arrancar, así en desarrollo y en tests se pasa por la misma verificación
+que en producción.
+"""
+
+import datetime
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class FirebaseAdmin:
+
+    def __init__(self, credenciales=None):
+        self.credenciales = credenciales or getattr(settings, 'FIREBASE_CREDENTIALS_PATH', None)
+        self._project_id = None
+        self._lock = threading.Lock()
+
+    def _leer_credenciales(self):
+        try:
+            with open(self.credenciales, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (OSError, TypeError, ValueError) as e:
+            raise ImproperlyConfigured(f"No se pudieron leer las credenciales de Firebase ({self.credenciales}): {e}")
+
+    @property
+    def project_id(self):
+        # Alcanza con leer el JSON de la clave: validar tokens no necesita
+        # el SDK
+        if self._project_id is None:
+            project_id = self._leer_credenciales().get('project_id')
+            if not project_id:
+                raise ImproperlyConfigured(f"{self.credenciales} no tiene 'project_id'.")
+            self._project_id = project_id
+        return self._project_id
+
+    def certificados(self):
+        from .autenticacion import descargar_certificados
+        return descargar_certificados()
+
+    def app(self):
+        import firebase_admin
+        from firebase_admin import credentials
+
+        with self._lock:
+            if not firebase_admin._apps:
+                firebase_admin.initialize_app(credentials.Certificate(self._leer_credenciales()))
+        return firebase_admin.get_app()
+
+
+class FirebaseLocal:
+
+    def __init__(self, project_id='repar-ar-local'):
+        self.project_id = project_id
+        self._clave = None
+        self._lock = threading.Lock()
+
+    def _clave_y_certificado(self):
+        # Generar la clave RSA lleva unos 50 ms: solo si se usa
+        with self._lock:
+            if self._clave is None:
+                from cryptography import x509
+                from cryptography.hazmat.primitives import hashes, serialization
+                from cryptography.hazmat.primitives.asymmetric import rsa
+                from cryptography.x509.oid import NameOID
+
+                clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+                nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, self.project_id)])
+                ahora = datetime.datetime.now(datetime.timezone.utc)
+                certificado = (
+                    x509.CertificateBuilder()
+                    .subject_name(nombre).issuer_name(nombre)
+                    .public_key(clave.public_key())
+                    .serial_number(x509.random_serial_number())
+                    .not_valid_before(ahora - datetime.timedelta(days=1))
+                    .not_valid_after(ahora + datetime.timedelta(days=365))
+                    .sign(clave, hashes.SHA256())
+                )
+                self._kid = uuid.uuid4().hex
+                self._pem = certificado.public_bytes(serialization.Encoding.PEM).decode('ascii')
+                self._clave = clave
+        return self._clave, self._kid, self._pem
+
+    def certificados(self):
+        _, kid, pem = self._clave_y_certificado()
+        return {kid: pem}, 3600
+
+    def app(self):
+        raise ImproperlyConfigured("FirebaseLocal no tiene app de firebase_admin: usar FirebaseAdmin.")
+
+    def crear_token(self, uid, duracion=3600, **claims):
+        import jwt
+
+        clave, kid, _ = self._clave_y_certificado()
+        ahora = int(time.time())
+        return jwt.encode(
+            {
+                'iss': f'https://securetoken.google.com/{self.project_id}',
+                'aud': self.project_id,
+                'sub': uid,
+                'iat': ahora,
+                'exp': ahora + duracion,
+                'auth_time': ahora,
+                **claims,
+            },
+            clave,
+            algorithm='RS256',
+            headers={'kid': kid},
+        )
+
+
+_firebase = None
+_firebase_lock = threading.Lock()
+
+
+def firebase():
+    global _firebase
+    if _firebase is None:
+        with _firebase_lock:
+            if _firebase is None:
+                _firebase = import_string(getattr(settings, 'REPAR_FIREBASE', 'reparBackend.firebase.FirebaseAdmin'))()
+    return _firebase
+
+
+@receiver(setting_changed)
+def _cambio_de_proveedor(setting, **kwargs):
+    # override_settings(REPAR_FIREBASE=...) en los tests: las claves y los
+    # tokens verificados eran del proveedor anterior
+    global _firebase
+    if setting in ('REPAR_FIREBASE', 'FIREBASE_CREDENTIALS_PATH', 'FIREBASE_PROJECT_ID'):
+        with _firebase_lock:
+            _firebase = None
+        from .autenticacion import cache_tokens, claves_publicas
+        claves_publicas.limpiar()
+        cache_tokens.limpiar()
@@ -0,0 +1,139 @@
+"""
+Búsqueda por cercanía sin PostGIS.
+
+Cada ZonaGeografica con coordenadas guarda su geohash (indexado). Para
+buscar en un radio se elige la precisión de geohash cuyas celdas cubren el
+radio con pocas celdas, se leen solo esas celdas por rango sobre el índice
+y recién ahí se calcula la distancia exacta (haversine) para filtrar y
+ordenar de la más cercana a la más lejana.
+"""
+
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+PRECISION_GEOHASH = 7
+MAX_CELDAS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(latitud, longitud, precision=PRECISION_GEOHASH):
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    resultado = []
+    bits = 0
+    cantidad_bits = 0
+    par = True
+    while len(resultado) < precision:
+        if par:
+            medio = (lng_min + lng_max) / 2
+            if longitud >= medio:
+                bits = (bits << 1) | 1
+                lng_min = medio
+            else:
+                bits <<= 1
+                lng_max = medio
+        else:
+            medio = (lat_min + lat_max) / 2
+            if latitud >= medio:
+                bits = (bits << 1) | 1
+                lat_min = medio
+            else:
+                bits <<= 1
+                lat_max = medio
+        par = not par
+        cantidad_bits += 1
+        if cantidad_bits == 5:
+            resultado.append(_BASE32[bits])
+            bits = 0
+            cantidad_bits = 0
+    return ''.join(resultado)
+
+
+def tamano_celda(precision):
+    # (alto, ancho) en grados de una celda de geohash de esa precisión
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def caja(latitud, longitud, radio_km):
+    delta_lat = radio_km / KM_POR_GRADO
+    delta_lng = radio_km / (KM_POR_GRADO * max(math.cos(math.radians(latitud)), 0.01))
+    return (max(latitud - delta_lat, -90.0), min(latitud + delta_lat, 90.0),
+            max(longitud - delta_lng, -180.0), min(longitud + delta_lng, 180.0))
+
+
+def _pasos(minimo, maximo, paso):
+    valores = []
+    valor = minimo
+    while valor < maximo:
+        valores.append(valor)
+        valor += paso
+    valores.append(maximo)
+    return valores
+
+
+def celdas_cubrientes(latitud, longitud, radio_km):
+    # Prefijos de geohash que cubren la caja del radio (a lo sumo ~MAX_CELDAS)
+    lat_min, lat_max, lng_min, lng_max = caja(latitud, longitud, radio_km)
+    for precision in range(PRECISION_GEOHASH, 0, -1):
+        alto, ancho = tamano_celda(precision)
+        cantidad = (math.ceil((lat_max - lat_min) / alto) + 1) * (math.ceil((lng_max - lng_min) / ancho) + 1)
+        if cantidad <= MAX_CELDAS:
+            break
+    return sorted({
+        geohash(lat, lng, precision)
+        for lat in _pasos(lat_min, lat_max, alto)
+        for lng in _pasos(lng_min, lng_max, ancho)
+    })
+
+
+def distancia_km(campo_latitud, campo_longitud, latitud, longitud):
+    # Haversine como expresión SQL
+    lat1 = Value(math.radians(latitud), output_field=FloatField())
+    lng1 = Value(math.radians(longitud), output_field=FloatField())
+    lat2 = Radians(F(campo_latitud))
+    lng2 = Radians(F(campo_longitud))
+    a = (Power(Sin((lat2 - lat1) / 2), 2)
+         + Cos(lat1) * Cos(lat2) * Power(Sin((lng2 - lng1) / 2), 2))
+    return 2 * RADIO_TIERRA_KM * ASin(Sqrt(a))
+
+
+def filtrar_por_radio(queryset, campo_zona, latitud, longitud, radio_km):
+    # campo_zona: ruta a la ZonaGeografica desde el modelo del queryset
+    # ('' si el queryset ya es de zonas). Anota 'distancia_km'.
+    prefijo = f'{campo_zona}__' if campo_zona else ''
+    campo_geohash = f'{prefijo}geohash'
+
+    en_celdas = Q()
+    for celda in celdas_cubrientes(latitud, longitud, radio_km):
+        en_celdas |= Q(**{f'{campo_geohash}__gte': celda, f'{campo_geohash}__lt': celda + '~'})
+
+    lat_min, lat_max, lng_min, lng_max = caja(latitud, longitud, radio_km)
+    return (queryset
+            .filter(en_celdas)
+            .filter(**{f'{prefijo}latitud__range': (lat_min, lat_max),
+                       f'{prefijo}longitud__range': (lng_min, lng_max)})
+            .annotate(distancia_km=distancia_km(f'{prefijo}latitud', f'{prefijo}longitud', latitud, longitud))
+            .filter(distancia_km__lte=radio_km))
+
+
+def leer_parametros_radio(query_params):
+    # Devuelve (latitud, longitud, radio_km) o None si no se pidió filtro por
+    # radio. ValueError si los parámetros están incompletos o fuera de rango.
+    radio = query_params.get('radius_km')
+    if radio in (None, ''):
+        return None
+    try:
+        radio_km = float(radio)
+        latitud = float(query_params.get('lat'))
+        longitud = float(query_params.get('lng'))
+    except (TypeError, ValueError):
+        raise ValueError("'radius_km' requiere 'lat' y 'lng' numéricos.")
+    if not (0 < radio_km <= 1000) or not (-90 <= latitud <= 90) or not (-180 <= longitud <= 180):
+        raise ValueError("'radius_km' debe estar entre 0 y 1000 y 'lat'/'lng' ser coordenadas válidas.")
+    return latitud, longitud, radio_km
@@ -0,0 +1,290 @@
+"""
+Medición de cada request: cantidad y tiempo de queries, tiempo de abrir o
+tomar del pool la conexión a la base, de serializers, de render del JSON,
+de verificación del token de Firebase y total.
+
+`InstrumentacionMiddleware` abre una `Medicion` por request (en un
+ContextVar) y cada conexión tiene un execute_wrapper que la busca ahí, así
+que también se cuentan las queries que una vista async corre en otros
+threads. El resto del código marca sus tramos con `medir('serializer')`,
+`medir('auth')`, etc., que no hacen nada fuera de un request. Al terminar:
+
+- agrega el header `Server-Timing` (lo muestran las devtools del navegador),
+- escribe una línea JSON en el logger 'reparBackend.instrumentacion':
+  WARNING si pasó REPAR_REQUEST_LENTO_MS, DEBUG si no (solo se ven con el
+  logger en DEBUG),
+- suma el request al histograma de su ruta (por nombre de url), que guarda
+  los últimos minutos en memoria del proceso y se lee en /api/metricas/.
+
+Sobre el mismo execute_wrapper corre el detector de N+1 (nplusuno.py).
+
+Los tramos pueden superponerse (un serializer que dispara queries cuenta en
+los dos). `db` es lo que tarda cada execute: con MySQL incluye traer las
+filas, con SQLite parte de esa lectura ocurre después, al iterar.
+
+El costo por request es un par de perf_counter por tramo y por query y un
+lock corto para el histograma.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .nplusuno import detector_para_request
+
+logger = logging.getLogger('reparBackend.instrumentacion')
+
+# Tramos medidos además de la base, en el orden del header
+TRAMOS = ('conexion', 'auth', 'serializer', 'render')
+# Límites superiores (ms) de las cubetas del histograma
+LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+DURACION_VENTANA = 60
+VENTANAS = 15
+
+_medicion_actual = ContextVar('medicion', default=None)
+# Tramos abiertos en este thread/tarea: los threads de una vista async copian
+# el contexto, así que cada uno ve los que abrió quien lo lanzó y no los de
+# sus hermanos
+_tramos_abiertos = ContextVar('tramos_abiertos', default=frozenset())
+
+
+class Medicion:
+
+    def __init__(self, detector=None):
+        self.detector = detector
+        self.queries = 0
+        self.db = 0.0
+        self.tramos = dict.fromkeys(TRAMOS, 0.0)
+        # Una vista async puede correr queries en varios threads a la vez
+        self._lock = threading.Lock()
+
+    def query(self, execute, sql, params, many, context):
+        if self.detector is not None:
+            self.detector.registrar(sql, params)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                self.db += duracion
+                self.queries += 1
+
+    def server_timing(self, total_ms):
+        partes = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"']
+        partes += [f'{tramo};dur={segundos * 1000:.1f}' for tramo, segundos in self.tramos.items() if segundos]
+        partes.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(partes)
+
+
+@contextmanager
+def medir(tramo):
+    # Suma al tramo el tiempo del bloque. Si el mismo tramo ya está abierto
+    # (un serializer anidado dentro de otro) solo cuenta el de afuera.
+    medicion = _medicion_actual.get()
+    abiertos = _tramos_abiertos.get()
+    if medicion is None or tramo in abiertos:
+        yield
+        return
+    token = _tramos_abiertos.set(abiertos | {tramo})
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        _tramos_abiertos.reset(token)
+        with medicion._lock:
+            medicion.tramos[tramo] += duracion
+
+
+class Ventana:
+    __slots__ = ('minuto', 'cantidad', 'errores', 'cubetas', 'maximo', 'total', 'db', 'queries', 'tramos')
+
+    def __init__(self, minuto):
+        self.minuto = minuto
+        self.cantidad = 0
+        self.errores = 0
+        self.cubetas = [0] * (len(LIMITES_MS) + 1)
+        self.maximo = 0.0
+        self.total = 0.0
+        self.db = 0.0
+        self.queries = 0
+        self.tramos = dict.fromkeys(TRAMOS, 0.0)
+
+
+def _cubeta(ms):
+    for i, limite in enumerate(LIMITES_MS):
+        if ms <= limite:
+            return i
+    return len(LIMITES_MS)
+
+
+class Histogramas:
+    # Por ruta, una Ventana por minuto de los últimos VENTANAS minutos
+
+    def __init__(self, duracion_ventana=DURACION_VENTANA, ventanas=VENTANAS):
+        self.duracion_ventana = duracion_ventana
+        self.ventanas = ventanas
+        self._rutas = {}
+        self._lock = threading.Lock()
+
+    def _minuto(self):
+        return int(time.monotonic() // self.duracion_ventana)
+
+    def registrar(self, ruta, total_ms, medicion, status_code):
+        minuto = self._minuto()
+        with self._lock:
+            ventanas = self._rutas.get(ruta)
+            if ventanas is None:
+                ventanas = self._rutas[ruta] = deque(maxlen=self.ventanas)
+            if not ventanas or ventanas[-1].minuto != minuto:
+                ventanas.append(Ventana(minuto))
+            ventana = ventanas[-1]
+            ventana.cantidad += 1
+            ventana.errores += status_code >= 500
+            ventana.cubetas[_cubeta(total_ms)] += 1
+            ventana.maximo = max(ventana.maximo, total_ms)
+            ventana.total += total_ms
+            ventana.db += medicion.db * 1000
+            ventana.queries += medicion.queries
+            for tramo, segundos in medicion.tramos.items():
+                ventana.tramos[tramo] += segundos * 1000
+
+    def resumen(self, minutos=None):
+        # Estadísticas por ruta de los últimos `minutos` (todas las ventanas
+        # guardadas si es None). Los percentiles son el límite superior de
+        # la cubeta en la que caen.
+        minutos = self.ventanas if minutos is None else max(1, min(minutos, self.ventanas))
+        desde = self._minuto() - minutos + 1
+        with self._lock:
+            ventanas_por_ruta = {ruta: [v for v in ventanas if v.minuto >= desde]
+                                 for ruta, ventanas in self._rutas.items()}
+
+        rutas = {}
+        for ruta, ventanas in ventanas_por_ruta.items():
+            cantidad = sum(v.cantidad for v in ventanas)
+            if not cantidad:
+                continue
+            cubetas = [sum(c) for c in zip(*(v.cubetas for v in ventanas))]
+            maximo = max(v.maximo for v in ventanas)
+            rutas[ruta] = {
+                'cantidad': cantidad,
+                'errores_5xx': sum(v.errores for v in ventanas),
+                'p50_ms': _percentil(cubetas, cantidad, 0.50, maximo),
+                'p95_ms': _percentil(cubetas, cantidad, 0.95, maximo),
+                'p99_ms': _percentil(cubetas, cantidad, 0.99, maximo),
+                'max_ms': round(maximo, 1),
+                'media_ms': round(sum(v.total for v in ventanas) / cantidad, 1),
+                'db_media_ms': round(sum(v.db for v in ventanas) / cantidad, 1),
+                'queries_media': round(sum(v.queries for v in ventanas) / cantidad, 1),
+                **{f'{tramo}_media_ms': round(sum(v.tramos[tramo] for v in ventanas) / cantidad, 1) for tramo in TRAMOS},
+            }
+        # Primero las rutas que más tiempo total se llevan
+        rutas = dict(sorted(rutas.items(), key=lambda item: -item[1]['media_ms'] * item[1]['cantidad']))
+        return {'minutos': minutos, 'rutas': rutas}
+
+
+def _percentil(cubetas, cantidad, p, maximo):
+    acumulado = 0
+    for i, n in enumerate(cubetas):
+        acumulado += n
+        if acumulado >= p * cantidad:
+            return min(LIMITES_MS[i], round(maximo, 1)) if i < len(LIMITES_MS) else round(maximo, 1)
+    return round(maximo, 1)
+
+
+histogramas = Histogramas()
+
+
+def _medir_query(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion.query(execute, sql, params, many, context)
+
+
+def instalar(connection, **kwargs):
+    # Engancha _medir_query en la conexión (cada thread tiene las suyas) una
+    # sola vez: connection_created se repite en cada reconexión. Va primero
+    # en la lista porque los execute_wrapper() temporales sacan el último.
+    if _medir_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _medir_query)
+
+
+connection_created.connect(instalar)
+
+
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Las conexiones que ya estaban abiertas antes de conectar la señal
+        for alias in connections:
+            instalar(connections[alias])
+        self.server_timing = getattr(settings, 'REPAR_SERVER_TIMING', True)
+        self.lento_ms = getattr(settings, 'REPAR_REQUEST_LENTO_MS', 1000)
+        self.nplusuno = (
+            getattr(settings, 'REPAR_NPLUSUNO', 'muestreo'),
+            getattr(settings, 'REPAR_NPLUSUNO_MUESTREO', 0.05),
+            getattr(settings, 'REPAR_NPLUSUNO_UMBRAL', 5),
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion(detector_para_request(*self.nplusuno))
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return self.registrar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion(detector_para_request(*self.nplusuno))
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return self.registrar(request, response, medicion, inicio)
+
+    def registrar(self, request, response, medicion, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        match = request.resolver_match
+        ruta = match.view_name if match is not None else '(sin ruta)'
+        histogramas.registrar(ruta, total_ms, medicion, response.status_code)
+        if self.server_timing:
+            response['Server-Timing'] = medicion.server_timing(total_ms)
+        if medicion.detector is not None:
+            medicion.detector.informar(request, ruta, response.status_code)
+
+        nivel = logging.WARNING if total_ms >= self.lento_ms else logging.DEBUG
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, json.dumps({
+                'metodo': request.method,
+                'ruta': ruta,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(medicion.db * 1000, 1),
+                'queries': medicion.queries,
+                **{f'{tramo}_ms': round(segundos * 1000, 1) for tramo, segundos in medicion.tramos.items()},
+            }))
+        return response
@@ -0,0 +1,347 @@
+"""
+Recorre todas las rutas GET de urls.py con el cliente de pruebas de Django y
+mide, por cada caso, la latencia (p50/p95/p99), la cantidad de queries y el
+tamaño de la respuesta. El resultado se guarda en JSON junto con el commit,
+la base y los volúmenes, para comparar dos corridas entre commits.
+
+Cada request pasa por el detector de N+1 (nplusuno.py) y lo que encuentra
+queda en el resultado de la ruta; con --estricto el comando falla si hay
+alguno.
+
+Conviene correrlo sobre datos de sembrar_datos. Los listados se miden
+paginados (?page_size=20) y con los filtros que usa el frontend; los
+listados completos solo con --completos.
+
+    python manage.py benchmark_api --salida bench.json
+    python manage.py benchmark_api --rutas trabajo- --repeticiones 50
+    python manage.py benchmark_api --salida nuevo.json --comparar bench.json
+"""
+
+import json
+import logging
+import platform
+import random
+import re
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+from reparBackend.instrumentacion import TRAMOS as TRAMOS_INSTRUMENTACION
+from reparBackend.models import (
+    CalificacionContratador,
+    CalificacionTrabajador,
+    Contratador,
+    Estado,
+    Postulacion,
+    Profesion,
+    Trabajador,
+    TrabajadoresProfesion,
+    Trabajo,
+    ZonaGeografica,
+)
+
+# Modelo del <int:id> de cada ruta de detalle
+MODELOS_DETALLE = {
+    'zona-detalle': ZonaGeografica,
+    'profesion-detalle': Profesion,
+    'estado-detalle': Estado,
+    'contratador-detalle': Contratador,
+    'contratador-reputacion': Contratador,
+    'trabajador-detalle': Trabajador,
+    'trabajador-reputacion': Trabajador,
+    'trabajador-feed': Trabajador,
+    'trabajo-detalle': Trabajo,
+    'postulacion-detalle': Postulacion,
+    'calif-trabajador-detalle': CalificacionTrabajador,
+    'calif-contratador-detalle': CalificacionContratador,
+    'trabajador-profesion-detalle': TrabajadoresProfesion,
+}
+
+# Query strings por ruta. {Modelo} se reemplaza por un id existente de ese
+# modelo, {ids_Modelo} por varios separados por comas y {uid} por el
+# uid_firebase de un contratador. Las rutas de listado
+# que no están acá se miden con ?page_size=20 y las de detalle sin parámetros.
+CASOS = {
+    'profesion-lista': ['', '?page_size=20'],
+    'estado-lista': [''],
+    'contratador-lista': ['?page_size=20', '?uid_firebase={uid}', '?ids={ids_Contratador}'],
+    'trabajador-lista': [
+        '?page_size=20',
+        '?uid_firebase={uid}',
+        '?lat=-31.42&lng=-64.19&radius_km=10&page_size=20',
+        '?ids={ids_Trabajador}',
+    ],
+    'trabajador-feed': ['', '?page_size=20'],
+    'trabajo-lista': [
+        '?page_size=20',
+        '?id_estado=1,2&page_size=20',
+        '?profesiones=1,2,5&id_estado=1&page_size=20',
+        '?id_contratador={Contratador}',
+        '?lat=-31.42&lng=-64.19&radius_km=10&page_size=20',
+        '?fields=id_trabajo,titulo,estado&page_size=20',
+        '?ids={ids_Trabajo}',
+    ],
+    'trabajo-detalle': ['', '?fields=titulo,contratador.nombre'],
+    'trabajo-busqueda': ['?q=perdida de agua', '?q=pintar rejas&id_estado=1', '?q=instalar&offset=100'],
+    'trabajo-tarjetas': [
+        '?page_size=20',
+        '?id_estado=1,2&page_size=20',
+        '?profesiones=1,2,5&id_estado=1&page_size=20',
+        '?id_contratador={Contratador}',
+        '?id_trabajador={Trabajador}',
+    ],
+    'postulacion-lista': ['?page_size=20', '?id_trabajo={Trabajo}', '?id_trabajador={Trabajador}&page_size=20',
+                          '?ids={ids_Postulacion}'],
+    'postulacion-tarjetas': ['?id_trabajador={Trabajador}&page_size=20', '?id_trabajo={Trabajo}'],
+    'calificaciones-general': [''],
+    'calif-trabajador-lista': ['?page_size=20', '?id_trabajador={Trabajador}'],
+    'calif-contratador-lista': ['?page_size=20', '?id_contratador={Contratador}'],
+    'trabajador-profesion-lista': ['?page_size=20', '?id_trabajador={Trabajador}', '?id_profesion=2&page_size=20'],
+}
+
+TRAMOS = ('db', *TRAMOS_INSTRUMENTACION)
+
+MODELOS_MUESTRA = [ZonaGeografica, Profesion, Estado, Contratador, Trabajador, TrabajadoresProfesion, Trabajo,
+                   Postulacion, CalificacionTrabajador, CalificacionContratador]
+
+
+_DURACION_RE = re.compile(r'dur=([\d.]+)')
+_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def leer_server_timing(valor):
+    # 'db;dur=1.2;desc="3 queries", total;dur=4.0' -> {'db': 1.2, 'total': 4.0}
+    tramos = {}
+    for parte in (valor or '').split(','):
+        nombre, _, resto = parte.strip().partition(';')
+        duracion = _DURACION_RE.search(resto)
+        if duracion:
+            tramos[nombre] = float(duracion.group(1))
+    return tramos
+
+
+def queries_de_server_timing(valor):
+    # Las cuenta el middleware en todos los threads del request (una vista
+    # async corre sus queries fuera del thread del cliente de pruebas)
+    match = _QUERIES_RE.search(valor or '')
+    return int(match.group(1)) if match else 0
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rutas_get():
+    # (nombre, patrón, tiene id, vista) de las rutas de la app con método get;
+    # el admin (URLResolver) queda afuera
+    for patron in get_resolver().url_patterns:
+        if not isinstance(patron, URLPattern):
+            continue
+        vista = getattr(patron.callback, 'view_class', None)
+        if vista is not None and hasattr(vista, 'get'):
+            yield patron.name, str(patron.pattern), 'id' in patron.pattern.converters, vista
+
+
+class CapturaNPlusUno(logging.Handler):
+    # Hallazgos del detector de N+1 del caso que se está midiendo, uno por query
+
+    def __init__(self):
+        super().__init__()
+        self.hallazgos = {}
+
+    def emit(self, record):
+        datos = getattr(record, 'nplusuno', None)
+        if datos is not None:
+            self.hallazgos[datos['sql']] = {clave: datos[clave] for clave in ('sql', 'veces', 'origen')}
+
+
+class Command(BaseCommand):
+    help = "Mide latencia, queries y bytes de todas las rutas GET de la API y guarda el resultado en JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--calentamiento', type=int, default=2)
+        parser.add_argument('--rutas', nargs='*', default=[],
+                            help="Solo las rutas cuyo nombre empieza con alguno de estos prefijos.")
+        parser.add_argument('--completos', action='store_true',
+                            help="Medir también los listados sin paginar (pueden ser de cientos de miles de filas).")
+        parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior para mostrar las diferencias.")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--estricto', action='store_true', help="Fallar si alguna ruta tiene consultas N+1.")
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError("--repeticiones tiene que ser al menos 1.")
+        anterior = self.leer_anterior(options['comparar']) if options['comparar'] else None
+
+        azar = random.Random(options['semilla'])
+        muestras = {modelo.__name__: self.muestrear(modelo, options['repeticiones'], azar) for modelo in MODELOS_MUESTRA}
+        muestras['uid'] = list(Contratador.objects.filter(pk__in=muestras['Contratador'])
+                               .exclude(uid_firebase=None).values_list('uid_firebase', flat=True)) or ['-']
+
+        # Sin la línea de log de cada request (ver instrumentacion.py)
+        logging.getLogger('reparBackend.instrumentacion').setLevel(logging.ERROR)
+        # Los N+1 se juntan acá en lugar de ir a la consola
+        logger_nplusuno = logging.getLogger('reparBackend.nplusuno')
+        handlers = logger_nplusuno.handlers
+        self.nplusuno = CapturaNPlusUno()
+        logger_nplusuno.handlers = [self.nplusuno]
+        # El cliente de pruebas manda Host: testserver
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                                   REPAR_NPLUSUNO='muestreo', REPAR_NPLUSUNO_MUESTREO=1.0):
+                resultados, omitidas = self.medir_rutas(muestras, anterior, options)
+        finally:
+            logger_nplusuno.handlers = handlers
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'commit': commit_actual(),
+            'base': connection.vendor,
+            'python': platform.python_version(),
+            'repeticiones': options['repeticiones'],
+            'volumenes': {modelo.__name__: modelo.objects.count() for modelo in MODELOS_MUESTRA},
+            'resultados': resultados,
+            'omitidas': omitidas,
+        }
+        for omitida in omitidas:
+            self.stdout.write(self.style.WARNING(f"  omitida {omitida['ruta']}: {omitida['motivo']}"))
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+        con_nplusuno = [r for r in resultados if r['nplusuno']]
+        for resultado in con_nplusuno:
+            for hallazgo in resultado['nplusuno']:
+                self.stdout.write(self.style.ERROR(
+                    f"  N+1 en {resultado['ruta']}{resultado['consulta']}: {hallazgo['veces']} veces desde "
+                    f"{' <- '.join(hallazgo['origen'])}\n      {hallazgo['sql'][:200]}"
+                ))
+        if con_nplusuno and options['estricto']:
+            raise CommandError(f"{len(con_nplusuno)} casos con consultas N+1.")
+
+    def medir_rutas(self, muestras, anterior, options):
+        resultados, omitidas = [], []
+        cliente = Client()
+        for nombre, patron, con_id, vista in rutas_get():
+            if options['rutas'] and not nombre.startswith(tuple(options['rutas'])):
+                continue
+            if IsAdminUser in vista.permission_classes:
+                omitidas.append({'ruta': nombre, 'motivo': "solo para staff"})
+                continue
+            if IsAuthenticated in vista.permission_classes:
+                omitidas.append({'ruta': nombre, 'motivo': "requiere un usuario de Firebase"})
+                continue
+            if con_id and nombre not in MODELOS_DETALLE:
+                omitidas.append({'ruta': nombre, 'motivo': "sin modelo para el id en MODELOS_DETALLE"})
+                continue
+            if con_id and not muestras[MODELOS_DETALLE[nombre].__name__]:
+                omitidas.append({'ruta': nombre, 'motivo': "no hay filas para elegir un id"})
+                continue
+            consultas = list(CASOS.get(nombre, [''] if con_id else ['?page_size=20']))
+            # Solo los listados paginables tienen versión completa
+            if options['completos'] and '?page_size=20' in consultas and '' not in consultas:
+                consultas.insert(0, '')
+            for consulta in consultas:
+                resultado = self.medir(cliente, nombre, patron, consulta, con_id, muestras, options)
+                resultados.append(resultado)
+                self.mostrar(resultado, anterior)
+        return resultados, omitidas
+
+    def leer_anterior(self, ruta):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                informe = json.load(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer {ruta}: {e}")
+        self.stdout.write(f"Comparando con {informe.get('commit')} del {informe.get('fecha')}")
+        return {(r['ruta'], r['consulta']): r for r in informe['resultados']}
+
+    def muestrear(self, modelo, cantidad, azar):
+        # Ids existentes repartidos en todo el rango de la tabla
+        rango = modelo.objects.aggregate(minimo=Min('pk'), maximo=Max('pk'))
+        if rango['minimo'] is None:
+            return []
+        ids = set()
+        for _ in range(cantidad):
+            desde = azar.randint(rango['minimo'], rango['maximo'])
+            ids.add(modelo.objects.filter(pk__gte=desde).order_by('pk').values_list('pk', flat=True).first())
+        return sorted(ids)
+
+    def armar_url(self, patron, consulta, con_id, modelo_id, muestras, i):
+        valores = {nombre: ids[i % len(ids)] for nombre, ids in muestras.items() if ids}
+        # ?ids= con todas las muestras del modelo
+        valores.update({f'ids_{nombre}': ','.join(map(str, ids)) for nombre, ids in muestras.items() if ids})
+        url = '/' + patron
+        if con_id:
+            url = url.replace('<int:id>', str(valores[modelo_id]))
+        return url + consulta.format(**valores)
+
+    def medir(self, cliente, nombre, patron, consulta, con_id, muestras, options):
+        modelo_id = MODELOS_DETALLE[nombre].__name__ if con_id else None
+        for i in range(options['calentamiento']):
+            cliente.get(self.armar_url(patron, consulta, con_id, modelo_id, muestras, i))
+
+        self.nplusuno.hallazgos = {}
+        tiempos, queries, tamanos, estados = [], [], [], set()
+        tramos = {tramo: [] for tramo in TRAMOS}
+        for i in range(options['repeticiones']):
+            url = self.armar_url(patron, consulta, con_id, modelo_id, muestras, i)
+            inicio = time.perf_counter()
+            respuesta = cliente.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            queries.append(queries_de_server_timing(respuesta.get('Server-Timing')))
+            tamanos.append(len(respuesta.content))
+            estados.add(respuesta.status_code)
+            server_timing = leer_server_timing(respuesta.get('Server-Timing'))
+            for tramo, valores in tramos.items():
+                valores.append(server_timing.get(tramo, 0.0))
+
+        return {
+            'ruta': nombre,
+            'consulta': consulta,
+            'ejemplo': url,
+            'estados': sorted(estados),
+            'p50_ms': round(percentil(tiempos, 50), 2),
+            'p95_ms': round(percentil(tiempos, 95), 2),
+            'p99_ms': round(percentil(tiempos, 99), 2),
+            'media_ms': round(statistics.fmean(tiempos), 2),
+            'max_ms': round(max(tiempos), 2),
+            'queries': max(queries),
+            'bytes': int(statistics.median(tamanos)),
+            # Mediana de cada tramo según el header Server-Timing
+            **{f'{tramo}_p50_ms': round(percentil(valores, 50), 2) for tramo, valores in tramos.items()},
+            'nplusuno': list(self.nplusuno.hallazgos.values()),
+        }
+
+    def mostrar(self, resultado, anterior):
+        linea = (f"  {resultado['ruta'] + resultado['consulta']:<70.70} {','.join(map(str, resultado['estados'])):>7} "
+                 f"p50 {resultado['p50_ms']:8.2f} ms  p95 {resultado['p95_ms']:8.2f} ms  "
+                 f"{resultado['queries']:>3} q  db {resultado['db_p50_ms']:7.2f} ms  "
+                 f"ser {resultado['serializer_p50_ms']:7.2f} ms  {resultado['bytes'] / 1024:8.1f} KB")
+        previo = anterior.get((resultado['ruta'], resultado['consulta'])) if anterior else None
+        if previo:
+            linea += (f"   antes p50 {previo['p50_ms']:8.2f} ms ({resultado['p50_ms'] / max(previo['p50_ms'], 0.01):.2f}x)"
+                      f" {previo['queries']:>3} q")
+        estilo = self.style.WARNING if any(e >= 400 for e in resultado['estados']) else str
+        self.stdout.write(estilo(linea))
@@ -0,0 +1,95 @@
+"""
+Mide cuánto tarda en arrancar un proceso nuevo con esta configuración, y de
+qué módulos sale ese tiempo (`python -X importtime`). Cada escenario corre
+--veces en un intérprete nuevo y se informa la mediana:
+
+- setup: `django.setup()`, lo que paga cualquier comando de manage.py y el
+  runner de tests antes de empezar.
+- worker: además carga la aplicación WSGI y las urls (con todas las
+  vistas), como un worker de gunicorn antes de su primer request.
+- firebase_admin: setup más la app de firebase_admin (firebase.py), que
+  antes se inicializaba en settings.py en cada arranque.
+
+    python manage.py benchmark_arranque
+    python manage.py benchmark_arranque --veces 10 --modulos 20
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ESCENARIOS = {
+    'setup': "import django; django.setup()",
+    'worker': (
+        "from django.core.wsgi import get_wsgi_application; get_wsgi_application(); "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    'firebase_admin': (
+        "import django; django.setup(); "
+        "from reparBackend.firebase import FirebaseAdmin; FirebaseAdmin().app()"
+    ),
+}
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def correr(codigo):
+    # (segundos de pared del proceso, líneas de -X importtime)
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=settings.BASE_DIR,
+                             env=entorno, capture_output=True, text=True)
+    segundos = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        return segundos, None, proceso.stderr.strip().splitlines()[-1:]
+    return segundos, [linea for linea in proceso.stderr.splitlines() if linea.startswith('import time:')], None
+
+
+def por_paquete(lineas):
+    # Tiempo propio (sin los imports anidados) sumado por paquete de primer
+    # nivel, en ms
+    paquetes = {}
+    for linea in lineas:
+        match = _IMPORTTIME_RE.match(linea)
+        if match:
+            paquete = match.group(4).split('.')[0]
+            paquetes[paquete] = paquetes.get(paquete, 0) + int(match.group(1)) / 1000
+    return paquetes
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque de un proceso nuevo (django.setup, worker WSGI) y los módulos que más tardan en importarse."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenarios', nargs='*', default=list(ESCENARIOS), choices=list(ESCENARIOS))
+        parser.add_argument('--veces', type=int, default=5)
+        parser.add_argument('--modulos', type=int, default=12, help="Paquetes a mostrar en el perfil de imports.")
+
+    def handle(self, *args, **options):
+        # Lo que tarda el intérprete solo, para restarlo a mano si hace falta
+        base = statistics.median(correr('pass')[0] for _ in range(options['veces']))
+        self.stdout.write(f"python vacío: {base * 1000:.0f} ms")
+        for nombre in options['escenarios']:
+            tiempos, perfil = [], None
+            for _ in range(options['veces']):
+                segundos, lineas, error = correr(ESCENARIOS[nombre])
+                if error is not None:
+                    break
+                tiempos.append(segundos)
+                perfil = lineas
+            if error is not None:
+                self.stdout.write(f"{nombre:<16}falló: {' '.join(error)}")
+                continue
+            paquetes = por_paquete(perfil)
+            self.stdout.write(
+                f"{nombre:<16}{statistics.median(tiempos) * 1000:6.0f} ms  (min {min(tiempos) * 1000:.0f}, "
+                f"imports {sum(paquetes.values()):.0f} ms, {len(perfil)} módulos)"
+            )
+            for paquete, ms in sorted(paquetes.items(), key=lambda item: -item[1])[:options['modulos']]:
+                self.stdout.write(f"    {paquete:<28}{ms:7.1f} ms")
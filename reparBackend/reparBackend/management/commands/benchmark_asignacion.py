@@ -0,0 +1,135 @@
+"""
+Prueba de carga de las postulaciones y de la asignación de trabajos
+(transiciones.py). En cada ronda crea un trabajo publicado y, con --hilos
+threads que arrancan a la vez (una barrera) y mandan los requests por el
+WSGIHandler de Django:
+
+1. cada trabajador se postula dos veces: tiene que quedar una postulación
+   por trabajador (201) y la repetida rechazada (400);
+2. cada trabajador intenta que lo acepten (PATCH id_estado=3 con su
+   id_trabajador): tiene que haber un solo 200, el resto 409, y el trabajo
+   tiene que quedar asignado a ese.
+
+Informa las latencias de cada fase y falla si en alguna ronda no se cumple.
+Los trabajos creados se borran al final. Conviene correrlo sobre datos de
+sembrar_datos (hacen falta al menos --hilos trabajadores).
+
+    python manage.py benchmark_asignacion
+    python manage.py benchmark_asignacion --hilos 32 --rondas 50
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.utils import timezone
+
+from reparBackend.management.commands.benchmark_concurrencia import pedir_wsgi, percentil
+from reparBackend.models import (
+    ESTADO_ACTIVO,
+    ESTADO_PUBLICADO,
+    Contratador,
+    Postulacion,
+    Profesion,
+    Trabajador,
+    Trabajo,
+    ZonaGeografica,
+)
+
+
+class Command(BaseCommand):
+    help = "Postulaciones y aceptaciones concurrentes sobre el mismo trabajo: verifica que quede un solo trabajador asignado."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=16)
+        parser.add_argument('--rondas', type=int, default=20)
+
+    def handle(self, *args, **options):
+        hilos = options['hilos']
+        trabajadores = list(Trabajador.objects.order_by('pk').values_list('pk', 'id_contratador'))
+        contratador = Contratador.objects.order_by('pk').values_list('pk', flat=True).first()
+        profesion = Profesion.objects.values_list('pk', flat=True).first()
+        zona = ZonaGeografica.objects.values_list('pk', flat=True).first()
+        if contratador is None or profesion is None or zona is None:
+            raise CommandError("Faltan datos: correr antes sembrar_datos.")
+        # Que nadie se postule a su propio trabajo
+        trabajadores = [pk for pk, dueño in trabajadores if dueño != contratador][:hilos]
+        if len(trabajadores) < hilos:
+            raise CommandError(f"Hacen falta {hilos} trabajadores y hay {len(trabajadores)}.")
+
+        aplicacion = get_wsgi_application()
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        logging.getLogger('reparBackend.instrumentacion').setLevel(logging.ERROR)
+
+        creados = []
+        fases = {'postular': ([], {}), 'aceptar': ([], {})}
+        fallas = []
+        try:
+            for ronda in range(options['rondas']):
+                trabajo = Trabajo.objects.create(
+                    id_contratador_id=contratador, id_profesion_requerida_id=profesion,
+                    id_zona_geografica_trabajo_id=zona, id_estado_id=ESTADO_PUBLICADO,
+                    titulo="benchmark_asignacion", descripcion="Trabajo de prueba de benchmark_asignacion.",
+                    fecha_creacion=timezone.now(),
+                )
+                creados.append(trabajo.pk)
+
+                postular = [('POST', '/api/postulaciones/', {'id_trabajo': trabajo.pk, 'id_trabajador': pk}, False)
+                            for pk in trabajadores for _ in range(2)]
+                estados = self.a_la_vez(aplicacion, postular, hilos, *fases['postular'])
+                postulaciones = Postulacion.objects.filter(id_trabajo=trabajo.pk).count()
+                if estados.count(201) != hilos or estados.count(400) != hilos or postulaciones != hilos:
+                    fallas.append(f"ronda {ronda}: postular -> {self.resumen(estados)}, {postulaciones} postulaciones")
+
+                aceptar = [('PATCH', f'/api/trabajos/{trabajo.pk}/', {'id_estado': ESTADO_ACTIVO, 'id_trabajador': pk}, False)
+                           for pk in trabajadores]
+                estados = self.a_la_vez(aplicacion, aceptar, hilos, *fases['aceptar'])
+                trabajo.refresh_from_db()
+                ganador = [pk for pk, estado in zip(trabajadores, estados) if estado == 200]
+                if estados.count(200) != 1 or estados.count(409) != hilos - 1 or trabajo.id_trabajador_id not in ganador:
+                    fallas.append(f"ronda {ronda}: aceptar -> {self.resumen(estados)}, asignado {trabajo.id_trabajador_id}")
+        finally:
+            Trabajo.objects.filter(pk__in=creados).delete()
+
+        self.stdout.write(f"{options['rondas']} rondas, {hilos} hilos sobre el mismo trabajo")
+        for nombre, (latencias, contador) in fases.items():
+            self.stdout.write(
+                f"{nombre:<10}{len(latencias):6d} requests  p50 {percentil(latencias, 50):7.1f} ms  "
+                f"p95 {percentil(latencias, 95):7.1f} ms  max {max(latencias):7.1f} ms  {self.resumen(contador)}"
+            )
+        if fallas:
+            raise CommandError("\n".join(fallas))
+        self.stdout.write("Sin postulaciones repetidas y un solo trabajador aceptado en cada ronda.")
+
+    def a_la_vez(self, aplicacion, rutas, hilos, latencias, contador):
+        # Reparte las rutas entre los hilos y las larga todas juntas;
+        # devuelve los status en el orden de `rutas`
+        estados = [None] * len(rutas)
+        barrera = threading.Barrier(hilos)
+        lock = threading.Lock()
+
+        def worker(indice):
+            barrera.wait()
+            try:
+                for i in range(indice, len(rutas), hilos):
+                    inicio = time.perf_counter()
+                    estado, _ = pedir_wsgi(aplicacion, rutas[i])
+                    with lock:
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+                        contador[estado] = contador.get(estado, 0) + 1
+                    estados[i] = estado
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(hilos) as pool:
+            list(pool.map(worker, range(hilos)))
+        return estados
+
+    def resumen(self, estados):
+        if isinstance(estados, dict):
+            return ', '.join(f"{estado}: {n}" for estado, n in sorted(estados.items()))
+        return self.resumen({estado: estados.count(estado) for estado in set(estados)})
@@ -0,0 +1,118 @@
+"""
+Mide la búsqueda de trabajos por texto (busqueda.buscar) sobre trabajos
+sintéticos, con y sin filtro por estado.
+
+Los datos se crean dentro de una transacción que se revierte al final, así
+que se puede correr contra la base de desarrollo sin dejar datos.
+
+    python manage.py benchmark_busqueda
+    python manage.py benchmark_busqueda --trabajos 1000000 --consultas 200
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reparBackend.busqueda import buscar, reconstruir
+from reparBackend.models import Contratador, Estado, Profesion, Trabajo, ZonaGeografica
+
+PROFESIONES = ['Plomería', 'Electricidad', 'Gas', 'Pintura', 'Albañilería', 'Carpintería', 'Herrería', 'Jardinería']
+PALABRAS = """
+    arreglo reparación instalación cambio pérdida caño canilla inodoro termotanque calefón enchufe tablero
+    cable luz lámpara ventilador pared techo humedad grieta pintura rejas puerta ventana mueble placard
+    cerámica piso baño cocina patio pileta pasto poda árbol urgente presupuesto mañana tarde semana
+    departamento casa local oficina edificio terraza balcón medianera revoque membrana filtración goteo
+""".split()
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de la búsqueda de trabajos por texto."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabajos', type=int, default=1000000)
+        parser.add_argument('--consultas', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.medir(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def texto(self, azar, vocabulario, cantidad):
+        # Frecuencias tipo Zipf: pocas palabras muy comunes y muchas raras
+        return ' '.join(vocabulario[min(int(azar.paretovariate(1.0)) - 1, len(vocabulario) - 1)]
+                        for _ in range(cantidad))
+
+    def crear_trabajos(self, options, azar, vocabulario):
+        zona = ZonaGeografica.objects.create(calle="Bench", ciudad="Bench", provincia="Bench")
+        contratador = Contratador.objects.create(
+            id_zona_geografica_contratador=zona, nombre="Bench", apellido="Bench",
+            email_contratador="bench@repar.ar", telefono_contratador=0, dni=0, uid_firebase="benchmark-busqueda",
+        )
+        profesiones = [Profesion.objects.create(nombre_profesion=f"{nombre} bench") for nombre in PROFESIONES]
+        estados = list(Estado.objects.all()[:7]) or [Estado.objects.create(descripcion="Publicado")]
+        ahora = timezone.now()
+
+        lote = []
+        for i in range(options['trabajos']):
+            lote.append(Trabajo(
+                id_contratador=contratador, id_zona_geografica_trabajo=zona,
+                id_profesion_requerida=azar.choice(profesiones), id_estado=azar.choice(estados),
+                titulo=self.texto(azar, vocabulario, 4)[:50], descripcion=self.texto(azar, vocabulario, 25)[:500],
+                fecha_creacion=ahora,
+            ))
+            if len(lote) >= options['batch_size']:
+                Trabajo.objects.bulk_create(lote)
+                lote = []
+        Trabajo.objects.bulk_create(lote)
+        return estados
+
+    def medir(self, options):
+        azar = random.Random(options['semilla'])
+        vocabulario = PALABRAS + [f"termino{i}" for i in range(20000)]
+
+        inicio = time.perf_counter()
+        estados = self.crear_trabajos(options, azar, vocabulario)
+        self.stdout.write(f"{options['trabajos']} trabajos creados en {time.perf_counter() - inicio:.1f}s "
+                          f"({connection.vendor}).")
+        inicio = time.perf_counter()
+        reconstruir(batch_size=options['batch_size'])
+        self.stdout.write(f"Índice reconstruido en {time.perf_counter() - inicio:.1f}s.")
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        consultas = [
+            ' '.join(azar.choice(vocabulario[:500]) for _ in range(azar.randint(1, 3)))
+            for _ in range(options['consultas'])
+        ]
+        casos = (
+            ('sin filtros', {}),
+            ('con id_estado', {'estados': [estados[0].pk]}),
+        )
+        for nombre, filtros in casos:
+            tiempos = []
+            for consulta in consultas:
+                inicio = time.perf_counter()
+                buscar(consulta, **filtros)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            self.stdout.write(
+                f"  {nombre:<15} p50 {percentil(tiempos, 50):8.2f} ms   "
+                f"p95 {percentil(tiempos, 95):8.2f} ms   p99 {percentil(tiempos, 99):8.2f} ms"
+            )
@@ -0,0 +1,111 @@
+"""
+Mide la búsqueda por radio (geo.filtrar_por_radio) contra un recorrido
+completo con haversine sobre zonas sintéticas repartidas en Argentina.
+
+Las zonas se crean dentro de una transacción que se revierte al final, así
+que se puede correr contra la base de desarrollo sin dejar datos.
+
+    python manage.py benchmark_cercania
+    python manage.py benchmark_cercania --zonas 100000 --consultas 200 --radio 10
+"""
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from reparBackend.geo import distancia_km, filtrar_por_radio, geohash
+from reparBackend.models import ZonaGeografica
+
+# Caja aproximada de Argentina continental
+LATITUD = (-55.0, -22.0)
+LONGITUD = (-73.5, -53.6)
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Compara la búsqueda por radio con geohash contra un recorrido completo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zonas', type=int, default=100000)
+        parser.add_argument('--consultas', type=int, default=200)
+        parser.add_argument('--radio', type=float, default=10.0, help="Radio en km.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.medir(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def crear_zonas(self, cantidad, batch_size, azar):
+        zonas = []
+        for i in range(cantidad):
+            latitud = azar.uniform(*LATITUD)
+            longitud = azar.uniform(*LONGITUD)
+            zonas.append(ZonaGeografica(
+                calle=f"Calle {i}", ciudad="Bench", provincia="Bench",
+                clave=ZonaGeografica.calcular_clave(f"Calle {i}", "Bench", "Bench"),
+                latitud=latitud, longitud=longitud, geohash=geohash(latitud, longitud),
+            ))
+        ZonaGeografica.objects.bulk_create(zonas, batch_size=batch_size)
+
+    def cronometrar(self, consulta, centros):
+        tiempos = []
+        resultados = []
+        for latitud, longitud in centros:
+            inicio = time.perf_counter()
+            resultados.append(consulta(latitud, longitud))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos, resultados
+
+    def medir(self, options):
+        azar = random.Random(options['semilla'])
+        radio = options['radio']
+
+        inicio = time.perf_counter()
+        self.crear_zonas(options['zonas'], options['batch_size'], azar)
+        self.stdout.write(f"{options['zonas']} zonas creadas en {time.perf_counter() - inicio:.1f}s "
+                          f"({connection.vendor}).")
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        centros = [(azar.uniform(*LATITUD), azar.uniform(*LONGITUD)) for _ in range(options['consultas'])]
+
+        def con_geohash(latitud, longitud):
+            zonas = filtrar_por_radio(ZonaGeografica.objects.all(), '', latitud, longitud, radio)
+            return list(zonas.order_by('distancia_km', 'pk').values_list('pk', flat=True))
+
+        def recorrido_completo(latitud, longitud):
+            zonas = (ZonaGeografica.objects
+                     .annotate(distancia_km=distancia_km('latitud', 'longitud', latitud, longitud))
+                     .filter(distancia_km__lte=radio))
+            return list(zonas.order_by('distancia_km', 'pk').values_list('pk', flat=True))
+
+        tiempos_geohash, resultados_geohash = self.cronometrar(con_geohash, centros)
+        tiempos_completo, resultados_completo = self.cronometrar(recorrido_completo, centros)
+
+        if resultados_geohash != resultados_completo:
+            self.stderr.write(self.style.ERROR("Los resultados con geohash no coinciden con el recorrido completo."))
+
+        encontrados = statistics.mean(len(r) for r in resultados_geohash)
+        self.stdout.write(f"Radio {radio} km, {len(centros)} consultas, {encontrados:.1f} zonas por consulta.")
+        for nombre, tiempos in (('geohash', tiempos_geohash), ('recorrido completo', tiempos_completo)):
+            self.stdout.write(
+                f"  {nombre:<20} p50 {percentil(tiempos, 50):8.2f} ms   "
+                f"p95 {percentil(tiempos, 95):8.2f} ms   p99 {percentil(tiempos, 99):8.2f} ms"
+            )
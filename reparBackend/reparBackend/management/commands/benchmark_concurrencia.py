@@ -0,0 +1,214 @@
+"""
+Compara requests por segundo de la misma ruta servida por WSGI y por ASGI
+con la misma cantidad de workers, dentro del proceso y sin servidor: los
+requests pasan por el WSGIHandler y el ASGIHandler de Django con todos los
+middlewares.
+
+- WSGI: cada worker es un thread que atiende un request a la vez, como un
+  worker sync de gunicorn.
+- ASGI: cada worker es un thread con su event loop y hasta --concurrencia
+  requests en curso, como un worker de uvicorn.
+
+Con SQLite local una query tarda microsegundos; --latencia-db agrega esa
+cantidad de ms a cada query para simular la ida y vuelta a un MySQL en otra
+máquina, que es donde las vistas async ganan al correr consultas en paralelo.
+Las rutas autenticadas usan un token de prueba cargado en el cache de tokens
+verificados, sin pasar por Firebase. Conviene correrlo sobre datos de
+sembrar_datos.
+
+    python manage.py benchmark_concurrencia
+    python manage.py benchmark_concurrencia --workers 2 --concurrencia 64 --latencia-db 2
+"""
+
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from reparBackend.autenticacion import cache_tokens
+from reparBackend.models import Contratador
+
+TOKEN = 'benchmark-concurrencia'
+HOST = 'localhost'
+
+# (método, ruta, cuerpo JSON o None, autenticada)
+RUTAS = {
+    'calificaciones': ('GET', '/api/calificaciones/', None, False),
+    'login': ('POST', '/api/auth/firebase-login/', {'token': TOKEN}, False),
+    'sync': ('GET', '/api/sync/', None, True),
+    'trabajos': ('GET', '/api/trabajos/?page_size=20', None, False),
+}
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def repartir(total, partes):
+    return [total // partes + (i < total % partes) for i in range(partes)]
+
+
+def pedir_wsgi(aplicacion, ruta):
+    # Un request por el WSGIHandler, como lo manda un servidor; devuelve
+    # (status, headers)
+    metodo, url, cuerpo, autenticada = ruta
+    path, _, query = url.partition('?')
+    datos = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+    environ = {
+        'REQUEST_METHOD': metodo, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(datos)),
+        'wsgi.input': io.BytesIO(datos), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False, 'wsgi.version': (1, 0),
+    }
+    if autenticada:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {TOKEN}'
+    inicio = []
+    respuesta = aplicacion(environ, lambda status, headers, exc_info=None: inicio.append((int(status.split()[0]), dict(headers))))
+    try:
+        for _ in respuesta:
+            pass
+    finally:
+        respuesta.close()
+    return inicio[0]
+
+
+class Command(BaseCommand):
+    help = "Compara requests/s de rutas servidas por WSGI y por ASGI con la misma cantidad de workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rutas', nargs='*', default=list(RUTAS), choices=list(RUTAS))
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--concurrencia', type=int, default=32, help="Requests en curso por worker ASGI.")
+        parser.add_argument('--requests', type=int, default=300, help="Requests por ruta y por modo.")
+        parser.add_argument('--latencia-db', type=float, default=0.0, help="ms agregados a cada query.")
+
+    def handle(self, *args, **options):
+        uid = Contratador.objects.values_list('uid_firebase', flat=True).first()
+        if uid is None:
+            raise CommandError("No hay contratadores: correr antes sembrar_datos.")
+        cache_tokens.set(TOKEN, {'uid': uid, 'exp': time.time() + 3600})
+
+        if options['latencia_db']:
+            self.simular_latencia(options['latencia_db'] / 1000)
+
+        wsgi, asgi = get_wsgi_application(), get_asgi_application()
+        # Después de crear las aplicaciones, que vuelven a configurar el
+        # logging. Los errores se cuentan en el resumen.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        logging.getLogger('reparBackend.instrumentacion').setLevel(logging.ERROR)
+        self.stdout.write(f"{options['workers']} worker(s), {options['requests']} requests por ruta, "
+                          f"concurrencia ASGI {options['concurrencia']}, latencia de base {options['latencia_db']} ms")
+        for nombre in options['rutas']:
+            ruta = RUTAS[nombre]
+            resultados = {
+                'WSGI': self.medir_wsgi(wsgi, ruta, options['workers'], options['requests']),
+                'ASGI': self.medir_asgi(asgi, ruta, options['workers'], options['concurrencia'], options['requests']),
+            }
+            for modo, (segundos, latencias, estados) in resultados.items():
+                errores = sum(1 for estado in estados if estado >= 400)
+                self.stdout.write(
+                    f"{nombre:<16}{modo}  {len(latencias) / segundos:8.1f} req/s  "
+                    f"p50 {percentil(latencias, 50):7.1f} ms  p95 {percentil(latencias, 95):7.1f} ms"
+                    + (f"  {errores} con error" if errores else "")
+                )
+
+    def simular_latencia(self, segundos):
+        def demorar(execute, sql, params, many, context):
+            time.sleep(segundos)
+            return execute(sql, params, many, context)
+
+        def instalar(connection, **kwargs):
+            if demorar not in connection.execute_wrappers:
+                connection.execute_wrappers.insert(0, demorar)
+
+        connection_created.connect(instalar, weak=False)
+        for alias in connections:
+            instalar(connections[alias])
+
+    # --- WSGI ------------------------------------------------------------
+
+    def medir_wsgi(self, aplicacion, ruta, workers, total):
+        latencias, estados = [], []
+        lock = threading.Lock()
+
+        def worker(cantidad):
+            for _ in range(cantidad):
+                inicio = time.perf_counter()
+                estado, _ = pedir_wsgi(aplicacion, ruta)
+                with lock:
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    estados.append(estado)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(worker, repartir(total, workers)))
+        return time.perf_counter() - inicio, latencias, estados
+
+    # --- ASGI ------------------------------------------------------------
+
+    async def pedir_asgi(self, aplicacion, ruta):
+        metodo, url, cuerpo, autenticada = ruta
+        path, _, query = url.partition('?')
+        cuerpo = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+        headers = [(b'host', HOST.encode()), (b'content-type', b'application/json'),
+                   (b'content-length', str(len(cuerpo)).encode())]
+        if autenticada:
+            headers.append((b'authorization', f'Bearer {TOKEN}'.encode()))
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': headers, 'server': (HOST, 80), 'client': ('127.0.0.1', 0),
+        }
+        enviado = False
+        estado = []
+
+        async def receive():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {'type': 'http.request', 'body': cuerpo, 'more_body': False}
+            # El cliente no se desconecta
+            await asyncio.Event().wait()
+
+        async def send(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                estado.append(mensaje['status'])
+
+        await aplicacion(scope, receive, send)
+        return estado[0]
+
+    def medir_asgi(self, aplicacion, ruta, workers, concurrencia, total):
+        latencias, estados = [], []
+        lock = threading.Lock()
+
+        async def atender(cantidad):
+            limite = asyncio.Semaphore(concurrencia)
+
+            async def uno():
+                async with limite:
+                    inicio = time.perf_counter()
+                    estado = await self.pedir_asgi(aplicacion, ruta)
+                    with lock:
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+                        estados.append(estado)
+
+            await asyncio.gather(*(uno() for _ in range(cantidad)))
+
+        def worker(cantidad):
+            asyncio.run(atender(cantidad))
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(worker, repartir(total, workers)))
+        return time.perf_counter() - inicio, latencias, estados
@@ -0,0 +1,97 @@
+"""
+Mide lo que cuesta la conexión a la base en cada request sin el pool y con
+el pool (pool_conexiones.py). Manda los mismos requests por el WSGIHandler
+de Django, que como en producción cierra la conexión al final de cada uno,
+y lee el tramo `conexion` del header Server-Timing.
+
+Hace falta que DATABASES['default'] use el backend con pool
+('reparBackend.mysql_pool'). Con --workers mayor que REPAR_DB_POOL_MAXIMO se
+ven las esperas del pool.
+
+    python manage.py benchmark_conexiones
+    python manage.py benchmark_conexiones --requests 1000 --workers 8
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from reparBackend import pool_conexiones
+from reparBackend.management.commands.benchmark_api import leer_server_timing
+from reparBackend.management.commands.benchmark_concurrencia import pedir_wsgi, percentil, repartir
+from reparBackend.models import Contratador
+
+
+class Command(BaseCommand):
+    help = "Compara el costo por request de la conexión a la base sin y con el pool de conexiones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--workers', type=int, default=1, help="Threads mandando requests a la vez.")
+
+    def handle(self, *args, **options):
+        if not isinstance(connections['default'], pool_conexiones.ConexionesEnPool):
+            raise CommandError("DATABASES['default'] no usa un backend con pool (ENGINE 'reparBackend.mysql_pool').")
+        id_contratador = Contratador.objects.values_list('pk', flat=True).first()
+        if id_contratador is None:
+            raise CommandError("No hay contratadores: correr antes sembrar_datos.")
+        # Una ruta chica (una query) para que se note el costo de conectar
+        ruta = ('GET', f'/api/contratadores/{id_contratador}/reputacion/', None, False)
+
+        aplicacion = get_wsgi_application()
+        logging.getLogger('reparBackend.instrumentacion').setLevel(logging.ERROR)
+        conexiones_abiertas = [0]
+        lock = threading.Lock()
+
+        def contar(connection, **kwargs):
+            with lock:
+                conexiones_abiertas[0] += 1
+
+        connection_created.connect(contar)
+        self.stdout.write(f"{options['requests']} requests a {ruta[1]} con {options['workers']} worker(s)")
+        for nombre, con_pool in (('sin pool', False), ('con pool', True)):
+            with override_settings(REPAR_DB_POOL=con_pool):
+                connections.close_all()
+                pool_conexiones.cerrar_pools()
+                conexiones_abiertas[0] = 0
+                segundos, totales, conectar = self.medir(aplicacion, ruta, options['workers'], options['requests'])
+                # Con el pool connection_created se dispara en cada toma
+                abiertas = (pool_conexiones.estadisticas().get('default', {}).get('creadas', 0)
+                            if con_pool else conexiones_abiertas[0])
+                self.stdout.write(
+                    f"{nombre:<10}{len(totales) / segundos:8.1f} req/s  total p50 {percentil(totales, 50):6.2f} ms  "
+                    f"conexión p50 {percentil(conectar, 50):6.2f} ms  p95 {percentil(conectar, 95):6.2f} ms  "
+                    f"{abiertas} conexiones abiertas"
+                )
+                if con_pool:
+                    self.stdout.write(f"  pool: {pool_conexiones.estadisticas().get('default')}")
+        connection_created.disconnect(contar)
+        pool_conexiones.cerrar_pools()
+
+    def medir(self, aplicacion, ruta, workers, total):
+        totales, conectar = [], []
+        lock = threading.Lock()
+
+        def worker(cantidad):
+            for _ in range(cantidad):
+                inicio = time.perf_counter()
+                estado, headers = pedir_wsgi(aplicacion, ruta)
+                duracion = (time.perf_counter() - inicio) * 1000
+                if estado != 200:
+                    raise CommandError(f"{ruta[1]} respondió {estado}")
+                with lock:
+                    totales.append(duracion)
+                    conectar.append(leer_server_timing(headers.get('Server-Timing')).get('conexion', 0.0))
+            connections.close_all()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(worker, repartir(total, workers)))
+        return time.perf_counter() - inicio, totales, conectar
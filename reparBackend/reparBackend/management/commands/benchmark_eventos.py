@@ -0,0 +1,134 @@
+"""
+Prueba de carga de los WebSockets de eventos (eventos.py) dentro del
+proceso: abre miles de conexiones simuladas contra la misma aplicación ASGI
+que sirve asgi.py (sin servidor ni autenticación de Firebase), mide la
+memoria por conexión ociosa y cuánto tarda en llegar a todas un evento
+publicado desde otro thread, como lo hacen las vistas.
+
+    python manage.py benchmark_eventos
+    python manage.py benchmark_eventos --conexiones 10000 --canales 2000 --eventos 500
+"""
+
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from reparBackend.eventos import BrokerEnMemoria, EventosWebSocket, RUTA, canal_contratador
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class EventosSinAutenticacion(EventosWebSocket):
+    # Cada conexión simulada trae sus canales en el scope
+
+    async def canales_de_conexion(self, scope):
+        return scope['canales'], None
+
+
+class Conexion:
+    # Los dos extremos de un WebSocket para la aplicación ASGI
+
+    def __init__(self, canales, contador):
+        self.contador = contador
+        self.scope = {'type': 'websocket', 'path': RUTA, 'query_string': b'', 'headers': [], 'canales': canales}
+        self.entrada = asyncio.Queue()
+        self.entrada.put_nowait({'type': 'websocket.connect'})
+        self.aceptada = asyncio.Event()
+        self.recibidos = 0
+
+    async def receive(self):
+        return await self.entrada.get()
+
+    async def send(self, mensaje):
+        if mensaje['type'] == 'websocket.accept':
+            self.aceptada.set()
+        elif mensaje['type'] == 'websocket.send':
+            self.recibidos += 1
+            self.contador.recibido()
+
+
+class Contador:
+    # Avisa cuando llegaron `esperados` mensajes entre todas las conexiones
+
+    def __init__(self):
+        self.total = 0
+        self.esperados = None
+        self.listo = None
+
+    def esperar(self, cantidad):
+        self.esperados = self.total + cantidad
+        self.listo = asyncio.Event()
+        return self.listo
+
+    def recibido(self):
+        self.total += 1
+        if self.esperados is not None and self.total >= self.esperados:
+            self.esperados = None
+            self.listo.set()
+
+
+class Command(BaseCommand):
+    help = "Abre conexiones de eventos simuladas y mide memoria y latencia de entrega."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conexiones', type=int, default=5000)
+        parser.add_argument('--canales', type=int, default=1000, help="Contratadores distintos entre los que se reparten las conexiones.")
+        parser.add_argument('--eventos', type=int, default=200)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.medir(options))
+
+    async def medir(self, options):
+        azar = random.Random(options['semilla'])
+        cantidad, canales = options['conexiones'], max(1, options['canales'])
+        broker = BrokerEnMemoria(maximo_cola=100)
+        aplicacion = EventosSinAutenticacion(broker)
+        loop = asyncio.get_running_loop()
+        contador = Contador()
+
+        tracemalloc.start()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        conexiones = [Conexion([canal_contratador(i % canales)], contador) for i in range(cantidad)]
+        tareas = [asyncio.ensure_future(aplicacion(c.scope, c.receive, c.send)) for c in conexiones]
+        await asyncio.gather(*(c.aceptada.wait() for c in conexiones))
+        apertura = time.perf_counter() - inicio
+        memoria = tracemalloc.get_traced_memory()[0] - memoria_inicial
+        tracemalloc.stop()
+
+        self.stdout.write(f"{broker.conexiones()} conexiones abiertas en {apertura * 1000:.0f} ms, "
+                          f"{memoria / cantidad / 1024:.1f} KB por conexión ociosa ({memoria / 2 ** 20:.1f} MB).")
+
+        # Eventos a un contratador: llegan a sus conexiones (cantidad / canales)
+        latencias = []
+        for _ in range(options['eventos']):
+            canal = canal_contratador(azar.randrange(canales))
+            listo = contador.esperar(sum(1 for c in conexiones if c.scope['canales'][0] == canal) or 1)
+            inicio = time.perf_counter()
+            entregados = await loop.run_in_executor(None, broker.publicar, [canal], {'tipo': 'benchmark'})
+            if entregados:
+                await listo.wait()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        self.stdout.write(f"Evento a un contratador ({cantidad // canales} conexiones): "
+                          f"p50 {percentil(latencias, 50):.2f} ms, p95 {percentil(latencias, 95):.2f} ms, "
+                          f"media {statistics.mean(latencias):.2f} ms")
+
+        # Un evento a todos los canales a la vez
+        listo = contador.esperar(cantidad)
+        inicio = time.perf_counter()
+        await loop.run_in_executor(None, broker.publicar, [canal_contratador(i) for i in range(canales)], {'tipo': 'benchmark'})
+        await listo.wait()
+        self.stdout.write(f"Evento a las {cantidad} conexiones: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+        for conexion in conexiones:
+            conexion.entrada.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.gather(*tareas)
+        self.stdout.write(f"Conexiones que quedaron suscriptas después de cerrar: {broker.conexiones()}")
@@ -0,0 +1,135 @@
+"""
+Compara el listado de trabajos y postulaciones armado con
+TrabajoSerializer/PostulacionSerializer(many=True) + JSONRenderer contra el
+camino rápido (PlanFilas sobre .values() + JSONRapidoRenderer), y verifica
+que los bytes sean idénticos.
+
+Los datos se crean dentro de una transacción que se revierte al final.
+
+    python manage.py benchmark_renderizado
+    python manage.py benchmark_renderizado --trabajos 5000 --repeticiones 5
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from reparBackend.models import (
+    Contratador,
+    Estado,
+    Postulacion,
+    Profesion,
+    ReputacionContratador,
+    ReputacionTrabajador,
+    Trabajador,
+    Trabajo,
+    ZonaGeografica,
+)
+from reparBackend.renderizado import JSONRapidoRenderer, PlanFilas, orjson, serializar_filas
+from reparBackend.serializers import PostulacionSerializer, TrabajoSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Mide el camino rápido de los listados contra los serializers de DRF."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabajos', type=int, default=2000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.crear_datos(options['trabajos'], random.Random(options['semilla']))
+                self.stdout.write(f"Encoder rápido: {'orjson ' + orjson.__version__ if orjson else 'json (orjson no instalado)'}")
+                self.medir('trabajos', Trabajo.objects.order_by('-fecha_creacion', '-id_trabajo'),
+                           TrabajoSerializer, options['repeticiones'])
+                self.medir('postulaciones', Postulacion.objects.order_by('-fecha_postulacion', '-id_postulacion'),
+                           PostulacionSerializer, options['repeticiones'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def crear_datos(self, cantidad, azar):
+        ahora = timezone.now()
+        estados = list(Estado.objects.all()) or [Estado.objects.create(descripcion="Publicado")]
+        profesiones = [Profesion.objects.create(nombre_profesion=f"Bench {i}") for i in range(10)]
+        zonas = ZonaGeografica.objects.bulk_create([
+            ZonaGeografica(calle=f"Calle {i}", ciudad="Córdoba", provincia="Córdoba",
+                           clave=ZonaGeografica.calcular_clave(f"Calle {i}", "Córdoba", "Córdoba"),
+                           latitud=azar.uniform(-32, -31) if i % 3 else None,
+                           longitud=azar.uniform(-65, -64) if i % 3 else None)
+            for i in range(max(cantidad // 10, 1))
+        ])
+        contratadores = Contratador.objects.bulk_create([
+            Contratador(id_zona_geografica_contratador=azar.choice(zonas), nombre=f"Nombre {i}", apellido="Pérez",
+                        email_contratador=f"c{i}@repar.ar", telefono_contratador=3510000000 + i, dni=20000000 + i,
+                        uid_firebase=f"bench{i:024d}")
+            for i in range(max(cantidad // 4, 1))
+        ])
+        trabajadores = Trabajador.objects.bulk_create([
+            Trabajador(id_contratador=c, id_zona_geografica_trabajador=azar.choice(zonas),
+                       telefono_trabajador=3510000000 + i, mail_trabajador=f"t{i}@repar.ar")
+            for i, c in enumerate(contratadores[::2])
+        ])
+        # La mitad de los perfiles con reputación y la otra mitad sin fila
+        ReputacionTrabajador.objects.bulk_create([
+            ReputacionTrabajador(id_trabajador=t, cantidad=2, suma=Decimal('7.5'), promedio=Decimal('3.75'),
+                                 estrellas_4=2)
+            for t in trabajadores[::2]
+        ])
+        ReputacionContratador.objects.bulk_create([
+            ReputacionContratador(id_contratador=c, cantidad=1, suma=Decimal('5'), promedio=Decimal('5'), estrellas_5=1)
+            for c in contratadores[::2]
+        ])
+        trabajos = Trabajo.objects.bulk_create([
+            Trabajo(id_contratador=azar.choice(contratadores),
+                    id_trabajador=azar.choice(trabajadores) if i % 2 else None,
+                    id_profesion_requerida=azar.choice(profesiones), id_estado=azar.choice(estados),
+                    id_zona_geografica_trabajo=azar.choice(zonas) if i % 5 else None,
+                    titulo=f"Trabajo {i} – reparación", descripcion="Pérdida de agua en el baño " * 3,
+                    fecha_creacion=ahora, fecha_inicio=ahora if i % 3 else None)
+            for i in range(cantidad)
+        ])
+        Postulacion.objects.bulk_create([
+            Postulacion(id_trabajo=trabajo, id_trabajador=trabajador, fecha_postulacion=ahora)
+            for trabajo in trabajos
+            for trabajador in azar.sample(trabajadores, min(2, len(trabajadores)))
+        ])
+
+    def cronometrar(self, funcion, repeticiones):
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return mejor * 1000, resultado
+
+    def medir(self, nombre, queryset, serializer_class, repeticiones):
+        def drf():
+            items = serializer_class.setup_eager_loading(queryset)
+            return JSONRenderer().render(serializer_class(items, many=True).data)
+
+        def rapido():
+            plan = PlanFilas(serializer_class)
+            return JSONRapidoRenderer().render(serializar_filas(plan, queryset.values(*plan.columnas)))
+
+        tiempo_drf, bytes_drf = self.cronometrar(drf, repeticiones)
+        tiempo_rapido, bytes_rapido = self.cronometrar(rapido, repeticiones)
+        if bytes_drf != bytes_rapido:
+            raise CommandError(f"{nombre}: el JSON del camino rápido no es idéntico al de DRF.")
+
+        self.stdout.write(
+            f"  {nombre:<14} {queryset.count():>7} filas  {len(bytes_drf) / 1024:9.0f} KB   "
+            f"DRF {tiempo_drf:9.1f} ms   rápido {tiempo_rapido:8.1f} ms   x{tiempo_drf / tiempo_rapido:.1f}  (bytes idénticos)"
+        )
@@ -0,0 +1,94 @@
+"""
+Corre EXPLAIN sobre las queries de los listados principales y avisa cuando
+alguna necesita ordenar en memoria (filesort) en lugar de leer un índice.
+
+    python manage.py explicar_listados
+    python manage.py explicar_listados --verbose
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reparBackend.models import (
+    CalificacionContratador,
+    CalificacionTrabajador,
+    Postulacion,
+    TarjetaTrabajo,
+    Trabajo,
+)
+from reparBackend.serializers import (
+    CalificacionContratadorSerializer,
+    CalificacionTrabajadorSerializer,
+    PostulacionSerializer,
+    TrabajoSerializer,
+)
+
+# Lo que escribe cada motor en el plan cuando ordena sin índice
+MARCAS_FILESORT = ('filesort', 'Using temporary', 'TEMP B-TREE')
+
+ORDEN_TRABAJOS = ('-fecha_creacion', '-id_trabajo')
+ORDEN_POSTULACIONES = ('-fecha_postulacion', '-id_postulacion')
+
+
+def _primer_id(model, field):
+    valor = model.objects.order_by().values_list(field, flat=True).first()
+    return valor if valor is not None else 1
+
+
+def consultas_listados():
+    trabajos = TrabajoSerializer.setup_eager_loading(Trabajo.objects.all())
+    postulaciones = PostulacionSerializer.setup_eager_loading(Postulacion.objects.all())
+    calif_trabajadores = CalificacionTrabajadorSerializer.setup_eager_loading(CalificacionTrabajador.objects.all())
+    calif_contratadores = CalificacionContratadorSerializer.setup_eager_loading(CalificacionContratador.objects.all())
+    tarjetas = TarjetaTrabajo.objects.all()
+
+    id_contratador = _primer_id(Trabajo, 'id_contratador_id')
+    id_estado = _primer_id(Trabajo, 'id_estado_id')
+    id_profesion = _primer_id(Trabajo, 'id_profesion_requerida_id')
+    id_trabajo = _primer_id(Postulacion, 'id_trabajo_id')
+    id_trabajador = _primer_id(Postulacion, 'id_trabajador_id')
+
+    return [
+        ('trabajo-lista', trabajos.order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-lista?id_contratador', trabajos.filter(id_contratador_id=id_contratador).order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-lista?id_estado', trabajos.filter(id_estado_id=id_estado).order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-lista?profesiones&id_estado', trabajos.filter(
+            id_profesion_requerida__in=[id_profesion], id_estado_id=id_estado).order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-tarjetas', tarjetas.order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-tarjetas?id_contratador', tarjetas.filter(id_contratador_id=id_contratador).order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-tarjetas?id_trabajador', tarjetas.filter(id_trabajador_id=id_trabajador).order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-tarjetas?id_estado', tarjetas.filter(id_estado_id=id_estado).order_by(*ORDEN_TRABAJOS)),
+        ('trabajo-tarjetas?profesiones&id_estado', tarjetas.filter(
+            id_profesion_requerida__in=[id_profesion], id_estado_id=id_estado).order_by(*ORDEN_TRABAJOS)),
+        ('postulacion-lista', postulaciones.order_by(*ORDEN_POSTULACIONES)),
+        ('postulacion-lista?id_trabajo', postulaciones.filter(id_trabajo=id_trabajo).order_by(*ORDEN_POSTULACIONES)),
+        ('postulacion-lista?id_trabajador', postulaciones.filter(id_trabajador=id_trabajador).order_by(*ORDEN_POSTULACIONES)),
+        ('calif-trabajador-lista', calif_trabajadores.order_by('-fecha_calificacion', '-id_calificacion_trabajador')),
+        ('calif-trabajador-lista?id_trabajador', calif_trabajadores.filter(
+            id_trabajador=id_trabajador).order_by('-fecha_calificacion', '-id_calificacion_trabajador')),
+        ('calif-contratador-lista', calif_contratadores.order_by('-fecha_calificacion', '-id_calificacion_contratador')),
+        ('calif-contratador-lista?id_contratador', calif_contratadores.filter(
+            id_contratador=id_contratador).order_by('-fecha_calificacion', '-id_calificacion_contratador')),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Muestra el plan (EXPLAIN) de las queries de listado y marca las que ordenan sin índice."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help="Imprime el plan completo de cada query.")
+
+    def handle(self, *args, **options):
+        con_filesort = []
+        for nombre, queryset in consultas_listados():
+            plan = queryset.explain()
+            ordena_en_memoria = any(marca in plan for marca in MARCAS_FILESORT)
+            if ordena_en_memoria:
+                con_filesort.append(nombre)
+                self.stdout.write(self.style.WARNING(f"FILESORT  {nombre}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"INDICE    {nombre}"))
+            if options['verbose']:
+                self.stdout.write(plan + "\n")
+
+        if con_filesort:
+            raise CommandError(f"{len(con_filesort)} listado(s) ordenan sin índice: {', '.join(con_filesort)}")
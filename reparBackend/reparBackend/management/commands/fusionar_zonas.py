@@ -0,0 +1,57 @@
+"""
+Calcula la clave normalizada de todas las zonas geográficas, fusiona las
+que representan la misma dirección (queda la de menor id) y reapunta en
+bloque las FK de contratadores, trabajadores y trabajos.
+
+    python manage.py fusionar_zonas
+    python manage.py fusionar_zonas --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reparBackend.models import ZonaGeografica
+
+
+class Command(BaseCommand):
+    help = "Normaliza las direcciones de ZonaGeografica y fusiona las duplicadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo informa cuántas zonas se fusionarían.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        canonicas = {}      # clave -> id de la zona que se conserva
+        duplicadas = {}     # id duplicada -> id canonica
+        claves = {}         # id canonica -> clave
+        filas = (ZonaGeografica.objects.order_by('pk')
+                 .values_list('pk', 'calle', 'ciudad', 'provincia', 'clave')
+                 .iterator(chunk_size=batch_size))
+        for pk, calle, ciudad, provincia, clave_actual in filas:
+            clave = ZonaGeografica.calcular_clave(calle, ciudad, provincia)
+            if clave in canonicas:
+                duplicadas[pk] = canonicas[clave]
+                continue
+            canonicas[clave] = pk
+            if clave != clave_actual:
+                claves[pk] = clave
+
+        self.stdout.write(f"{len(canonicas)} direcciones distintas, {len(duplicadas)} zonas duplicadas.")
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            ZonaGeografica.objects.fusionar(duplicadas, batch_size=batch_size)
+            # Las claves se escriben despues de borrar las duplicadas para no
+            # chocar con el indice unico.
+            ZonaGeografica.objects.bulk_update(
+                [ZonaGeografica(pk=pk, clave=clave) for pk, clave in claves.items()],
+                ['clave'],
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(duplicadas)} zonas fusionadas, {len(claves)} claves actualizadas."
+        ))
@@ -0,0 +1,36 @@
+"""
+Borra las lápidas de /api/sync/ (Eliminacion) más viejas que
+REPAR_SYNC_RETENCION_DIAS. Los clientes con un token anterior reciben 410 y
+vuelven a sincronizar desde cero, así que no se pierde nada.
+
+    python manage.py purgar_eliminaciones
+    python manage.py purgar_eliminaciones --dias 7
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reparBackend.models import Eliminacion
+
+
+class Command(BaseCommand):
+    help = "Borra las eliminaciones registradas para /api/sync/ que ya pasaron el tiempo de retención."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=getattr(settings, 'REPAR_SYNC_RETENCION_DIAS', 30))
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        viejas = Eliminacion.objects.filter(fecha_eliminacion__lt=limite)
+        total = 0
+        # De a tandas para no trabar la tabla con un solo DELETE enorme
+        while True:
+            ids = list(viejas.order_by('fecha_eliminacion').values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += Eliminacion.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(f"{total} eliminaciones borradas (anteriores a {limite:%Y-%m-%d %H:%M}).")
@@ -0,0 +1,23 @@
+"""
+Reconstruye desde cero los agregados de calificaciones de trabajadores y
+contratadores (ReputacionTrabajador / ReputacionContratador).
+
+    python manage.py recalcular_reputaciones
+"""
+
+from django.core.management.base import BaseCommand
+
+from reparBackend.models import ReputacionContratador, ReputacionTrabajador
+from reparBackend.reputacion import recalcular
+
+
+class Command(BaseCommand):
+    help = "Recalcula la reputación (cantidad, suma, promedio e histograma) de todos los perfiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for modelo in (ReputacionTrabajador, ReputacionContratador):
+            cantidad = recalcular(modelo, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{modelo._meta.verbose_name_plural}: {cantidad} recalculadas"))
@@ -0,0 +1,35 @@
+"""
+Vuelve a armar desde cero las tarjetas de los trabajos (TarjetaTrabajo,
+ver tarjetas.py). Hace falta una vez después de migrar, o si se cargaron o
+cambiaron trabajos sin pasar por save() (bulk_create, QuerySet.update(),
+SQL directo). Con --verificar no escribe nada: compara cada tarjeta con las
+tablas de origen y falla si alguna no coincide.
+
+    python manage.py reconstruir_tarjetas
+    python manage.py reconstruir_tarjetas --verificar
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reparBackend.tarjetas import diferencias, reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye (o con --verificar, compara) la tabla de tarjetas de los listados de trabajos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--verificar', action='store_true',
+                            help="Solo informar los trabajos cuya tarjeta falta o está desactualizada.")
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            ids = list(diferencias(batch_size=options['batch_size']))
+            if ids:
+                muestra = ', '.join(str(pk) for pk in ids[:20])
+                raise CommandError(f"{len(ids)} tarjetas faltan o no coinciden (trabajos {muestra}"
+                                   f"{', ...' if len(ids) > 20 else ''}): correr reconstruir_tarjetas.")
+            self.stdout.write(self.style.SUCCESS("Todas las tarjetas coinciden con los trabajos."))
+            return
+        cantidad = reconstruir(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{cantidad} tarjetas armadas"))
@@ -0,0 +1,22 @@
+"""
+Reconstruye desde cero el índice de búsqueda de trabajos (TerminoBusqueda y
+PosteoBusqueda). Hace falta una vez después de migrar, o si se cargaron
+trabajos sin pasar por save() (bulk_create, SQL directo).
+
+    python manage.py reindexar_busqueda
+"""
+
+from django.core.management.base import BaseCommand
+
+from reparBackend.busqueda import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice invertido de la búsqueda de trabajos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        cantidad = reconstruir(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{cantidad} trabajos indexados"))
@@ -0,0 +1,400 @@
+"""
+Carga datos sintéticos con volúmenes de producción para medir la API
+(ver benchmark_api). Los volúmenes por defecto son 10k contratadores, 5k
+trabajadores, 200k trabajos y 1M de postulaciones, más zonas, profesiones
+de cada trabajador y calificaciones coherentes con el estado de cada trabajo.
+`--escala` los multiplica a todos, y cada uno se puede fijar por separado.
+
+Todo se inserta con bulk_create y ids asignados acá (MySQL no devuelve los
+ids de un bulk_create), sin pasar por save() ni por las señales. Al final
+se recalculan las reputaciones y se reconstruye el índice de búsqueda.
+Los datos se agregan a los que ya haya en la base; con la misma --semilla
+se generan los mismos datos.
+
+    python manage.py sembrar_datos --escala 0.01
+    python manage.py sembrar_datos --trabajos 50000 --postulaciones 200000
+"""
+
+import random
+import re
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reparBackend import busqueda, reputacion, tarjetas
+from reparBackend.models import (
+    CalificacionContratador,
+    CalificacionTrabajador,
+    Contratador,
+    Estado,
+    Postulacion,
+    Profesion,
+    ReputacionContratador,
+    ReputacionTrabajador,
+    Trabajador,
+    TrabajadoresProfesion,
+    Trabajo,
+    ZonaGeografica,
+    normalizar_texto,
+)
+
+VOLUMENES = {
+    'zonas': 20000,
+    'contratadores': 10000,
+    'trabajadores': 5000,
+    'trabajos': 200000,
+    'postulaciones': 1000000,
+}
+
+# (ciudad, provincia, latitud, longitud, peso)
+CIUDADES = [
+    ("Córdoba", "Córdoba", -31.4201, -64.1888, 30),
+    ("Villa Carlos Paz", "Córdoba", -31.4241, -64.4978, 4),
+    ("Río Cuarto", "Córdoba", -33.1232, -64.3493, 4),
+    ("Villa María", "Córdoba", -32.4075, -63.2402, 3),
+    ("Buenos Aires", "Buenos Aires", -34.6037, -58.3816, 25),
+    ("La Plata", "Buenos Aires", -34.9214, -57.9545, 6),
+    ("Mar del Plata", "Buenos Aires", -38.0055, -57.5426, 5),
+    ("Rosario", "Santa Fe", -32.9442, -60.6505, 10),
+    ("Santa Fe", "Santa Fe", -31.6333, -60.7000, 4),
+    ("Mendoza", "Mendoza", -32.8895, -68.8458, 7),
+    ("San Miguel de Tucumán", "Tucumán", -26.8083, -65.2176, 5),
+    ("Salta", "Salta", -24.7821, -65.4232, 4),
+    ("Neuquén", "Neuquén", -38.9516, -68.0591, 3),
+]
+
+CALLES = [
+    "San Martín", "Belgrano", "Rivadavia", "Sarmiento", "Mitre", "Moreno", "Alvear", "Colón", "Independencia",
+    "Avenida Vélez Sarsfield", "Bv. San Juan", "Ituzaingó", "Chacabuco", "Obispo Trejo", "Deán Funes", "Tucumán",
+    "Entre Ríos", "Corrientes", "Lavalle", "Las Heras", "Pueyrredón", "Urquiza", "Güemes", "Dorrego", "Laprida",
+    "Rondeau", "Caseros", "Santa Rosa", "Avenida Colón", "Humberto Primo", "Sucre", "La Rioja", "Jujuy",
+]
+
+NOMBRES = [
+    "Juan", "María", "Carlos", "Ana", "Luis", "Lucía", "Jorge", "Sofía", "Martín", "Valentina", "Diego", "Camila",
+    "Pablo", "Florencia", "Matías", "Julieta", "Nicolás", "Agustina", "Santiago", "Micaela", "Facundo", "Paula",
+    "Gonzalo", "Rocío", "Sebastián", "Carolina", "Federico", "Natalia", "Ezequiel", "Gabriela",
+]
+
+APELLIDOS = [
+    "González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "García", "Sánchez",
+    "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores", "Acosta", "Benítez", "Medina", "Herrera",
+    "Suárez", "Aguirre", "Giménez", "Gutiérrez", "Pereyra", "Molina", "Castro", "Ortiz", "Silva",
+]
+
+TAREAS = [
+    "Reparar pérdida de agua", "Cambiar canilla de la cocina", "Destapar cañería", "Instalar termotanque",
+    "Revisar instalación de gas", "Conectar cocina a gas", "Cambiar tomacorrientes", "Arreglar cortocircuito",
+    "Instalar luces LED", "Levantar pared de ladrillos", "Revocar paredes", "Hacer contrapiso",
+    "Arreglar puerta de madera", "Armar placard a medida", "Pintar departamento", "Pintar rejas y portón",
+    "Soldar portón", "Hacer reja para ventana", "Cortar el pasto y podar", "Cambiar cerradura",
+    "Abrir puerta trabada", "Reparar goteras del techo", "Impermeabilizar terraza", "Cambiar vidrio roto",
+    "Colocar durlock en living", "Instalar aire acondicionado", "Cargar gas de la heladera", "Instalar alarma",
+    "Hacer flete de mudanza", "Tapizar sillones",
+]
+
+DETALLES = [
+    "Es urgente, la pérdida moja la pared del vecino.",
+    "Necesito presupuesto antes de empezar.",
+    "Casa de dos plantas, el trabajo es en la planta alta.",
+    "Departamento en tercer piso por escalera.",
+    "Tengo los materiales, solo falta la mano de obra.",
+    "Puede ser por la mañana o el fin de semana.",
+    "Hay que llevar herramientas propias.",
+    "El trabajo anterior quedó mal hecho y hay que rehacerlo.",
+    "Patio grande con acceso por el costado.",
+    "Preferentemente con matrícula.",
+]
+
+COMENTARIOS = [
+    "Excelente trabajo, muy prolijo.", "Llegó a horario y cumplió con lo acordado.", "Todo bien, lo recomiendo.",
+    "Tardó más de lo previsto.", "Buena atención y buen precio.", "Pagó en tiempo y forma.",
+    "Muy buena predisposición.", "Hubo que volver a llamarlo para terminar.",
+]
+
+# estado -> peso en el total de trabajos (IDs de SQL_queries/repar_arDB-estado.sql)
+PESOS_ESTADO = {1: 45, 2: 8, 3: 10, 4: 5, 5: 24, 6: 5, 7: 3}
+# Estados en los que el trabajo tiene trabajador asignado
+CON_TRABAJADOR = (2, 3, 4, 5)
+NOTAS = [Decimal(n) / 2 for n in range(2, 11)]
+PESOS_NOTAS = [1, 1, 2, 2, 4, 6, 12, 18, 20]
+
+_VALORES_RE = re.compile(r"\((\d+), '((?:[^']|'')*)'\)")
+
+
+def leer_semilla_sql(nombre_archivo):
+    # [(id, texto)] del INSERT del dump de SQL_queries
+    ruta = settings.BASE_DIR.parent / 'SQL_queries' / nombre_archivo
+    try:
+        contenido = ruta.read_text(encoding='utf-8')
+    except OSError as e:
+        raise CommandError(f"No se pudo leer {ruta}: {e}")
+    return [(int(pk), texto.replace("''", "'")) for pk, texto in _VALORES_RE.findall(contenido)]
+
+
+def siguiente_id(modelo):
+    return (modelo.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+
+
+def en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+class Command(BaseCommand):
+    help = "Carga datos sintéticos (zonas, perfiles, trabajos, postulaciones, calificaciones) para benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help="Multiplica todos los volúmenes por defecto (0.01 = 2000 trabajos).")
+        for nombre, cantidad in VOLUMENES.items():
+            parser.add_argument(f'--{nombre}', type=int, help=f"Por defecto {cantidad} x escala.")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--sin-indice', action='store_true',
+                            help="No reconstruir el índice de búsqueda (correr reindexar_busqueda después).")
+
+    def handle(self, *args, **options):
+        volumenes = {
+            nombre: options[nombre] if options[nombre] is not None else max(int(cantidad * options['escala']), 1)
+            for nombre, cantidad in VOLUMENES.items()
+        }
+        if volumenes['trabajadores'] > volumenes['contratadores']:
+            raise CommandError("Cada trabajador es el perfil de un contratador: --trabajadores no puede superar a --contratadores.")
+
+        self.azar = random.Random(options['semilla'])
+        self.batch_size = options['batch_size']
+        self.ahora = timezone.now()
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            self.sembrar_catalogos()
+            zonas = self.sembrar_zonas(volumenes['zonas'])
+            contratadores = self.sembrar_contratadores(volumenes['contratadores'], zonas)
+            trabajadores, por_profesion = self.sembrar_trabajadores(volumenes['trabajadores'], contratadores, zonas)
+            finalizados, postulantes = self.sembrar_trabajos(volumenes['trabajos'], volumenes['postulaciones'],
+                                                             contratadores, trabajadores, por_profesion, zonas)
+            self.sembrar_postulaciones(postulantes, trabajadores, por_profesion)
+            self.sembrar_calificaciones(finalizados)
+            self.reiniciar_secuencias()
+
+            for modelo in (ReputacionTrabajador, ReputacionContratador):
+                cantidad = reputacion.recalcular(modelo)
+                self.stdout.write(f"  {modelo._meta.verbose_name_plural}: {cantidad} recalculadas")
+            if not options['sin_indice']:
+                self.stdout.write(f"  índice de búsqueda: {busqueda.reconstruir()} trabajos indexados")
+            self.stdout.write(f"  tarjetas de trabajos: {tarjetas.reconstruir()} armadas")
+
+        # Los catálogos pueden haber cambiado (ver views.catalogo_*)
+        from reparBackend.views import catalogo_estados, catalogo_profesiones
+        catalogo_estados.invalidar()
+        catalogo_profesiones.invalidar()
+        self.stdout.write(self.style.SUCCESS(f"Listo en {time.perf_counter() - inicio:.1f} s"))
+
+    def insertar(self, modelo, objetos):
+        cantidad = 0
+        for lote in en_lotes(objetos, self.batch_size):
+            modelo.objects.bulk_create(lote, batch_size=self.batch_size)
+            cantidad += len(lote)
+        self.stdout.write(f"  {modelo._meta.verbose_name_plural}: {cantidad}")
+        return cantidad
+
+    def fecha_entre(self, desde, hasta):
+        return desde + (hasta - desde) * self.azar.random()
+
+    def sembrar_catalogos(self):
+        # Mismos ids que los dumps de SQL_queries, para que los filtros por
+        # id_estado del frontend apunten a lo mismo
+        Estado.objects.bulk_create(
+            [Estado(id_estado=pk, descripcion=texto) for pk, texto in leer_semilla_sql('repar_arDB-estado.sql')],
+            ignore_conflicts=True,
+        )
+        Profesion.objects.bulk_create(
+            [Profesion(id_profesion=pk, nombre_profesion=texto) for pk, texto in leer_semilla_sql('repar_arDB-profesion.sql')],
+            ignore_conflicts=True,
+        )
+        faltantes = set(PESOS_ESTADO) - set(Estado.objects.values_list('pk', flat=True))
+        if faltantes:
+            raise CommandError(f"Faltan los estados {sorted(faltantes)} de SQL_queries/repar_arDB-estado.sql.")
+        self.profesiones = list(Profesion.objects.values_list('pk', flat=True))
+
+    def sembrar_zonas(self, cantidad):
+        azar = self.azar
+        pesos = [ciudad[4] for ciudad in CIUDADES]
+        primero = siguiente_id(ZonaGeografica)
+
+        def zonas():
+            for pk in range(primero, primero + cantidad):
+                ciudad, provincia, latitud, longitud, _ = azar.choices(CIUDADES, pesos)[0]
+                # El id en la altura hace única la dirección (clave)
+                calle = f"{CALLES[pk % len(CALLES)]} {pk}"
+                if azar.random() < 0.85:
+                    latitud = round(latitud + azar.gauss(0, 0.04), 6)
+                    longitud = round(longitud + azar.gauss(0, 0.05), 6)
+                else:
+                    latitud = longitud = None
+                yield ZonaGeografica(
+                    id_zona_geografica=pk, calle=calle, ciudad=ciudad, provincia=provincia,
+                    clave=ZonaGeografica.calcular_clave(calle, ciudad, provincia),
+                    latitud=latitud, longitud=longitud,
+                    geohash=ZonaGeografica.calcular_geohash(latitud, longitud),
+                )
+
+        self.insertar(ZonaGeografica, zonas())
+        return range(primero, primero + cantidad)
+
+    def sembrar_contratadores(self, cantidad, zonas):
+        azar = self.azar
+        primero = siguiente_id(Contratador)
+
+        def contratadores():
+            for pk in range(primero, primero + cantidad):
+                nombre, apellido = azar.choice(NOMBRES), azar.choice(APELLIDOS)
+                usuario = normalizar_texto(f"{nombre}.{apellido}").replace(' ', '')
+                yield Contratador(
+                    id_contratador=pk, nombre=nombre, apellido=apellido,
+                    id_zona_geografica_contratador_id=azar.choice(zonas) if azar.random() < 0.9 else None,
+                    email_contratador=f"{usuario}{pk}@example.com",
+                    telefono_contratador=3510000000 + azar.randrange(10000000),
+                    dni=azar.randrange(20000000, 46000000),
+                    uid_firebase=f"semilla{pk:021d}",
+                )
+
+        self.insertar(Contratador, contratadores())
+        return range(primero, primero + cantidad)
+
+    def sembrar_trabajadores(self, cantidad, contratadores, zonas):
+        azar = self.azar
+        primero = siguiente_id(Trabajador)
+        # id_trabajador -> id_contratador, para no postular a nadie en sus propios trabajos
+        trabajadores = dict(zip(range(primero, primero + cantidad), azar.sample(contratadores, cantidad)))
+
+        self.insertar(Trabajador, (
+            Trabajador(id_trabajador=pk, id_contratador_id=id_contratador,
+                       id_zona_geografica_trabajador_id=azar.choice(zonas) if azar.random() < 0.95 else None,
+                       telefono_trabajador=3510000000 + azar.randrange(10000000),
+                       mail_trabajador=f"trabajador{pk}@example.com")
+            for pk, id_contratador in trabajadores.items()
+        ))
+
+        por_profesion = {pk: [] for pk in self.profesiones}
+        relaciones = []
+        for pk in trabajadores:
+            for id_profesion in azar.sample(self.profesiones, min(azar.choice((1, 1, 2, 2, 3)), len(self.profesiones))):
+                por_profesion[id_profesion].append(pk)
+                matricula = f"MP-{azar.randrange(1000, 99999)}" if azar.random() < 0.3 else ""
+                relaciones.append((pk, id_profesion, matricula))
+        primero = siguiente_id(TrabajadoresProfesion)
+        self.insertar(TrabajadoresProfesion, (
+            TrabajadoresProfesion(id_trabajador_profesion=primero + i, id_trabajador_id=pk,
+                                  id_profesion_id=id_profesion, matricula=matricula)
+            for i, (pk, id_profesion, matricula) in enumerate(relaciones)
+        ))
+        return trabajadores, por_profesion
+
+    def sembrar_trabajos(self, cantidad, postulaciones, contratadores, trabajadores, por_profesion, zonas):
+        azar = self.azar
+        estados, pesos = list(PESOS_ESTADO), list(PESOS_ESTADO.values())
+        # El trabajador asignado se suma a los postulantes elegidos al azar
+        asignados = sum(PESOS_ESTADO[e] for e in CON_TRABAJADOR) / sum(pesos)
+        media = max(postulaciones / cantidad - asignados, 0)
+        primero = siguiente_id(Trabajo)
+        finalizados = []   # (id_trabajo, id_contratador, id_trabajador, estado, fecha_fin)
+        postulantes = []   # (id_trabajo, id_contratador, id_profesion, id_trabajador, cantidad, desde, hasta)
+
+        def trabajos():
+            for pk in range(primero, primero + cantidad):
+                id_contratador = azar.choice(contratadores)
+                id_profesion = azar.choice(self.profesiones)
+                estado = azar.choices(estados, pesos)[0]
+                creacion = self.ahora - timedelta(days=365 * azar.random())
+                inicio = fin = id_trabajador = None
+                if estado in CON_TRABAJADOR:
+                    candidatos = por_profesion[id_profesion] or list(trabajadores)
+                    id_trabajador = azar.choice(candidatos)
+                    if trabajadores[id_trabajador] == id_contratador:
+                        id_trabajador = None
+                        estado = 1
+                if estado in (3, 4, 5):
+                    inicio = min(creacion + timedelta(days=azar.uniform(1, 15)), self.ahora)
+                if estado in (4, 5):
+                    fin = min(inicio + timedelta(hours=azar.uniform(2, 72)), self.ahora)
+                    finalizados.append((pk, id_contratador, id_trabajador, estado, fin))
+
+                postulantes.append((pk, id_contratador, id_profesion, id_trabajador,
+                                    int(azar.uniform(0, 2 * media) + 0.5), creacion, inicio or self.ahora))
+                tarea = azar.choice(TAREAS)
+                yield Trabajo(
+                    id_trabajo=pk, id_contratador_id=id_contratador, id_trabajador_id=id_trabajador,
+                    id_profesion_requerida_id=id_profesion, id_estado_id=estado,
+                    id_zona_geografica_trabajo_id=azar.choice(zonas) if azar.random() < 0.9 else None,
+                    titulo=tarea[:50], descripcion=f"{tarea}. {azar.choice(DETALLES)} {azar.choice(DETALLES)}",
+                    fecha_creacion=creacion, fecha_inicio=inicio, fecha_fin=fin,
+                )
+
+        self.insertar(Trabajo, trabajos())
+        return finalizados, postulantes
+
+    def sembrar_postulaciones(self, postulantes, trabajadores, por_profesion):
+        azar = self.azar
+        todos = list(trabajadores)
+        primero = siguiente_id(Postulacion)
+
+        def postulaciones():
+            pk = primero
+            for id_trabajo, id_contratador, id_profesion, asignado, cantidad, desde, hasta in postulantes:
+                # Mayormente trabajadores de la profesión pedida; el asignado
+                # siempre se postuló
+                candidatos = por_profesion[id_profesion] if len(por_profesion[id_profesion]) > cantidad * 2 else todos
+                elegidos = set(azar.sample(candidatos, min(cantidad, len(candidatos))))
+                if asignado is not None:
+                    elegidos.add(asignado)
+                for id_trabajador in sorted(elegidos):
+                    if trabajadores[id_trabajador] == id_contratador:
+                        continue
+                    yield Postulacion(id_postulacion=pk, id_trabajo_id=id_trabajo, id_trabajador_id=id_trabajador,
+                                      fecha_postulacion=self.fecha_entre(desde, hasta))
+                    pk += 1
+
+        self.insertar(Postulacion, postulaciones())
+
+    def sembrar_calificaciones(self, finalizados):
+        azar = self.azar
+        a_trabajadores, a_contratadores = [], []
+        for id_trabajo, id_contratador, id_trabajador, estado, fin in finalizados:
+            # Finalizado: las dos partes calificaron (casi siempre).
+            # Esperando valoración: a lo sumo el trabajador calificó.
+            if estado == 5 and azar.random() < 0.9:
+                a_trabajadores.append((id_contratador, id_trabajador, id_trabajo, fin))
+            if azar.random() < (0.9 if estado == 5 else 0.5):
+                a_contratadores.append((id_contratador, id_trabajador, id_trabajo, fin))
+
+        for modelo, filas in ((CalificacionTrabajador, a_trabajadores), (CalificacionContratador, a_contratadores)):
+            primero = siguiente_id(modelo)
+            self.insertar(modelo, (
+                modelo(pk=primero + i, id_contratador_id=id_contratador, id_trabajador_id=id_trabajador,
+                       id_trabajo_id=id_trabajo, calificacion=azar.choices(NOTAS, PESOS_NOTAS)[0],
+                       comentario=azar.choice(COMENTARIOS),
+                       fecha_calificacion=min(fin + timedelta(days=azar.uniform(0, 5)), self.ahora))
+                for i, (id_contratador, id_trabajador, id_trabajo, fin) in enumerate(filas)
+            ))
+
+    def reiniciar_secuencias(self):
+        # Con ids explícitos, PostgreSQL no avanza las secuencias solo
+        # (MySQL y SQLite sí); es lo mismo que hace loaddata.
+        modelos = [ZonaGeografica, Profesion, Estado, Contratador, Trabajador, TrabajadoresProfesion, Trabajo,
+                   Postulacion, CalificacionTrabajador, CalificacionContratador]
+        sentencias = connection.ops.sequence_reset_sql(no_style(), modelos)
+        if sentencias:
+            with connection.cursor() as cursor:
+                for sql in sentencias:
+                    cursor.execute(sql)
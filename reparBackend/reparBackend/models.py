@@ -1,19 +1,152 @@
-from django.db import models
+import hashlib
+import unicodedata
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models, transaction, IntegrityError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .geo import geohash
+
+def normalizar_texto(texto):
+    # Minusculas, sin acentos y con los espacios colapsados
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+class ZonaGeograficaManager(models.Manager):
+    def obtener_o_crear(self, calle, ciudad, provincia, latitud=None, longitud=None):
+        # Unico camino para conseguir la zona de una direccion: busca por la
+        # clave normalizada (indice unico) y la crea solo si no existe.
+        clave = ZonaGeografica.calcular_clave(calle, ciudad, provincia)
+        zona = self.filter(clave=clave).first()
+        if zona is not None:
+            if zona.latitud is None and latitud is not None and longitud is not None:
+                # La direccion ya existia sin coordenadas: se completan
+                zona.latitud, zona.longitud = latitud, longitud
+                zona.save(update_fields=['latitud', 'longitud'])
+            return zona, False
+        try:
+            with transaction.atomic():
+                return self.create(calle=calle, ciudad=ciudad, provincia=provincia,
+                                   latitud=latitud, longitud=longitud), True
+        except IntegrityError:
+            # Otro request la creo entre el SELECT y el INSERT
+            return self.get(clave=clave), False
+
+    def obtener_o_crear_varias(self, direcciones):
+        # obtener_o_crear para una lista de direcciones (dicts con calle,
+        # ciudad, provincia y opcionalmente latitud/longitud): una query para
+        # las que ya existen y un solo INSERT para las nuevas. Devuelve las
+        # zonas en el mismo orden; una direccion repetida da la misma zona.
+        nuevas = {}
+        claves = []
+        for direccion in direcciones:
+            zona = ZonaGeografica(**direccion)
+            zona.normalizar()
+            claves.append(zona.clave)
+            anterior = nuevas.setdefault(zona.clave, zona)
+            if anterior.latitud is None and zona.latitud is not None:
+                nuevas[zona.clave] = zona
+
+        existentes = self.in_bulk(nuevas.keys(), field_name='clave')
+        completar = []
+        for clave, zona in existentes.items():
+            nueva = nuevas[clave]
+            if zona.latitud is None and nueva.latitud is not None:
+                zona.latitud, zona.longitud, zona.geohash = nueva.latitud, nueva.longitud, nueva.geohash
+                completar.append(zona)
+        if completar:
+            self.bulk_update(completar, ['latitud', 'longitud', 'geohash'])
+
+        faltantes = [zona for clave, zona in nuevas.items() if clave not in existentes]
+        if faltantes:
+            # ignore_conflicts por si otro request crea la misma zona en el medio
+            self.bulk_create(faltantes, ignore_conflicts=True)
+            existentes = self.in_bulk(nuevas.keys(), field_name='clave')
+        return [existentes[clave] for clave in claves]
+
+    def fusionar(self, duplicadas, batch_size=500):
+        # duplicadas: {id_zona_duplicada: id_zona_canonica}. Reapunta en bloque
+        # todas las FK que referencian zonas (Contratador, Trabajador, Trabajo,
+        # ...) y despues borra las duplicadas.
+        items = list(duplicadas.items())
+        relaciones = [r for r in self.model._meta.related_objects if r.one_to_many]
+        for i in range(0, len(items), batch_size):
+            lote = dict(items[i:i + batch_size])
+            for relacion in relaciones:
+                campo = relacion.field.name
+                valores = {campo: models.Case(
+                    *[models.When(**{campo: dup}, then=models.Value(canonica)) for dup, canonica in lote.items()],
+                    output_field=models.IntegerField(),
+                )}
+                if any(f.name == 'fecha_actualizacion' for f in relacion.related_model._meta.concrete_fields):
+                    # update() no pasa por auto_now: sin esto /api/sync/ no
+                    # manda la zona nueva
+                    valores['fecha_actualizacion'] = timezone.now()
+                relacion.related_model.objects.filter(**{f'{campo}__in': lote.keys()}).update(**valores)
+            self.filter(pk__in=lote.keys()).delete()
+
+
+def SET_NULL_ACTUALIZANDO(collector, field, sub_objs, using):
+    # SET_NULL que ademas actualiza fecha_actualizacion: el UPDATE del borrado
+    # en cascada no pasa por auto_now, y /api/sync/ no mandaria el cambio
+    collector.add_field_update(field, None, sub_objs)
+    collector.add_field_update(field.model._meta.get_field('fecha_actualizacion'), timezone.now(), sub_objs)
+
 
 class ZonaGeografica(models.Model):
     id_zona_geografica = models.AutoField(primary_key=True)
     calle = models.CharField(max_length=100)
     ciudad = models.CharField(max_length=100)
     provincia = models.CharField(max_length=100)
+    # sha256 de la direccion normalizada. Es NULL solo en filas anteriores a
+    # la clave, hasta correr `manage.py fusionar_zonas`.
+    clave = models.CharField(max_length=64, unique=True, null=True, editable=False)
+    latitud = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitud = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Celda de la grilla para las busquedas por radio (ver geo.py). Se
+    # calcula en save() a partir de latitud/longitud.
+    geohash = models.CharField(max_length=12, null=True, editable=False)
+
+    objects = ZonaGeograficaManager()
     
     class Meta:
         verbose_name = "Zona Geografica"
         verbose_name_plural = "Zonas Geograficas"
+        indexes = [
+            models.Index(fields=['geohash'], name='zona_geohash_idx'),
+        ]
         
     def __str__(self):
         return f"{self.calle}, {self.ciudad}, {self.provincia}"
 
+    @staticmethod
+    def calcular_clave(calle, ciudad, provincia):
+        direccion = '|'.join(normalizar_texto(parte) for parte in (calle, ciudad, provincia))
+        return hashlib.sha256(direccion.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def calcular_geohash(latitud, longitud):
+        if latitud is None or longitud is None:
+            return None
+        return geohash(latitud, longitud)
+
+    def normalizar(self):
+        # Lo que save() completa antes de guardar; bulk_create no pasa por save()
+        self.calle = ' '.join(self.calle.split())
+        self.ciudad = ' '.join(self.ciudad.split())
+        self.provincia = ' '.join(self.provincia.split())
+        self.clave = self.calcular_clave(self.calle, self.ciudad, self.provincia)
+        self.geohash = self.calcular_geohash(self.latitud, self.longitud)
+
+    def save(self, *args, **kwargs):
+        self.normalizar()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'clave', 'geohash'}
+        super().save(*args, **kwargs)
+
 class Profesion(models.Model):
     id_profesion = models.AutoField(primary_key=True)
     nombre_profesion = models.CharField(max_length=100)
@@ -36,6 +169,30 @@ class Estado(models.Model):
     def __str__(self):
         return f"{self.id_estado} {self.descripcion}"
 
+# IDs de SQL_queries/repar_arDB-estado.sql
+ESTADO_PUBLICADO = 1
+ESTADO_ESPERANDO_CONFIRMACION = 2
+ESTADO_ACTIVO = 3
+ESTADO_ESPERANDO_VALORACION = 4
+ESTADO_FINALIZADO = 5
+ESTADO_CANCELADO = 6
+ESTADO_RECHAZADO = 7
+# Trabajos que todavia aceptan postulaciones (y cambios de trabajador)
+ESTADOS_ABIERTOS = (ESTADO_PUBLICADO, ESTADO_ESPERANDO_CONFIRMACION)
+# Estados que necesitan un trabajador asignado
+ESTADOS_CON_TRABAJADOR = (ESTADO_ACTIVO, ESTADO_ESPERANDO_VALORACION, ESTADO_FINALIZADO)
+# Estado -> estados a los que puede pasar un trabajo (ver transiciones.py).
+# Quedarse en el mismo estado siempre vale. Un trabajo se crea publicado.
+TRANSICIONES = {
+    ESTADO_PUBLICADO: {ESTADO_ESPERANDO_CONFIRMACION, ESTADO_ACTIVO, ESTADO_CANCELADO},
+    ESTADO_ESPERANDO_CONFIRMACION: {ESTADO_ACTIVO, ESTADO_CANCELADO, ESTADO_RECHAZADO},
+    ESTADO_ACTIVO: {ESTADO_ESPERANDO_VALORACION, ESTADO_CANCELADO, ESTADO_RECHAZADO},
+    ESTADO_ESPERANDO_VALORACION: {ESTADO_FINALIZADO},
+    ESTADO_FINALIZADO: set(),
+    ESTADO_CANCELADO: set(),
+    ESTADO_RECHAZADO: set(),
+}
+
 class Contratador(models.Model):
     id_contratador = models.AutoField(primary_key=True)
     id_zona_geografica_contratador = models.ForeignKey(ZonaGeografica, on_delete=models.SET_NULL, null=True, db_column='id_zona_geografica_contratador')
@@ -56,13 +213,18 @@ class Contratador(models.Model):
 class Trabajador(models.Model):
     id_trabajador = models.AutoField(primary_key=True)
     id_contratador = models.ForeignKey(Contratador, on_delete=models.CASCADE, db_column='id_contratador')
-    id_zona_geografica_trabajador = models.ForeignKey(ZonaGeografica, on_delete=models.SET_NULL, null=True, db_column='id_zona_geografica_trabajador')
+    id_zona_geografica_trabajador = models.ForeignKey(ZonaGeografica, on_delete=SET_NULL_ACTUALIZANDO, null=True, db_column='id_zona_geografica_trabajador')
     telefono_trabajador = models.BigIntegerField()
     mail_trabajador = models.EmailField(max_length=100)
+    # Para /api/sync/ (ver sincronizacion.py)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Trabajador"
         verbose_name_plural = "Trabajadores"
+        indexes = [
+            models.Index(fields=['fecha_actualizacion', 'id_trabajador'], name='trabajador_actualizacion_idx'),
+        ]
         
     def __str__(self):
         return f"{self.id_trabajador} - {self.id_contratador.apellido.upper()}, {self.id_contratador.nombre}"
@@ -72,17 +234,26 @@ class Trabajo(models.Model):
     id_contratador = models.ForeignKey(Contratador, on_delete=models.CASCADE, db_column='id_contratador')
     id_trabajador = models.ForeignKey(Trabajador, on_delete=models.SET_NULL, null=True, blank=True, db_column='id_trabajador')
     id_profesion_requerida = models.ForeignKey(Profesion, on_delete=models.PROTECT, db_column='id_profesion_requerida')
-    id_zona_geografica_trabajo = models.ForeignKey(ZonaGeografica, on_delete=models.SET_NULL, null=True, db_column='id_zona_geografica_trabajo')
+    id_zona_geografica_trabajo = models.ForeignKey(ZonaGeografica, on_delete=SET_NULL_ACTUALIZANDO, null=True, db_column='id_zona_geografica_trabajo')
     id_estado = models.ForeignKey(Estado, on_delete=models.PROTECT, db_column='id_estado')
     titulo = models.CharField(default="Trabajo sin titulo asignado", max_length=50) # Campo nuevo
     descripcion = models.CharField(max_length=500)
     fecha_creacion = models.DateTimeField()
     fecha_inicio = models.DateTimeField(blank=True, null=True) # Estarán en blanco inicialmente
     fecha_fin = models.DateTimeField(blank=True, null=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Trabajo"
         verbose_name_plural = "Trabajos"
+        # Indices segun los filtros y el orden de TrabajoView.get
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id_trabajo'], name='trabajo_fecha_idx'),
+            models.Index(fields=['id_contratador', '-fecha_creacion', '-id_trabajo'], name='trabajo_contratador_fecha_idx'),
+            models.Index(fields=['id_estado', '-fecha_creacion', '-id_trabajo'], name='trabajo_estado_fecha_idx'),
+            models.Index(fields=['id_profesion_requerida', 'id_estado', '-fecha_creacion', '-id_trabajo'], name='trabajo_profesion_estado_idx'),
+            models.Index(fields=['fecha_actualizacion', 'id_trabajo'], name='trabajo_actualizacion_idx'),
+        ]
         
     def __str__(self):
         contratador = "Contratador: " + self.id_contratador.apellido.upper() + ", " + self.id_contratador.nombre
@@ -97,14 +268,70 @@ class Postulacion(models.Model):
     id_trabajo = models.ForeignKey(Trabajo, on_delete=models.CASCADE, db_column='id_trabajo')
     id_trabajador = models.ForeignKey(Trabajador, on_delete=models.CASCADE, db_column='id_trabajador')
     fecha_postulacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Postulacion"
         verbose_name_plural = "Postulaciones"
+        constraints = [
+            models.UniqueConstraint(fields=['id_trabajo', 'id_trabajador'], name='postulacion_unica'),
+        ]
+        # Indices segun los filtros y el orden de PostulacionView.get
+        # (el filtro por id_trabajo usa el indice de la constraint)
+        indexes = [
+            models.Index(fields=['-fecha_postulacion', '-id_postulacion'], name='postulacion_fecha_idx'),
+            models.Index(fields=['id_trabajador', '-fecha_postulacion', '-id_postulacion'], name='postulacion_trabajador_idx'),
+            models.Index(fields=['id_trabajo', '-fecha_postulacion', '-id_postulacion'], name='postulacion_trabajo_idx'),
+            models.Index(fields=['fecha_actualizacion', 'id_postulacion'], name='postulacion_actualizacion_idx'),
+        ]
         
     def __str__(self):
         return f"{self.id_postulacion} ID Trabajo: {self.id_trabajo.id_trabajo} {self.id_trabajador.id_contratador.apellido} (ID: {self.id_trabajador.id_trabajador}) {self.fecha_postulacion}"
 
+class TarjetaTrabajo(models.Model):
+    # Lo que muestra la tarjeta de un trabajo en los listados, en una sola
+    # fila: los campos del trabajo, los nombres de su estado, profesion,
+    # zona, contratador y trabajador, y cuantas postulaciones tiene. Se
+    # mantiene en la misma transaccion que cada cambio en esas tablas (ver
+    # tarjetas.py). Las FK no tienen constraint ni se siguen al borrar: son
+    # para filtrar y para los indices.
+    id_trabajo = models.OneToOneField(Trabajo, on_delete=models.CASCADE, primary_key=True, db_column='id_trabajo', related_name='tarjeta')
+    titulo = models.CharField(max_length=50)
+    descripcion = models.CharField(max_length=500)
+    fecha_creacion = models.DateTimeField()
+    fecha_inicio = models.DateTimeField(null=True)
+    fecha_fin = models.DateTimeField(null=True)
+    id_estado = models.ForeignKey(Estado, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, db_column='id_estado', related_name='+')
+    estado_descripcion = models.CharField(max_length=100)
+    id_profesion_requerida = models.ForeignKey(Profesion, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, db_column='id_profesion_requerida', related_name='+')
+    profesion_nombre = models.CharField(max_length=100)
+    id_zona_geografica_trabajo = models.ForeignKey(ZonaGeografica, on_delete=models.DO_NOTHING, db_constraint=False, null=True, db_column='id_zona_geografica_trabajo', related_name='+')
+    zona_calle = models.CharField(max_length=100, null=True)
+    zona_ciudad = models.CharField(max_length=100, null=True)
+    zona_provincia = models.CharField(max_length=100, null=True)
+    id_contratador = models.ForeignKey(Contratador, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, db_column='id_contratador', related_name='+')
+    contratador_nombre = models.CharField(max_length=100)
+    contratador_apellido = models.CharField(max_length=100)
+    id_trabajador = models.ForeignKey(Trabajador, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, db_column='id_trabajador', related_name='+')
+    trabajador_nombre = models.CharField(max_length=100, null=True)
+    trabajador_apellido = models.CharField(max_length=100, null=True)
+    postulaciones = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Tarjeta de un trabajo"
+        verbose_name_plural = "Tarjetas de trabajos"
+        # Los mismos filtros y orden que los listados de Trabajo
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id_trabajo'], name='tarjeta_fecha_idx'),
+            models.Index(fields=['id_contratador', '-fecha_creacion', '-id_trabajo'], name='tarjeta_contratador_idx'),
+            models.Index(fields=['id_trabajador', '-fecha_creacion', '-id_trabajo'], name='tarjeta_trabajador_idx'),
+            models.Index(fields=['id_estado', '-fecha_creacion', '-id_trabajo'], name='tarjeta_estado_idx'),
+            models.Index(fields=['id_profesion_requerida', 'id_estado', '-fecha_creacion', '-id_trabajo'], name='tarjeta_profesion_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tarjeta {self.id_trabajo_id}: {self.titulo} ({self.postulaciones} postulaciones)"
+
 class CalificacionTrabajador(models.Model):
     id_calificacion_trabajador = models.AutoField(primary_key=True)
     id_contratador = models.ForeignKey(Contratador, on_delete=models.CASCADE, db_column='id_contratador') 
@@ -113,10 +340,16 @@ class CalificacionTrabajador(models.Model):
     calificacion = models.DecimalField(max_digits=2, decimal_places=1, validators=[MinValueValidator(1.0), MaxValueValidator(5.0)])
     comentario = models.CharField(max_length=500)
     fecha_calificacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Calificacion al trabajador"
         verbose_name_plural = "Cafilicaciones a trabajadores"
+        indexes = [
+            models.Index(fields=['-fecha_calificacion', '-id_calificacion_trabajador'], name='calif_trabajador_fecha_idx'),
+            models.Index(fields=['id_trabajador', '-fecha_calificacion', '-id_calificacion_trabajador'], name='calif_trabajador_trab_idx'),
+            models.Index(fields=['fecha_actualizacion', 'id_calificacion_trabajador'], name='calif_trabajador_act_idx'),
+        ]
         
     def __str__(self):
         return f"{self.id_calificacion_trabajador} Trabajador calificado: {self.id_trabajador.id_contratador.nombre} {self.id_trabajador.id_contratador.apellido}"
@@ -129,14 +362,107 @@ class CalificacionContratador(models.Model):
     calificacion = models.DecimalField(max_digits=2, decimal_places=1, validators=[MinValueValidator(1.0), MaxValueValidator(5.0)])
     comentario = models.CharField(max_length=500)
     fecha_calificacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Calificacion al contratador"
         verbose_name_plural = "Cafilicaciones a contratadores"
+        indexes = [
+            models.Index(fields=['-fecha_calificacion', '-id_calificacion_contratador'], name='calif_contratador_fecha_idx'),
+            models.Index(fields=['id_contratador', '-fecha_calificacion', '-id_calificacion_contratador'], name='calif_contratador_contr_idx'),
+            models.Index(fields=['fecha_actualizacion', 'id_calificacion_contratador'], name='calif_contratador_act_idx'),
+        ]
         
     def __str__(self):
         return f"{self.id_calificacion_contratador} Contratador calificado: {self.id_contratador.nombre} {self.id_contratador.apellido}"
 
+class Eliminacion(models.Model):
+    # Lapida de un trabajo, postulacion, trabajador o calificacion borrados,
+    # para que /api/sync/ se lo avise a los usuarios que lo tenian. Una fila
+    # por interesado: la ve el contratador `id_contratador` y el trabajador
+    # `id_trabajador` (IDs sueltos, no FK, porque pueden haberse borrado).
+    id_eliminacion = models.AutoField(primary_key=True)
+    tipo = models.CharField(max_length=50)
+    id_objeto = models.IntegerField()
+    id_contratador = models.IntegerField(null=True)
+    id_trabajador = models.IntegerField(null=True)
+    fecha_eliminacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Eliminacion"
+        verbose_name_plural = "Eliminaciones"
+        indexes = [
+            models.Index(fields=['id_contratador', 'fecha_eliminacion'], name='eliminacion_contratador_idx'),
+            models.Index(fields=['id_trabajador', 'fecha_eliminacion'], name='eliminacion_trabajador_idx'),
+            models.Index(fields=['fecha_eliminacion'], name='eliminacion_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.id_objeto} ({self.fecha_eliminacion})"
+
+class Reputacion(models.Model):
+    # Agregado de las calificaciones recibidas, mantenido en la misma
+    # transaccion en que se crea o se borra cada calificacion. La calificacion
+    # se cuenta en el histograma redondeada a la estrella mas cercana (4.5 -> 5).
+    cantidad = models.PositiveIntegerField(default=0)
+    suma = models.DecimalField(max_digits=12, decimal_places=1, default=Decimal('0'))
+    promedio = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0'))
+    estrellas_1 = models.PositiveIntegerField(default=0)
+    estrellas_2 = models.PositiveIntegerField(default=0)
+    estrellas_3 = models.PositiveIntegerField(default=0)
+    estrellas_4 = models.PositiveIntegerField(default=0)
+    estrellas_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def estrellas(calificacion):
+        return int(Decimal(calificacion).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+    def calcular_promedio(self):
+        if not self.cantidad:
+            return Decimal('0')
+        return (Decimal(self.suma) / self.cantidad).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def registrar(self, calificacion):
+        calificacion = Decimal(calificacion)
+        self.cantidad += 1
+        self.suma += calificacion
+        self.promedio = self.calcular_promedio()
+        campo = f"estrellas_{self.estrellas(calificacion)}"
+        setattr(self, campo, getattr(self, campo) + 1)
+
+    def quitar(self, calificacion):
+        calificacion = Decimal(calificacion)
+        self.cantidad -= 1
+        self.suma -= calificacion
+        self.promedio = self.calcular_promedio()
+        campo = f"estrellas_{self.estrellas(calificacion)}"
+        setattr(self, campo, getattr(self, campo) - 1)
+
+
+class ReputacionTrabajador(Reputacion):
+    id_trabajador = models.OneToOneField(Trabajador, on_delete=models.CASCADE, primary_key=True, db_column='id_trabajador', related_name='reputacion')
+
+    class Meta:
+        verbose_name = "Reputacion de un trabajador"
+        verbose_name_plural = "Reputaciones de trabajadores"
+
+    def __str__(self):
+        return f"Trabajador {self.id_trabajador_id}: {self.promedio} ({self.cantidad} calificaciones)"
+
+
+class ReputacionContratador(Reputacion):
+    id_contratador = models.OneToOneField(Contratador, on_delete=models.CASCADE, primary_key=True, db_column='id_contratador', related_name='reputacion')
+
+    class Meta:
+        verbose_name = "Reputacion de un contratador"
+        verbose_name_plural = "Reputaciones de contratadores"
+
+    def __str__(self):
+        return f"Contratador {self.id_contratador_id}: {self.promedio} ({self.cantidad} calificaciones)"
+
 class TrabajadoresProfesion(models.Model):
     id_trabajador_profesion = models.AutoField(primary_key=True)
     id_trabajador = models.ForeignKey(Trabajador, on_delete=models.CASCADE, db_column='id_trabajador')
@@ -146,7 +472,44 @@ class TrabajadoresProfesion(models.Model):
     class Meta:
         verbose_name = "Profesion de un trabajador"
         verbose_name_plural = "Profesiones de un trabajador"
+        constraints = [
+            models.UniqueConstraint(fields=['id_trabajador', 'id_profesion'], name='trabajador_profesion_unica'),
+        ]
         
     def __str__(self):
         return f"{self.id_trabajador.id_contratador.apellido}, {self.id_trabajador.id_contratador.nombre} (ID: {self.id_trabajador.id_trabajador}) {self.id_profesion.nombre_profesion} MN: {self.matricula}"
 
+
+class TerminoBusqueda(models.Model):
+    # Cantidad de trabajos que contienen cada termino (el df de BM25)
+    termino = models.CharField(max_length=40, primary_key=True)
+    documentos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Termino de busqueda"
+        verbose_name_plural = "Terminos de busqueda"
+
+    def __str__(self):
+        return f"{self.termino} ({self.documentos})"
+
+
+class PosteoBusqueda(models.Model):
+    # Indice invertido de titulo, descripcion y profesion de cada trabajo.
+    # `longitud` es la cantidad de terminos del trabajo, repetida en cada
+    # posteo para puntuar sin otro join.
+    id_posteo = models.BigAutoField(primary_key=True)
+    termino = models.CharField(max_length=40)
+    id_trabajo = models.ForeignKey(Trabajo, on_delete=models.CASCADE, db_column='id_trabajo', related_name='posteos_busqueda')
+    frecuencia = models.PositiveSmallIntegerField()
+    longitud = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Posteo de busqueda"
+        verbose_name_plural = "Posteos de busqueda"
+        # Cubre la consulta de busqueda: el puntaje se calcula sin leer la tabla
+        indexes = [
+            models.Index(fields=['termino', 'id_trabajo', 'frecuencia', 'longitud'], name='posteo_termino_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.termino} -> Trabajo {self.id_trabajo_id} ({self.frecuencia})"
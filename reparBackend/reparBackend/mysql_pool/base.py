@@ -0,0 +1,17 @@
+"""
+Backend de MySQL de Django con pool de conexiones (ver pool_conexiones.py).
+
+    DATABASES = {'default': {'ENGINE': 'reparBackend.mysql_pool', ...}}
+"""
+
+from django.db.backends.mysql import base as mysql
+
+from reparBackend.pool_conexiones import ConexionesEnPool
+
+
+class DatabaseWrapper(ConexionesEnPool, mysql.DatabaseWrapper):
+
+    @staticmethod
+    def verificar_conexion(conexion):
+        # mysql_ping: un ida y vuelta sin ejecutar nada
+        conexion.ping()
@@ -0,0 +1,103 @@
+"""
+Detección de consultas N+1.
+
+Durante un request, cada query pasa por `Detector.registrar` (desde el
+execute_wrapper de instrumentacion.py). La query se reduce a una huella (los
+literales y las listas de IN se reemplazan por marcadores) y se cuentan los
+juegos de parámetros distintos de cada huella. Cuando una misma huella corre
+con más de REPAR_NPLUSUNO_UMBRAL parámetros distintos, casi siempre es un
+get_* o una vista que recorre una FK fila por fila; se guarda de dónde vino
+(los frames del código de la app, del más interno al más externo).
+
+Modos (REPAR_NPLUSUNO):
+- 'estricto': lanza ConsultasRepetidas en la query que cruza el umbral, así
+  el test que pidió el endpoint falla con el traceback del culpable.
+- 'muestreo': revisa una fracción de los requests (REPAR_NPLUSUNO_MUESTREO)
+  y solo escribe un WARNING en el logger 'reparBackend.nplusuno'.
+- 'apagado'.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import traceback
+
+logger = logging.getLogger('reparBackend.nplusuno')
+
+ESTRICTO = 'estricto'
+MUESTREO = 'muestreo'
+APAGADO = 'apagado'
+
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+# Frames propios de la medición y del recorrido de serializers anidados, que
+# no dicen nada sobre el origen
+_ARCHIVOS_PROPIOS = (os.path.join(DIRECTORIO_APP, 'nplusuno.py'), os.path.join(DIRECTORIO_APP, 'instrumentacion.py'))
+_FUNCIONES_PROPIAS = ('data', 'serializar_anidado')
+
+_LISTA_IN = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class ConsultasRepetidas(Exception):
+    pass
+
+
+def huella(sql):
+    # SELECT ... WHERE id IN (%s, %s) AND x = 'a' -> SELECT ... WHERE id IN (...) AND x = ?
+    return _LITERALES.sub('?', _LISTA_IN.sub('IN (...)', sql))
+
+
+def _clave_parametros(params):
+    try:
+        return hash(tuple(params.items()) if isinstance(params, dict) else tuple(params or ()))
+    except TypeError:
+        return repr(params)
+
+
+def origen():
+    # 'serializers.py:258 get_contratador', del frame más interno al más externo
+    frames = traceback.StackSummary.extract(traceback.walk_stack(None), lookup_lines=False)
+    return [
+        f"{os.path.relpath(frame.filename, DIRECTORIO_APP)}:{frame.lineno} {frame.name}"
+        for frame in frames
+        if frame.filename.startswith(DIRECTORIO_APP)
+        and frame.filename not in _ARCHIVOS_PROPIOS and frame.name not in _FUNCIONES_PROPIAS
+    ][:6]
+
+
+class Detector:
+
+    def __init__(self, modo, umbral):
+        self.modo = modo
+        self.umbral = umbral
+        self._parametros = {}   # huella -> claves de los parámetros vistos
+        self.hallazgos = {}     # huella -> {'sql', 'veces', 'origen'}
+
+    def registrar(self, sql, params):
+        clave = huella(sql)
+        vistos = self._parametros.setdefault(clave, set())
+        vistos.add(_clave_parametros(params))
+        if len(vistos) <= self.umbral:
+            return
+        hallazgo = self.hallazgos.get(clave)
+        if hallazgo is None:
+            hallazgo = self.hallazgos[clave] = {'sql': sql[:500], 'veces': 0, 'origen': origen()}
+            if self.modo == ESTRICTO:
+                raise ConsultasRepetidas(
+                    f"La misma query corrió con {len(vistos)} parámetros distintos en un request "
+                    f"(N+1) desde {' <- '.join(hallazgo['origen']) or '?'}: {sql[:300]}"
+                )
+        hallazgo['veces'] = len(vistos)
+
+    def informar(self, request, ruta, status_code):
+        for hallazgo in self.hallazgos.values():
+            datos = {'ruta': ruta, 'metodo': request.method, 'path': request.path, 'status': status_code, **hallazgo}
+            logger.warning(json.dumps(datos), extra={'nplusuno': datos})
+
+
+def detector_para_request(modo, muestreo, umbral):
+    if modo == ESTRICTO or (modo == MUESTREO and random.random() < muestreo):
+        return Detector(modo, umbral)
+    return None
@@ -0,0 +1,209 @@
+"""
+Paginación por cursor (keyset) para los endpoints de listado.
+
+El cursor es opaco para el cliente: codifica los valores de las columnas de
+orden de la última fila entregada, y la página siguiente se pide con un
+WHERE sobre esas columnas en lugar de un OFFSET. Así una página profunda
+cuesta lo mismo que la primera.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .renderizado import LecturaAparte, plan_filas, serializar_filas
+
+
+def paginacion_pedida(request):
+    params = request.query_params
+    return CursorPagination.cursor_query_param in params or CursorPagination.page_size_query_param in params
+
+
+def leer_page_size(request, parametro='page_size', maximo=100):
+    default = getattr(settings, 'REPAR_PAGE_SIZE', 20)
+    try:
+        page_size = int(request.query_params.get(parametro, default))
+    except (TypeError, ValueError):
+        return default
+    if page_size <= 0:
+        return default
+    return min(page_size, maximo)
+
+
+def campo_de_orden(queryset, nombre):
+    # Campo del modelo (o anotación) por el que ordena `nombre`; una FK se
+    # resuelve al campo al que apunta
+    anotacion = queryset.query.annotations.get(nombre)
+    if anotacion is not None:
+        return anotacion.output_field
+    modelo = queryset.model
+    for parte in nombre.split('__'):
+        campo = modelo._meta.get_field(parte)
+        modelo = campo.related_model
+    return campo.target_field if campo.is_relation else campo
+
+
+class CursorPagination:
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, ordering, opcional=True):
+        # El último campo del orden tiene que ser único (la PK) para que el
+        # cursor identifique una única posición.
+        self.ordering = tuple(ordering)
+        self.opcional = opcional
+
+    def is_requested(self, request):
+        # La paginación es opcional: sin 'cursor' ni 'page_size' el endpoint
+        # sigue devolviendo la lista completa, como antes.
+        if not self.opcional:
+            return True
+        return paginacion_pedida(request)
+
+    def get_page_size(self, request):
+        return leer_page_size(request, self.page_size_query_param, self.max_page_size)
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor, queryset):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("Cursor inválido.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound("Cursor inválido.")
+        # Cada valor se convierte al tipo de su columna: un cursor armado a
+        # mano con otros tipos no tiene que llegar al WHERE
+        try:
+            values = [campo_de_orden(queryset, field.lstrip('-')).to_python(value)
+                      for field, value in zip(self.ordering, values)]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound("Cursor inválido.")
+        if any(value is None for value in values):
+            raise NotFound("Cursor inválido.")
+        return values
+
+    def get_position(self, instance):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                # Filas de .values(): la clave es la ruta completa
+                values.append(instance[name])
+                continue
+            value = instance
+            for attr in name.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def filter_after(self, queryset, values):
+        # (a, b, c) "después de" (va, vb, vc), respetando la dirección de cada
+        # campo: a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+        condition = Q()
+        igualdades = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= igualdades & Q(**{f'{name}__{lookup}': value})
+            igualdades &= Q(**{name: value})
+        return queryset.filter(condition)
+
+    def paginate_queryset(self, queryset, request):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.filter_after(queryset, self.decode_cursor(cursor, queryset))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        cursor = self.encode_cursor(self.get_position(self.page[-1]))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def leer_ids(request, maximo=100):
+    # ?ids=3,1,3 -> [3, 1]; None si no son enteros o son más de `maximo`
+    try:
+        ids = list(dict.fromkeys(int(parte) for parte in request.query_params['ids'].split(',') if parte.strip()))
+    except ValueError:
+        return None
+    return ids if 0 < len(ids) <= maximo else None
+
+
+def lista_por_ids(request, items, serializer_class, rapido=False, por_pk=None):
+    # ?ids=: varios items en un solo WHERE pk IN (...), con los mismos joins
+    # y filtros que el listado, como {id: item} en el orden pedido. Los ids
+    # que no existen (o que los filtros excluyen) no aparecen.
+    ids = leer_ids(request)
+    if ids is None:
+        return Response({"error": "ids debe ser una lista de hasta 100 números enteros separados por comas."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    items = items.filter(pk__in=ids)
+    if rapido:
+        plan = plan_filas(serializer_class, request.query_params.get('fields'), request.query_params.get('expand'))
+        aparte = LecturaAparte(plan.columnas, por_pk)
+        filas = {fila[plan.pk]: fila for fila in aparte.completar(items.values(*aparte.columnas))}
+        encontrados = [pk for pk in ids if pk in filas]
+        data = serializar_filas(plan, [filas[pk] for pk in encontrados])
+    else:
+        instancias = {item.pk: item for item in items}
+        encontrados = [pk for pk in ids if pk in instancias]
+        data = serializer_class([instancias[pk] for pk in encontrados], many=True, context={'request': request}).data
+    return Response({str(pk): item for pk, item in zip(encontrados, data)})
+
+
+def lista_paginada(request, items, serializer_class, ordering, opcional=True, rapido=False, por_pk=None):
+    # rapido=True: las filas se leen con .values() y se arman con PlanFilas
+    # en lugar de instanciar modelos y serializers (mismo resultado).
+    # por_pk={fk: modelo}: el anidado de esa FK se lee de `modelo` con otra
+    # query por PK en lugar de con un join (ver LecturaAparte).
+    if 'ids' in request.query_params:
+        return lista_por_ids(request, items, serializer_class, rapido, por_pk)
+    if rapido:
+        plan = plan_filas(serializer_class, request.query_params.get('fields'), request.query_params.get('expand'))
+        aparte = LecturaAparte(plan.columnas, por_pk)
+        columnas = dict.fromkeys([*aparte.columnas, *(campo.lstrip('-') for campo in ordering)])
+        items = items.values(*columnas)
+
+    paginator = CursorPagination(ordering, opcional=opcional)
+    page = paginator.paginate_queryset(items, request)
+    if page is not None:
+        if rapido:
+            return paginator.get_paginated_response(serializar_filas(plan, aparte.completar(page)))
+        serializer = serializer_class(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    if rapido:
+        return Response(serializar_filas(plan, aparte.completar(items.order_by(*ordering))))
+    serializer = serializer_class(items.order_by(*ordering), many=True, context={'request': request})
+    return Response(serializer.data)
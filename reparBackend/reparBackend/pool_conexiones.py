@@ -0,0 +1,267 @@
+"""
+Pool de conexiones a la base, compartido por todos los threads del proceso
+(los de WSGI y los que usan las vistas async de ASGI).
+
+Django abre una conexión por thread y la cierra al final de cada request
+(CONN_MAX_AGE = 0). Con `ConexionesEnPool` en el DatabaseWrapper (ver
+mysql_pool/base.py) abrir toma una conexión libre del pool y cerrar la
+devuelve, así que la conexión TCP y la autenticación contra MySQL se hacen
+una vez por conexión del pool y no una vez por request.
+
+- Hay como mucho REPAR_DB_POOL_MAXIMO conexiones por proceso y alias. Si
+  están todas en uso, se espera hasta REPAR_DB_POOL_ESPERA segundos a que
+  se libere una y después falla con OperationalError.
+- Una conexión que estuvo libre más de REPAR_DB_POOL_VERIFICAR segundos se
+  verifica (ping) antes de entregarla; si no responde se descarta y se abre
+  otra.
+- Las conexiones con más de REPAR_DB_POOL_RECICLAR segundos se cierran y se
+  reemplazan, por debajo del wait_timeout de MySQL.
+- Una conexión que vuelve con una transacción abierta hace rollback; si
+  falla, se descarta.
+
+Las estadísticas (esperas, tiempo de espera, conexiones creadas y
+descartadas) se ven en /api/metricas/, y el tiempo de abrir o tomar la
+conexión en el tramo `conexion` del header Server-Timing.
+"""
+
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+
+from .instrumentacion import medir
+
+
+class PoolAgotado(OperationalError):
+    pass
+
+
+class _Entrada:
+    __slots__ = ('conexion', 'creada', 'devuelta', 'inicializada')
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.creada = self.devuelta = time.monotonic()
+        # El DatabaseWrapper prepara la sesión (SET ...) una sola vez
+        self.inicializada = False
+
+
+class Pool:
+
+    def __init__(self, maximo, espera, reciclar, verificar_despues):
+        self.maximo = maximo
+        self.espera = espera
+        self.reciclar = reciclar
+        self.verificar_despues = verificar_despues
+        self._libres = []                   # LIFO: las menos usadas envejecen y se reciclan
+        self._abiertas = 0
+        self._cond = threading.Condition()
+        self.cerrado = False
+        self.tomas = self.creadas = self.descartadas = 0
+        self.esperas = self.agotado = 0
+        self.espera_total = self.espera_maxima = 0.0
+
+    def tomar(self, crear, verificar):
+        # crear: () -> conexión DB-API nueva; verificar: conexión -> None, o
+        # una excepción si está caída
+        inicio = time.monotonic()
+        espero = False
+        with self._cond:
+            while True:
+                if self._libres:
+                    entrada = self._libres.pop()
+                    break
+                if self._abiertas < self.maximo:
+                    self._abiertas += 1
+                    entrada = None
+                    break
+                restante = self.espera - (time.monotonic() - inicio)
+                if restante <= 0:
+                    self.agotado += 1
+                    raise PoolAgotado(
+                        f"Las {self.maximo} conexiones del pool están en uso desde hace {self.espera} s "
+                        f"(REPAR_DB_POOL_MAXIMO)."
+                    )
+                espero = True
+                self._cond.wait(restante)
+            esperado = time.monotonic() - inicio
+            self.tomas += 1
+            if espero:
+                self.esperas += 1
+                self.espera_total += esperado
+                self.espera_maxima = max(self.espera_maxima, esperado)
+
+        # Fuera del lock: verificar o abrir una conexión es ir a la red
+        if entrada is not None and not self._sirve(entrada, verificar):
+            self._cerrar(entrada.conexion)
+            entrada = None
+        if entrada is None:
+            try:
+                entrada = _Entrada(crear())
+            except BaseException:
+                with self._cond:
+                    self._abiertas -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.creadas += 1
+        return entrada
+
+    def _sirve(self, entrada, verificar):
+        ahora = time.monotonic()
+        if ahora - entrada.creada >= self.reciclar:
+            return False
+        if ahora - entrada.devuelta >= self.verificar_despues:
+            try:
+                verificar(entrada.conexion)
+            except Exception:
+                return False
+        return True
+
+    def devolver(self, entrada, sucia=False):
+        # sucia: puede tener una transacción abierta o un error pendiente
+        if self.cerrado:
+            self.descartar(entrada)
+            return
+        if sucia:
+            try:
+                entrada.conexion.rollback()
+            except Exception:
+                self.descartar(entrada)
+                return
+        entrada.devuelta = time.monotonic()
+        with self._cond:
+            self._libres.append(entrada)
+            self._cond.notify()
+
+    def descartar(self, entrada):
+        self._cerrar(entrada.conexion)
+        with self._cond:
+            self._abiertas -= 1
+            self._cond.notify()
+
+    def _cerrar(self, conexion):
+        with self._cond:
+            self.descartadas += 1
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def cerrar(self):
+        # Cierra las libres; las que están en uso se cierran al devolverse
+        with self._cond:
+            self.cerrado = True
+            libres, self._libres = self._libres, []
+            self._abiertas -= len(libres)
+            self._cond.notify_all()
+        for entrada in libres:
+            self._cerrar(entrada.conexion)
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                'maximo': self.maximo,
+                'abiertas': self._abiertas,
+                'libres': len(self._libres),
+                'en_uso': self._abiertas - len(self._libres),
+                'tomas': self.tomas,
+                'creadas': self.creadas,
+                'descartadas': self.descartadas,
+                'esperas': self.esperas,
+                'espera_media_ms': round(self.espera_total / self.esperas * 1000, 2) if self.esperas else 0.0,
+                'espera_maxima_ms': round(self.espera_maxima * 1000, 2),
+                'agotado': self.agotado,
+            }
+
+
+# (alias, pid) -> Pool. Con el pid, un proceso hijo de un fork (gunicorn
+# --preload) no usa las conexiones del padre.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_de(wrapper):
+    clave = (wrapper.alias, os.getpid())
+    pool = _pools.get(clave)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(clave)
+            if pool is None:
+                pool = _pools[clave] = Pool(
+                    maximo=getattr(settings, 'REPAR_DB_POOL_MAXIMO', 20),
+                    espera=getattr(settings, 'REPAR_DB_POOL_ESPERA', 5),
+                    reciclar=getattr(settings, 'REPAR_DB_POOL_RECICLAR', 1800),
+                    verificar_despues=getattr(settings, 'REPAR_DB_POOL_VERIFICAR', 30),
+                )
+    return pool
+
+
+def estadisticas():
+    pid = os.getpid()
+    return {alias: pool.estadisticas() for (alias, dueño), pool in list(_pools.items()) if dueño == pid}
+
+
+def cerrar_pools():
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [(clave, pool) for clave, pool in _pools.items() if clave[1] == pid]
+        for clave, _ in pools:
+            del _pools[clave]
+    for _, pool in pools:
+        pool.cerrar()
+
+
+class ConexionesEnPool:
+    # Mixin para el DatabaseWrapper de un backend. Con REPAR_DB_POOL = False
+    # se comporta como el backend original (abre y cierra de verdad), pero
+    # igual mide el tramo `conexion`.
+
+    _entrada = None
+    _pool = None
+
+    def abrir_conexion(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    @staticmethod
+    def verificar_conexion(conexion):
+        cursor = conexion.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def connect(self):
+        with medir('conexion'):
+            super().connect()
+
+    def get_new_connection(self, conn_params):
+        if not getattr(settings, 'REPAR_DB_POOL', True):
+            self._entrada = self._pool = None
+            return self.abrir_conexion(conn_params)
+        self._pool = pool_de(self)
+        self._entrada = self._pool.tomar(lambda: self.abrir_conexion(conn_params), self.verificar_conexion)
+        return self._entrada.conexion
+
+    def init_connection_state(self):
+        # La sesión de una conexión del pool ya quedó preparada la primera vez
+        if self._entrada is not None and self._entrada.inicializada:
+            return
+        super().init_connection_state()
+        if self._entrada is not None:
+            self._entrada.inicializada = True
+
+    def _close(self):
+        entrada, pool = self._entrada, self._pool
+        self._entrada = self._pool = None
+        if entrada is None or entrada.conexion is not self.connection:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # close() deja la conexión referenciada hasta el próximo
+                # connect(): no puede volver al pool
+                pool.descartar(entrada)
+            else:
+                pool.devolver(entrada, sucia=self.errors_occurred or not self.autocommit)
@@ -0,0 +1,215 @@
+"""
+Camino rápido para los listados de solo lectura.
+
+`PlanFilas` recorre una vez los campos de un serializer (respetando
+?fields= / ?expand=) y arma la lista de columnas para `.values()` y, por
+cada campo, cómo pasarlo a la respuesta. Así cada fila se convierte en un
+dict sin instanciar modelos ni serializers anidados por fila; el resultado
+es el mismo que `serializer_class(items, many=True).data`.
+
+`JSONRapidoRenderer` produce los mismos bytes que el JSONRenderer de DRF,
+pero codifica con orjson cuando está instalado.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .instrumentacion import medir
+from .serializers import SELECCION_COMPLETA, Seleccion
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Números que orjson escribe distinto que json: con exponente (1e16 vs 1e+16)
+# o menores a 1e-4 sin exponente (0.00001 vs 1e-05)
+_FLOAT_DISTINTO = re.compile(rb'[:,\[]-?(?:\d+(?:\.\d+)?e|0\.0000)')
+
+# Campos que DRF devuelve tal como vienen de la base
+SIN_CONVERSION = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.FloatField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+def _nombre_campo(modelo, source):
+    # 'id_trabajador_id' (attname) -> 'id_trabajador'
+    for campo in modelo._meta.concrete_fields:
+        if source in (campo.name, campo.attname):
+            return campo.name
+    raise ValueError(f"{modelo.__name__}.{source} no es una columna.")
+
+
+class PlanFilas:
+
+    def __init__(self, serializer_class, seleccion=SELECCION_COMPLETA, prefijo=''):
+        serializer = serializer_class(seleccion=seleccion)
+        modelo = serializer.Meta.model
+        self.pk = prefijo + modelo._meta.pk.name
+        self.columnas = [self.pk]
+        self.campos = []      # (nombre, columna, conversion)
+        self.anidados = []    # (nombre, plan, vacio, claves_padre)
+
+        for nombre, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if nombre in serializer.anidados:
+                self._agregar_anidado(serializer, modelo, nombre, seleccion, prefijo)
+            elif isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                raise ValueError(f"{serializer_class.__name__}.{nombre} no se puede leer de .values().")
+            else:
+                columna = prefijo + _nombre_campo(modelo, field.source)
+                conversion = None if isinstance(field, SIN_CONVERSION) else field.to_representation
+                self.campos.append((nombre, columna, conversion))
+                self.columnas.append(columna)
+        self.columnas = list(dict.fromkeys(self.columnas))
+
+    def _agregar_anidado(self, serializer, modelo, nombre, seleccion, prefijo):
+        fk = serializer.anidados[nombre]
+        sub_serializer = serializer.relaciones[fk]
+        sub_seleccion = seleccion.sub(nombre)
+        plan = PlanFilas(sub_serializer, sub_seleccion, f'{prefijo}{fk}__')
+
+        relacion = modelo._meta.get_field(fk)
+        if relacion.one_to_one and relacion.auto_created:
+            # Relacion inversa que puede no tener fila (reputacion): se
+            # devuelve el objeto en cero apuntando al padre, como get_reputacion
+            vacio = dict(sub_serializer(relacion.related_model(), seleccion=sub_seleccion).data)
+            campo_padre = relacion.field.name
+            claves_padre = [n for n, f in sub_serializer(seleccion=sub_seleccion).fields.items()
+                            if not f.write_only and f.source == campo_padre]
+        else:
+            vacio = dict(sub_serializer(None, seleccion=sub_seleccion).data)
+            claves_padre = []
+        self.anidados.append((nombre, plan, vacio, claves_padre))
+        self.columnas.extend(plan.columnas)
+
+    def armar(self, fila):
+        item = {}
+        for nombre, columna, conversion in self.campos:
+            valor = fila[columna]
+            item[nombre] = valor if conversion is None or valor is None else conversion(valor)
+        for nombre, plan, vacio, claves_padre in self.anidados:
+            if fila[plan.pk] is None:
+                anidado = dict(vacio)
+                for clave in claves_padre:
+                    anidado[clave] = fila[self.pk]
+            else:
+                anidado = plan.armar(fila)
+            item[nombre] = anidado
+        return item
+
+
+class LecturaAparte:
+    # Las columnas de un anidado que no se leen con un join sino con otra
+    # query, por PK y solo para las filas que se van a devolver: por_pk es
+    # {fk: modelo del que salen}. `columnas` es lo que queda para la query
+    # principal (con la FK en lugar de las del anidado) y `completar(filas)`
+    # agrega las otras con los mismos nombres, así PlanFilas no cambia.
+
+    def __init__(self, columnas, por_pk=None):
+        self.aparte = {}    # fk -> (modelo, columnas del modelo)
+        principales = []
+        for columna in columnas:
+            fk, _, resto = columna.partition('__')
+            if por_pk and fk in por_pk and resto:
+                self.aparte.setdefault(fk, (por_pk[fk], []))[1].append(resto)
+                columna = fk
+            principales.append(columna)
+        self.columnas = list(dict.fromkeys(principales))
+
+    def completar(self, filas, lote=1000):
+        if not self.aparte:
+            return filas
+        filas = list(filas)
+        for fk, (modelo, columnas) in self.aparte.items():
+            pk = modelo._meta.pk.name
+            ids = list({fila[fk] for fila in filas if fila[fk] is not None})
+            objetos = {}
+            for i in range(0, len(ids), lote):
+                for objeto in modelo.objects.filter(pk__in=ids[i:i + lote]).values(pk, *columnas):
+                    objetos[objeto[pk]] = objeto
+            for fila in filas:
+                objeto = objetos.get(fila[fk])
+                for columna in columnas:
+                    fila[f'{fk}__{columna}'] = objeto[columna] if objeto is not None else None
+        return filas
+
+
+@lru_cache(maxsize=256)
+def plan_filas(serializer_class, fields=None, expand=None):
+    # Armar el plan instancia todos los serializers anidados; como no cambia,
+    # se comparte entre requests (uno por serializer y valor de ?fields=/?expand=)
+    return PlanFilas(serializer_class, Seleccion.desde_texto(fields, expand))
+
+
+def _floats_finitos(data):
+    # orjson escribe NaN e infinito como null; json (con STRICT_JSON de DRF)
+    # lanza ValueError. Un dato con alguno tiene que ir por el camino normal.
+    pendientes = [data]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, float):
+            if not math.isfinite(valor):
+                return False
+        elif isinstance(valor, dict):
+            pendientes.extend(valor.values())
+        elif isinstance(valor, (list, tuple)):
+            pendientes.extend(valor)
+    return True
+
+
+def serializar_filas(plan, filas):
+    with medir('serializer'):
+        return [plan.armar(fila) for fila in filas]
+
+
+class JSONRapidoRenderer(JSONRenderer):
+
+    @medir('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        if (self.get_indent(accepted_media_type, renderer_context)
+                or not api_settings.UNICODE_JSON or not api_settings.COMPACT_JSON):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if not _floats_finitos(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = self.encoder_class()
+
+        def default(valor):
+            # Lo que convierte el encoder (Decimal -> float) también tiene
+            # que ser finito
+            valor = encoder.default(valor)
+            if not _floats_finitos(valor):
+                raise TypeError("float no finito")
+            return valor
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            # Lo que orjson no sabe representar igual que json (enteros
+            # enormes, floats no finitos que devolvió el encoder, ...) va por
+            # el camino normal
+            return super().render(data, accepted_media_type, renderer_context)
+        if _FLOAT_DISTINTO.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que JSONRenderer: U+2028/U+2029 escapados para poder
+        # embeber la respuesta en JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
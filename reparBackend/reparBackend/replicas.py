@@ -0,0 +1,253 @@
+"""
+Lecturas en réplicas de la base.
+
+Los requests GET, HEAD y OPTIONS (casi todo el tráfico: listas de trabajos,
+postulaciones, calificaciones, catálogos) leen de una de las réplicas de
+REPAR_DB_REPLICAS, que son alias de DATABASES. El resto va a 'default', la
+primaria:
+
+- las escrituras, y todo lo que corre en un POST/PATCH/DELETE;
+- las lecturas de un request que ya escribió, o dentro de una transacción;
+- lectura propia: durante REPAR_DB_LECTURA_PROPIA segundos después de que
+  un usuario escribe, sus requests leen de la primaria, así ve lo que acaba
+  de guardar. La marca se guarda en el cache de Django, que con varios
+  procesos tiene que ser compartido;
+- una réplica con más de REPAR_DB_REPLICA_DEMORA_MAXIMA segundos de demora,
+  o que no responde, no se usa hasta la próxima medición (cada
+  REPAR_DB_REPLICA_CHEQUEO segundos por proceso);
+- fuera de un request (comandos, shell, WebSockets).
+
+Un request elige la réplica la primera vez que lee y la usa hasta el final,
+así sus consultas (también las que una vista async corre en otros threads)
+ven todas el mismo momento de la base.
+"""
+
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+from .autenticacion import cache_tokens
+
+logger = logging.getLogger('reparBackend.replicas')
+
+SOLO_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+_lectura_actual = ContextVar('lectura', default=None)
+
+
+def replicas_configuradas():
+    return list(getattr(settings, 'REPAR_DB_REPLICAS', ()))
+
+
+def demora_de(conexion):
+    # Segundos de atraso de la réplica, o None si no está replicando
+    if conexion.vendor != 'mysql':
+        # SQLite de desarrollo y tests: no hay replicación que medir
+        return 0.0
+    nueva = (10, 5, 1) if conexion.mysql_is_mariadb else (8, 0, 22)
+    with conexion.cursor() as cursor:
+        cursor.execute('SHOW REPLICA STATUS' if conexion.mysql_version >= nueva else 'SHOW SLAVE STATUS')
+        fila = cursor.fetchone()
+        if fila is None:
+            return None
+        columnas = [columna[0] for columna in cursor.description]
+    for nombre in ('Seconds_Behind_Source', 'Seconds_Behind_Master'):
+        if nombre in columnas:
+            valor = fila[columnas.index(nombre)]
+            return None if valor is None else float(valor)
+    return None
+
+
+class Demoras:
+    # Última demora medida de cada réplica, compartida por los threads del
+    # proceso. Mide un solo thread a la vez; los demás usan la medición
+    # anterior.
+
+    def __init__(self):
+        self._medidas = {}              # alias -> (segundos o None, time.monotonic())
+        self._midiendo = set()
+        self._lock = threading.Lock()
+        self.contadores = {}            # a dónde fueron las lecturas de los requests
+
+    def disponible(self, alias):
+        chequeo = getattr(settings, 'REPAR_DB_REPLICA_CHEQUEO', 5)
+        with self._lock:
+            demora, medida = self._medidas.get(alias, (None, None))
+            medir = (medida is None or time.monotonic() - medida >= chequeo) and alias not in self._midiendo
+            if medir:
+                self._midiendo.add(alias)
+        if medir:
+            demora = self._medir(alias)
+        return demora is not None and demora <= getattr(settings, 'REPAR_DB_REPLICA_DEMORA_MAXIMA', 2)
+
+    def _medir(self, alias):
+        funcion = import_string(getattr(settings, 'REPAR_DB_REPLICA_DEMORA', 'reparBackend.replicas.demora_de'))
+        try:
+            demora = funcion(connections[alias])
+        except Exception as e:
+            logger.warning("No se pudo medir la demora de la réplica %s: %s", alias, e)
+            demora = None
+        with self._lock:
+            self._medidas[alias] = (demora, time.monotonic())
+            self._midiendo.discard(alias)
+        return demora
+
+    def contar(self, destino):
+        with self._lock:
+            self.contadores[destino] = self.contadores.get(destino, 0) + 1
+
+    def estadisticas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            return {
+                'replicas': {
+                    alias: {
+                        'demora_s': self._medidas.get(alias, (None,))[0],
+                        'medida_hace_s': round(ahora - self._medidas[alias][1], 1) if alias in self._medidas else None,
+                    }
+                    for alias in replicas_configuradas()
+                },
+                'requests': dict(self.contadores),
+            }
+
+
+demoras = Demoras()
+_turno = itertools.count()
+
+
+def _clave_escritura(uid):
+    return 'repar:escritura:' + hashlib.sha1(uid.encode('utf-8')).hexdigest()
+
+
+def recordar_escritura(uid):
+    # Las lecturas de `uid` van a la primaria por REPAR_DB_LECTURA_PROPIA s
+    cache.set(_clave_escritura(uid), True, getattr(settings, 'REPAR_DB_LECTURA_PROPIA', 10))
+
+
+def uid_del_request(request):
+    # El token ya lo verificó la autenticación de DRF: alcanza con el cache
+    # de tokens verificados
+    partes = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(partes) != 2 or partes[0] != 'Bearer':
+        return None
+    claims = cache_tokens.get(partes[1])
+    return claims['uid'] if claims is not None else None
+
+
+class Lectura:
+    # Adónde van las lecturas de un request
+
+    def __init__(self, request):
+        self.request = request
+        self.solo_lectura = request.method in SOLO_LECTURA
+        self.escribio = False
+        self.alias = None
+        self._lock = threading.Lock()
+
+    def alias_de_lectura(self):
+        if not self.solo_lectura or self.escribio or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if self.alias is None:
+            with self._lock:
+                if self.alias is None:
+                    self.alias = self._elegir()
+        return self.alias
+
+    def _elegir(self):
+        uid = uid_del_request(self.request)
+        if uid is not None and cache.get(_clave_escritura(uid)):
+            demoras.contar('primaria_lectura_propia')
+            return DEFAULT_DB_ALIAS
+        disponibles = [alias for alias in replicas_configuradas() if demoras.disponible(alias)]
+        if not disponibles:
+            demoras.contar('primaria_sin_replica')
+            return DEFAULT_DB_ALIAS
+        alias = disponibles[next(_turno) % len(disponibles)]
+        demoras.contar(alias)
+        return alias
+
+
+def demora_tolerada():
+    # Cuánto puede atrasar lo que el request actual leyó hasta ahora
+    lectura = _lectura_actual.get()
+    if lectura is None or lectura.alias in (None, DEFAULT_DB_ALIAS) or lectura.escribio:
+        return 0
+    return getattr(settings, 'REPAR_DB_REPLICA_DEMORA_MAXIMA', 2)
+
+
+class RouterReplicas:
+
+    def db_for_read(self, model, **hints):
+        lectura = _lectura_actual.get()
+        if lectura is None:
+            return None
+        return lectura.alias_de_lectura()
+
+    def db_for_write(self, model, **hints):
+        lectura = _lectura_actual.get()
+        if lectura is not None:
+            lectura.escribio = True
+        # Aunque la instancia se haya leído de una réplica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *replicas_configuradas()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben las tablas por la replicación
+        if db in replicas_configuradas():
+            return False
+        return None
+
+
+class ReplicasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas_configuradas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        lectura = Lectura(request)
+        token = _lectura_actual.set(lectura)
+        try:
+            response = self.get_response(request)
+        finally:
+            _lectura_actual.reset(token)
+        self.despues(lectura)
+        return response
+
+    async def __acall__(self, request):
+        lectura = Lectura(request)
+        token = _lectura_actual.set(lectura)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _lectura_actual.reset(token)
+        self.despues(lectura)
+        return response
+
+    def despues(self, lectura):
+        if lectura.escribio:
+            uid = uid_del_request(lectura.request)
+            if uid is not None:
+                recordar_escritura(uid)
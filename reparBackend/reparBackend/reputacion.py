@@ -0,0 +1,147 @@
+"""
+Mantenimiento de los agregados de calificaciones (ReputacionTrabajador y
+ReputacionContratador).
+
+Cada calificación nueva suma sobre la fila del calificado dentro de la misma
+transacción, así leer la reputación de un perfil es una sola fila sin
+importar cuántas calificaciones tenga. `recalcular` reconstruye todo desde
+las tablas de calificaciones.
+
+Las calificaciones que se borran se restan con señales, también en la misma
+transacción. Las que se van en cascada con un trabajo, un trabajador o un
+contratador no se restan de a una: se restan todas juntas antes del DELETE,
+como las postulaciones en tarjetas.py.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet, Sum
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    CalificacionContratador,
+    CalificacionTrabajador,
+    Contratador,
+    ReputacionContratador,
+    ReputacionTrabajador,
+    Trabajador,
+    Trabajo,
+)
+
+# modelo de reputacion -> (modelo de calificacion, FK al calificado)
+FUENTES = {
+    ReputacionTrabajador: (CalificacionTrabajador, 'id_trabajador'),
+    ReputacionContratador: (CalificacionContratador, 'id_contratador'),
+}
+
+# Modelo que se borra -> rutas desde una calificacion a lo que se la lleva en cascada
+CASCADAS = {
+    Trabajo: ['id_trabajo'],
+    Trabajador: ['id_trabajador'],
+    Contratador: ['id_contratador', 'id_trabajador__id_contratador', 'id_trabajo__id_contratador'],
+}
+
+CAMPOS = ['cantidad', 'suma', 'promedio'] + [f'estrellas_{n}' for n in range(1, 6)]
+
+
+def registrar_calificacion(modelo, id_calificado, calificacion):
+    # select_for_update serializa las calificaciones simultaneas al mismo
+    # perfil; tiene que llamarse dentro de transaction.atomic.
+    reputacion, _ = modelo.objects.select_for_update().get_or_create(pk=id_calificado)
+    reputacion.registrar(calificacion)
+    reputacion.save()
+    return reputacion
+
+
+def quitar_calificaciones(modelo, calificaciones):
+    # Un SELECT ... FOR UPDATE de las reputaciones afectadas y un UPDATE en
+    # bloque; tiene que llamarse dentro de transaction.atomic. Las que ya no
+    # tienen fila (el calificado se borra en la misma cascada) se ignoran.
+    _, campo = FUENTES[modelo]
+    por_calificado = defaultdict(list)
+    for calificacion in calificaciones:
+        por_calificado[getattr(calificacion, campo + '_id')].append(calificacion.calificacion)
+    if not por_calificado:
+        return
+    reputaciones = list(modelo.objects.select_for_update().filter(pk__in=por_calificado))
+    for reputacion in reputaciones:
+        for calificacion in por_calificado[reputacion.pk]:
+            reputacion.quitar(calificacion)
+    modelo.objects.bulk_update(reputaciones, CAMPOS)
+    if modelo is ReputacionTrabajador:
+        # Como al calificar: la reputacion es parte de la respuesta del trabajador
+        Trabajador.objects.filter(pk__in=por_calificado).update(fecha_actualizacion=timezone.now())
+
+
+def _agregados(modelo_calificacion, campo):
+    # Mismo redondeo que Reputacion.estrellas: n estrellas = [n - 0.5, n + 0.5)
+    histograma = {
+        f'estrellas_{n}': Count('pk', filter=Q(calificacion__gte=Decimal(n) - Decimal('0.5'),
+                                              calificacion__lt=Decimal(n) + Decimal('0.5')))
+        for n in range(1, 6)
+    }
+    return (modelo_calificacion.objects.order_by()
+            .values(campo)
+            .annotate(cantidad=Count('pk'), suma=Sum('calificacion'), **histograma))
+
+
+@transaction.atomic
+def recalcular(modelo, batch_size=1000):
+    modelo_calificacion, campo = FUENTES[modelo]
+    reputaciones = []
+    for fila in _agregados(modelo_calificacion, campo).iterator():
+        reputacion = modelo(pk=fila.pop(campo), **fila)
+        reputacion.suma = Decimal(reputacion.suma)
+        reputacion.promedio = reputacion.calcular_promedio()
+        reputaciones.append(reputacion)
+
+    modelo.objects.all().delete()
+    modelo.objects.bulk_create(reputaciones, batch_size=batch_size)
+    return len(reputaciones)
+
+
+def diferencias(modelo):
+    # PKs de las reputaciones que no coinciden con sus calificaciones (una
+    # reputacion sin calificaciones tiene que estar en cero o no existir)
+    modelo_calificacion, campo = FUENTES[modelo]
+    esperadas = {fila.pop(campo): fila for fila in _agregados(modelo_calificacion, campo)}
+    for reputacion in modelo.objects.all():
+        esperada = modelo(pk=reputacion.pk, **esperadas.pop(reputacion.pk, {}))
+        esperada.suma = Decimal(esperada.suma)
+        esperada.promedio = esperada.calcular_promedio()
+        if any(getattr(reputacion, nombre) != getattr(esperada, nombre) for nombre in CAMPOS):
+            yield reputacion.pk
+    yield from esperadas
+
+
+def _modelo(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(pre_delete, sender=Trabajo)
+@receiver(pre_delete, sender=Trabajador)
+@receiver(pre_delete, sender=Contratador)
+def _por_borrar(sender, instance, origin=None, **kwargs):
+    # Solo lo que se pidió borrar: lo que cae en cascada con eso (el
+    # trabajador y los trabajos de un contratador) ya entra en sus rutas
+    if _modelo(origin) is not sender:
+        return
+    filtro = reduce(or_, (Q(**{ruta: instance.pk}) for ruta in CASCADAS[sender]))
+    for modelo, (modelo_calificacion, campo) in FUENTES.items():
+        quitar_calificaciones(modelo, modelo_calificacion.objects.filter(filtro).only(campo, 'calificacion'))
+
+
+@receiver(post_delete, sender=CalificacionTrabajador)
+@receiver(post_delete, sender=CalificacionContratador)
+def _calificacion_borrada(sender, instance, origin=None, **kwargs):
+    # Las que se borran en cascada ya se restaron en _por_borrar
+    if _modelo(origin) in CASCADAS:
+        return
+    modelo = ReputacionTrabajador if sender is CalificacionTrabajador else ReputacionContratador
+    quitar_calificaciones(modelo, [instance])
@@ -5,42 +5,284 @@ Created on Fri Sep 12 17:18:34 2025
 """
 
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.utils import timezone
 
-from .models import CalificacionContratador, CalificacionTrabajador, Contratador, Estado, Postulacion, Profesion, Trabajador, TrabajadoresProfesion, Trabajo, ZonaGeografica
+from .instrumentacion import medir
+from .models import ESTADO_PUBLICADO, CalificacionContratador, CalificacionTrabajador, Contratador, Estado, Postulacion, Profesion, ReputacionContratador, ReputacionTrabajador, TarjetaTrabajo, Trabajador, TrabajadoresProfesion, Trabajo, ZonaGeografica
+from .reputacion import registrar_calificacion
+from .transiciones import actualizar_trabajo
 
 # ----------------------------------------------------------
 
-class ZonaGeograficaSerializer(serializers.ModelSerializer):
+def _arbol(rutas):
+    # ['titulo', 'trabajador.contratador.nombre'] -> {'titulo': [], 'trabajador': ['contratador.nombre']}
+    if rutas is None:
+        return None
+    arbol = {}
+    for ruta in rutas:
+        nombre, _, resto = ruta.strip().partition('.')
+        if nombre:
+            arbol.setdefault(nombre, [])
+            if resto:
+                arbol[nombre].append(resto)
+    return arbol
+
+
+class Seleccion:
+    # Que campos y que objetos anidados devuelve un serializer, segun
+    # ?fields=titulo,estado.descripcion y ?expand=trabajador.contratador
+    #  - sin fields ni expand se devuelve todo, como siempre;
+    #  - con fields solo los campos listados (un anidado listado se expande);
+    #  - con expand solo se expanden los anidados listados (?expand= vacio no
+    #    expande ninguno).
+    # Las rutas con punto se aplican al serializer anidado.
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = _arbol(fields)
+        self.expand = _arbol(expand)
+
+    @staticmethod
+    def pedida(request):
+        return 'fields' in request.query_params or 'expand' in request.query_params
+
+    @classmethod
+    def desde_request(cls, request):
+        return cls.desde_texto(request.query_params.get('fields'), request.query_params.get('expand'))
+
+    @classmethod
+    def desde_texto(cls, fields, expand):
+        return cls(fields.split(',') if fields else None, expand.split(',') if expand is not None else None)
+
+    def incluye(self, nombre, anidado=False):
+        if anidado and self.expand is not None and nombre in self.expand:
+            return True
+        if self.fields is not None:
+            return nombre in self.fields
+        return not anidado or self.expand is None
+
+    def sub(self, nombre):
+        fields = self.fields.get(nombre) if self.fields is not None else None
+        expand = self.expand.get(nombre, []) if self.expand is not None else None
+        return Seleccion(fields or None, expand)
+
+
+SELECCION_COMPLETA = Seleccion()
+
+
+class ListaMedida(serializers.ListSerializer):
+    # Los listados tambien cuentan como tiempo de serializer (ver instrumentacion.py)
+
+    @property
+    def data(self):
+        with medir('serializer'):
+            return super().data
+
+
+class ListaEnBloque(ListaMedida):
+    # POST con una lista de objetos: se validan todos y se insertan con un
+    # solo bulk_create. Lo que el serializer de un objeto deja al
+    # IntegrityError (FK que no existen, `unica_en_bloque` repetida) se
+    # revisa antes contra la base, con una query por FK, asi los errores
+    # vuelven en una lista alineada con la recibida, como los de validacion.
+    # El serializer hijo declara `foraneas_en_bloque` ({campo: modelo}),
+    # `unica_en_bloque`, `mensaje_repetido` e `instanciar(validated_data)`.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # La unicidad se revisa para todo el lote en errores_de_base, no con
+        # una query por objeto
+        self.child.validators = [v for v in self.child.validators if not isinstance(v, UniqueTogetherValidator)]
+
+    def to_internal_value(self, data):
+        validados = super().to_internal_value(data)
+        errores = self.errores_de_base(validados)
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        return validados
+
+    def errores_de_base(self, validados):
+        child = self.child
+        errores = [{} for _ in validados]
+        for nombre, modelo in child.foraneas_en_bloque.items():
+            origen = child.fields[nombre].source
+            existentes = set(modelo.objects.filter(pk__in={item[origen] for item in validados}).values_list('pk', flat=True))
+            for error, item in zip(errores, validados):
+                if item[origen] not in existentes:
+                    error[nombre] = [f"No existe {modelo._meta.verbose_name.lower()} con ID {item[origen]}."]
+        if validados:
+            origenes = [child.fields[nombre].source for nombre in child.unica_en_bloque]
+            filtro = {f'{origen}__in': {item[origen] for item in validados} for origen in origenes}
+            repetidas = set(child.Meta.model.objects.filter(**filtro).values_list(*origenes))
+            for error, item in zip(errores, validados):
+                clave = tuple(item[origen] for origen in origenes)
+                if clave in repetidas:
+                    error['non_field_errors'] = [child.mensaje_repetido]
+                repetidas.add(clave)
+        return errores
+
+    def create(self, validated_data):
+        child = self.child
+        modelo = child.Meta.model
+        objetos = modelo.objects.bulk_create([child.instanciar(item) for item in validated_data])
+        if objetos and objetos[0].pk is None:
+            # MySQL no devuelve los IDs de un INSERT de varias filas: se leen
+            # por la restriccion unica
+            columnas = [modelo._meta.get_field(child.fields[nombre].source).attname for nombre in child.unica_en_bloque]
+            filtro = {f'{columna}__in': {getattr(objeto, columna) for objeto in objetos} for columna in columnas}
+            pks = {fila[:-1]: fila[-1] for fila in modelo.objects.filter(**filtro).values_list(*columnas, 'pk')}
+            for objeto in objetos:
+                objeto.pk = pks[tuple(getattr(objeto, columna) for columna in columnas)]
+        return objetos
+
+
+class ListaZonas(ListaEnBloque):
+    # Las zonas no fallan por repetidas: se devuelve la que ya existe
+
+    def errores_de_base(self, validados):
+        return [{} for _ in validados]
+
+    def create(self, validated_data):
+        return ZonaGeografica.objects.obtener_o_crear_varias(validated_data)
+
+
+class EagerLoadingMixin:
+    # Cada serializer declara en `relaciones` las FK que recorre en sus get_*
+    # y el serializer anidado que usa para cada una, y en `anidados` que campo
+    # de la respuesta sale de cada FK. A partir de eso se arma un unico
+    # select_related para la vista, asi listar N filas cuesta una cantidad
+    # constante de queries, y solo con los joins de lo que se va a devolver.
+    relaciones = {}
+    anidados = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = ListaMedida
+
+    def __init__(self, *args, seleccion=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if seleccion is None:
+            request = self.context.get('request')
+            seleccion = Seleccion.desde_request(request) if request is not None else SELECCION_COMPLETA
+        self.seleccion = seleccion
+        for nombre, field in list(self.fields.items()):
+            if not field.write_only and not seleccion.incluye(nombre, nombre in self.anidados):
+                del self.fields[nombre]
+
+    @property
+    def data(self):
+        with medir('serializer'):
+            return super().data
+
+    @classmethod
+    def rutas_select_related(cls, prefijo='', seleccion=SELECCION_COMPLETA):
+        rutas = []
+        for campo, fk in cls.anidados.items():
+            if not seleccion.incluye(campo, anidado=True):
+                continue
+            ruta = prefijo + fk
+            rutas.append(ruta)
+            rutas.extend(cls.relaciones[fk].rutas_select_related(ruta + '__', seleccion.sub(campo)))
+        return rutas
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        seleccion = Seleccion.desde_request(request) if request is not None else SELECCION_COMPLETA
+        rutas = cls.rutas_select_related(seleccion=seleccion)
+        if rutas:
+            queryset = queryset.select_related(*rutas)
+        return queryset
+
+    def serializar_anidado(self, campo, instancia):
+        serializer_class = self.relaciones[self.anidados[campo]]
+        return serializer_class(instancia, seleccion=self.seleccion.sub(campo)).data
+
+
+class ZonaGeograficaSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = ZonaGeografica
-        fields = '__all__'
+        exclude = ('clave', 'geohash')
+        list_serializer_class = ListaZonas
+
+    def validate(self, data):
+        latitud = data.get('latitud', getattr(self.instance, 'latitud', None))
+        longitud = data.get('longitud', getattr(self.instance, 'longitud', None))
+        if (latitud is None) != (longitud is None):
+            raise serializers.ValidationError("'latitud' y 'longitud' se envían juntas.")
+        return data
+
+    def create(self, validated_data):
+        zona, _ = ZonaGeografica.objects.obtener_o_crear(**validated_data)
+        return zona
 
 
-class ProfesionSerializer(serializers.ModelSerializer):
+class ProfesionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Profesion
         fields = '__all__'
 
 
-class EstadoSerializer(serializers.ModelSerializer):
+class EstadoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Estado
         fields = '__all__'
 
 
-class ContratadorSerializer(serializers.ModelSerializer):
+REPUTACION_FIELDS = ('cantidad', 'suma', 'promedio',
+                     'estrellas_1', 'estrellas_2', 'estrellas_3', 'estrellas_4', 'estrellas_5')
+
+
+class ReputacionTrabajadorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ReputacionTrabajador
+        fields = ('id_trabajador',) + REPUTACION_FIELDS
+
+
+class ReputacionContratadorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ReputacionContratador
+        fields = ('id_contratador',) + REPUTACION_FIELDS
+
+
+def get_reputacion(serializer, obj, modelo, campo):
+    # Sin calificaciones todavia no hay fila: se devuelve el agregado en cero
+    try:
+        reputacion = obj.reputacion
+    except ObjectDoesNotExist:
+        reputacion = modelo(**{campo: obj})
+    return serializer.serializar_anidado('reputacion', reputacion)
+
+
+class ContratadorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     zona_geografica_contratador = serializers.SerializerMethodField()
+    reputacion = serializers.SerializerMethodField()
     id_zona_geografica_contratador = serializers.IntegerField(write_only=True, required=False, allow_null=True)
 
+    relaciones = {
+        'id_zona_geografica_contratador': ZonaGeograficaSerializer,
+        'reputacion': ReputacionContratadorSerializer,
+    }
+    anidados = {
+        'zona_geografica_contratador': 'id_zona_geografica_contratador',
+        'reputacion': 'reputacion',
+    }
+
     class Meta:
         model = Contratador
         fields = ('id_contratador', 'id_zona_geografica_contratador', 'nombre', 'apellido',
-                  'email_contratador', 'telefono_contratador', 'dni', 'uid_firebase', 'zona_geografica_contratador')
+                  'email_contratador', 'telefono_contratador', 'dni', 'uid_firebase', 'zona_geografica_contratador',
+                  'reputacion')
 
     def get_zona_geografica_contratador(self, obj):
         zona_geografica_contratador = obj.id_zona_geografica_contratador
-        return ZonaGeograficaSerializer(zona_geografica_contratador).data
+        return self.serializar_anidado('zona_geografica_contratador', zona_geografica_contratador)
+
+    def get_reputacion(self, obj):
+        return get_reputacion(self, obj, ReputacionContratador, 'id_contratador')
 
     def create(self, validated_data):
         id_zona_geografica_contratador = validated_data.pop('id_zona_geografica_contratador', None)
@@ -75,25 +317,40 @@ class ContratadorSerializer(serializers.ModelSerializer):
         return instance
 
 
-class TrabajadorSerializer(serializers.ModelSerializer):
+class TrabajadorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     contratador = serializers.SerializerMethodField()
     zona_geografica_trabajador = serializers.SerializerMethodField()
+    reputacion = serializers.SerializerMethodField()
     id_contratador = serializers.IntegerField(write_only=True)
     id_zona_geografica_trabajador = serializers.IntegerField(write_only=True)
 
+    relaciones = {
+        'id_contratador': ContratadorSerializer,
+        'id_zona_geografica_trabajador': ZonaGeograficaSerializer,
+        'reputacion': ReputacionTrabajadorSerializer,
+    }
+    anidados = {
+        'contratador': 'id_contratador',
+        'zona_geografica_trabajador': 'id_zona_geografica_trabajador',
+        'reputacion': 'reputacion',
+    }
+
     class Meta:
         model = Trabajador
         fields = ('id_trabajador', 'id_contratador', 'id_zona_geografica_trabajador',
                   'telefono_trabajador', 'mail_trabajador',
-                  'contratador', 'zona_geografica_trabajador')
+                  'contratador', 'zona_geografica_trabajador', 'reputacion')
 
     def get_contratador(self, obj):
         contratador = obj.id_contratador
-        return ContratadorSerializer(contratador).data
+        return self.serializar_anidado('contratador', contratador)
 
     def get_zona_geografica_trabajador(self, obj):
         zona_geografica_trabajador = obj.id_zona_geografica_trabajador
-        return ZonaGeograficaSerializer(zona_geografica_trabajador).data
+        return self.serializar_anidado('zona_geografica_trabajador', zona_geografica_trabajador)
+
+    def get_reputacion(self, obj):
+        return get_reputacion(self, obj, ReputacionTrabajador, 'id_trabajador')
 
     def create(self, validated_data):
         id_contratador = validated_data.pop('id_contratador')
@@ -123,36 +380,57 @@ class TrabajadorSerializer(serializers.ModelSerializer):
         return instance
 
 
-class TrabajadoresProfesionSerializer(serializers.ModelSerializer):
+class TrabajadoresProfesionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     trabajador = serializers.SerializerMethodField()
     profesion = serializers.SerializerMethodField()
     
     id_trabajador = serializers.IntegerField(source='id_trabajador_id')
     id_profesion = serializers.IntegerField(source='id_profesion_id')
 
+    relaciones = {
+        'id_trabajador': TrabajadorSerializer,
+        'id_profesion': ProfesionSerializer,
+    }
+    anidados = {
+        'trabajador': 'id_trabajador',
+        'profesion': 'id_profesion',
+    }
+
     class Meta:
         model = TrabajadoresProfesion
         fields = ('id_trabajador_profesion', 'id_trabajador', 'id_profesion', 'matricula',
                   'trabajador', 'profesion')
+        list_serializer_class = ListaEnBloque
+
+    foraneas_en_bloque = {
+        'id_trabajador': Trabajador,
+        'id_profesion': Profesion,
+    }
+    unica_en_bloque = ('id_trabajador', 'id_profesion')
+    mensaje_repetido = "Este trabajador ya tiene asignada esta profesión."
 
     def get_trabajador(self, obj):
         trabajador = obj.id_trabajador
-        return TrabajadorSerializer(trabajador, read_only=True).data 
+        return self.serializar_anidado('trabajador', trabajador)
 
     def get_profesion(self, obj):
         profesion = obj.id_profesion
-        return ProfesionSerializer(profesion).data
+        return self.serializar_anidado('profesion', profesion)
 
-    def create(self, validated_data):
+    def instanciar(self, validated_data):
+        validated_data = dict(validated_data)
         id_trabajador = validated_data.pop('id_trabajador_id')
         id_profesion = validated_data.pop('id_profesion_id')
 
-
-        trabajador_profesion = TrabajadoresProfesion.objects.create(
+        return TrabajadoresProfesion(
             id_trabajador_id = id_trabajador,
             id_profesion_id = id_profesion,
             **validated_data
             )
+
+    def create(self, validated_data):
+        trabajador_profesion = self.instanciar(validated_data)
+        trabajador_profesion.save(force_insert=True)
         return trabajador_profesion
 
     def update(self, instance, validated_data):
@@ -171,7 +449,7 @@ class TrabajadoresProfesionSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class TrabajoSerializer(serializers.ModelSerializer):
+class TrabajoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     contratador = serializers.SerializerMethodField()
     trabajador = serializers.SerializerMethodField()
     profesion_requerida = serializers.SerializerMethodField()
@@ -183,6 +461,21 @@ class TrabajoSerializer(serializers.ModelSerializer):
     id_zona_geografica_trabajo = serializers.IntegerField(write_only=True)
     id_estado = serializers.IntegerField(write_only=True)
 
+    relaciones = {
+        'id_contratador': ContratadorSerializer,
+        'id_trabajador': TrabajadorSerializer,
+        'id_profesion_requerida': ProfesionSerializer,
+        'id_zona_geografica_trabajo': ZonaGeograficaSerializer,
+        'id_estado': EstadoSerializer,
+    }
+    anidados = {
+        'contratador': 'id_contratador',
+        'trabajador': 'id_trabajador',
+        'profesion_requerida': 'id_profesion_requerida',
+        'zona_geografica_trabajo': 'id_zona_geografica_trabajo',
+        'estado': 'id_estado',
+    }
+
     class Meta:
         model = Trabajo
         fields = ('id_trabajo', 'id_contratador', 'id_trabajador', 'id_profesion_requerida', 'id_zona_geografica_trabajo', 'id_estado',
@@ -191,23 +484,23 @@ class TrabajoSerializer(serializers.ModelSerializer):
 
     def get_contratador(self, obj):
         contratador = obj.id_contratador
-        return ContratadorSerializer(contratador).data
+        return self.serializar_anidado('contratador', contratador)
 
     def get_trabajador(self, obj):
         trabajador = obj.id_trabajador
-        return TrabajadorSerializer(trabajador).data
+        return self.serializar_anidado('trabajador', trabajador)
 
     def get_profesion_requerida(self, obj):
         profesion_requerida = obj.id_profesion_requerida
-        return ProfesionSerializer(profesion_requerida).data
+        return self.serializar_anidado('profesion_requerida', profesion_requerida)
 
     def get_zona_geografica_trabajo(self, obj):
         zona_geografica_trabajo = obj.id_zona_geografica_trabajo
-        return ZonaGeograficaSerializer(zona_geografica_trabajo).data
+        return self.serializar_anidado('zona_geografica_trabajo', zona_geografica_trabajo)
 
     def get_estado(self, obj):
         estado = obj.id_estado
-        return EstadoSerializer(estado).data
+        return self.serializar_anidado('estado', estado)
 
     def create(self, validated_data):
         id_contratador = validated_data.pop('id_contratador')
@@ -224,65 +517,87 @@ class TrabajoSerializer(serializers.ModelSerializer):
             )
         return trabajo
 
-    def update(self, instance, validated_data):
-        id_contratador = validated_data.pop('id_contratador', None)
-        id_trabajador = validated_data.pop('id_trabajador', None)
-        id_profesion_requerida = validated_data.pop('id_profesion_requerida', None)
-        id_zona_geografica_trabajo = validated_data.pop('id_zona_geografica_trabajo', None)
-        id_estado = validated_data.pop('id_estado', None)
+    def validate_id_estado(self, value):
+        if self.instance is None and value != ESTADO_PUBLICADO:
+            raise serializers.ValidationError("Un trabajo nuevo se crea en estado publicado.")
+        return value
 
+    def update(self, instance, validated_data):
+        # UPDATE condicional (ver transiciones.py): lanza TransicionInvalida
+        # si el cambio de estado o de trabajador no vale contra lo que hay
+        # en la base. `anterior` queda con el estado y el trabajador que
+        # tenía el trabajo justo antes.
+        campos = {}
         for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        if id_contratador is not None:
-            instance.id_contratador_id = id_contratador
-
-        if id_trabajador is not None:
-            instance.id_trabajador_id = id_trabajador
-
-        if id_profesion_requerida is not None:
-            instance.id_profesion_requerida_id = id_profesion_requerida
-
-        if id_zona_geografica_trabajo is not None:
-            instance.id_zona_geografica_trabajo_id = id_zona_geografica_trabajo
-
-        if id_estado is not None:
-            instance.id_estado_id = id_estado
-
-        instance.save()
+            if attr in self.relaciones:
+                # id_trabajador: null saca al trabajador asignado; en las
+                # demás relaciones (obligatorias) un null no cambia nada
+                if value is not None or attr == 'id_trabajador':
+                    campos[attr + '_id'] = value
+            else:
+                campos[attr] = value
+        self.anterior = actualizar_trabajo(instance, campos)
         return instance
 
 
-class PostulacionSerializer(serializers.ModelSerializer):
+class PostulacionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     trabajo = serializers.SerializerMethodField()
     trabajador = serializers.SerializerMethodField()
     id_trabajo = serializers.IntegerField(write_only=True)
     id_trabajador = serializers.IntegerField(write_only=True)
     fecha_postulacion = serializers.DateTimeField(read_only=True)
 
+    relaciones = {
+        'id_trabajo': TrabajoSerializer,
+        'id_trabajador': TrabajadorSerializer,
+    }
+    anidados = {
+        'trabajo': 'id_trabajo',
+        'trabajador': 'id_trabajador',
+    }
+
     class Meta:
         model = Postulacion
         fields = ('id_postulacion', 'id_trabajo', 'id_trabajador', 'fecha_postulacion',
                   'trabajo', 'trabajador')
+        list_serializer_class = ListaEnBloque
+
+    foraneas_en_bloque = {
+        'id_trabajo': Trabajo,
+        'id_trabajador': Trabajador,
+    }
+    unica_en_bloque = ('id_trabajo', 'id_trabajador')
+    mensaje_repetido = "El trabajador ya se postuló a este trabajo."
+
+    def get_validators(self):
+        # Sin la query previa de UniqueTogetherValidator: la restricción
+        # postulacion_unica la hace cumplir la base y PostulacionView.post
+        # responde el IntegrityError (también con dos postulaciones a la vez)
+        return [v for v in super().get_validators() if not isinstance(v, UniqueTogetherValidator)]
 
     def get_trabajo(self, obj):
         trabajo = obj.id_trabajo
-        return TrabajoSerializer(trabajo).data
+        return self.serializar_anidado('trabajo', trabajo)
 
     def get_trabajador(self, obj):
         trabajador = obj.id_trabajador
-        return TrabajadorSerializer(trabajador).data
+        return self.serializar_anidado('trabajador', trabajador)
 
-    def create(self, validated_data):
+    def instanciar(self, validated_data):
+        validated_data = dict(validated_data)
         id_trabajo = validated_data.pop('id_trabajo')
         id_trabajador = validated_data.pop('id_trabajador')
 
-        postulacion = Postulacion.objects.create(
+        return Postulacion(
             id_trabajo_id = id_trabajo,
             id_trabajador_id = id_trabajador,
             fecha_postulacion=timezone.now(),
             **validated_data
             )
+
+    def create(self, validated_data):
+        postulacion = self.instanciar(validated_data)
+        postulacion.save(force_insert=True)
         return postulacion
 
     def update(self, instance, validated_data):
@@ -301,7 +616,50 @@ class PostulacionSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class CalificacionTrabajadorSerializer(serializers.ModelSerializer):
+class TarjetaTrabajoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    # Solo lectura: la tabla la mantiene tarjetas.py
+    class Meta:
+        model = TarjetaTrabajo
+        fields = ('id_trabajo', 'titulo', 'descripcion', 'fecha_creacion', 'fecha_inicio', 'fecha_fin',
+                  'id_estado', 'estado_descripcion', 'id_profesion_requerida', 'profesion_nombre',
+                  'id_zona_geografica_trabajo', 'zona_calle', 'zona_ciudad', 'zona_provincia',
+                  'id_contratador', 'contratador_nombre', 'contratador_apellido',
+                  'id_trabajador', 'trabajador_nombre', 'trabajador_apellido', 'postulaciones')
+        read_only_fields = fields
+
+
+class PostulacionTarjetaSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    # La postulacion con la tarjeta de su trabajo. En los listados la
+    # tarjeta se lee aparte por PK (lista_paginada(por_pk=...)), sin joins.
+    trabajo = serializers.SerializerMethodField()
+    id_trabajo = serializers.IntegerField(source='id_trabajo_id', read_only=True)
+    id_trabajador = serializers.IntegerField(source='id_trabajador_id', read_only=True)
+
+    relaciones = {
+        'id_trabajo': TarjetaTrabajoSerializer,
+    }
+    anidados = {
+        'trabajo': 'id_trabajo',
+    }
+
+    class Meta:
+        model = Postulacion
+        fields = ('id_postulacion', 'id_trabajo', 'id_trabajador', 'fecha_postulacion', 'trabajo')
+
+    @classmethod
+    def rutas_select_related(cls, prefijo='', seleccion=SELECCION_COMPLETA):
+        # La tarjeta no es la FK id_trabajo (que es Trabajo) sino su fila en
+        # TarjetaTrabajo
+        return [prefijo + 'id_trabajo__tarjeta'] if seleccion.incluye('trabajo', anidado=True) else []
+
+    def get_trabajo(self, obj):
+        try:
+            tarjeta = obj.id_trabajo.tarjeta
+        except ObjectDoesNotExist:
+            tarjeta = None
+        return self.serializar_anidado('trabajo', tarjeta)
+
+class CalificacionTrabajadorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     id_contratador = serializers.PrimaryKeyRelatedField(
         queryset=Contratador.objects.all(), write_only=True
     )
@@ -320,6 +678,7 @@ class CalificacionTrabajadorSerializer(serializers.ModelSerializer):
             'id_contratador', 'id_trabajador', 'id_trabajo'
         )
     
+    @transaction.atomic
     def create(self, validated_data):
         calificacion = CalificacionTrabajador.objects.create(
             id_contratador=validated_data.pop('id_contratador'),
@@ -328,9 +687,12 @@ class CalificacionTrabajadorSerializer(serializers.ModelSerializer):
             fecha_calificacion=timezone.now(),
             **validated_data
         )
+        registrar_calificacion(ReputacionTrabajador, calificacion.id_trabajador_id, calificacion.calificacion)
+        # La reputacion es parte de la respuesta del trabajador: que /api/sync/ lo vuelva a mandar
+        Trabajador.objects.filter(pk=calificacion.id_trabajador_id).update(fecha_actualizacion=timezone.now())
         return calificacion
 
-class CalificacionContratadorSerializer(serializers.ModelSerializer):
+class CalificacionContratadorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     id_contratador = serializers.PrimaryKeyRelatedField(
         queryset=Contratador.objects.all(), write_only=True
     )
@@ -349,6 +711,7 @@ class CalificacionContratadorSerializer(serializers.ModelSerializer):
             'id_contratador', 'id_trabajador', 'id_trabajo'
         )
     
+    @transaction.atomic
     def create(self, validated_data):
         calificacion = CalificacionContratador.objects.create(
             id_contratador=validated_data.pop('id_contratador'),
@@ -357,5 +720,6 @@ class CalificacionContratadorSerializer(serializers.ModelSerializer):
             fecha_calificacion=timezone.now(),
             **validated_data
         )
+        registrar_calificacion(ReputacionContratador, calificacion.id_contratador_id, calificacion.calificacion)
         return calificacion
 
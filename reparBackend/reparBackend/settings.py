@@ -11,9 +11,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials, auth
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,9 +20,16 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # FIREBASE_CREDENTIALS_PATH = os.path.join(BASE_DIR,  'repar-ar-firebase-adminsdk-fbsvc-7d6ecb6fe2.json')
 FIREBASE_CREDENTIALS_PATH = os.path.join(BASE_DIR,  'repar-ar-clave.json')
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(FIREBASE_CREDENTIALS_PATH)
-    firebase_admin.initialize_app(cred)
+# Proveedor de Firebase (ver reparBackend/firebase.py). Se inicializa la
+# primera vez que se usa, no al cargar settings. Con
+# 'reparBackend.firebase.FirebaseLocal' no hace falta la clave ni la red: la
+# app local firma sus propios tokens (solo desarrollo y tests).
+REPAR_FIREBASE = os.environ.get('REPAR_FIREBASE', 'reparBackend.firebase.FirebaseAdmin')
+
+# Si queda en None se usa el project_id del archivo de credenciales
+FIREBASE_PROJECT_ID = None
+# Cantidad de ID tokens ya verificados que se guardan por proceso
+FIREBASE_TOKEN_CACHE_SIZE = 1024
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -52,6 +58,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que el total incluya al resto de los middlewares
+    'reparBackend.instrumentacion.InstrumentacionMiddleware',
+    'reparBackend.replicas.ReplicasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,7 +104,10 @@ DATABASES = {
 """
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # Backend de MySQL con pool de conexiones (ver pool_conexiones.py).
+        # CONN_MAX_AGE queda en 0: al final de cada request la conexión
+        # vuelve al pool en lugar de cerrarse.
+        'ENGINE': 'reparBackend.mysql_pool',
         'NAME': 'repar_arDB',
         'USER': 'root',
         'PASSWORD': '',
@@ -104,6 +116,19 @@ DATABASES = {
         }
 }
 
+# `manage.py test` (reparBackend/tests.py) corre sobre SQLite: no hace falta
+# el servidor MySQL. 'default' es un archivo para que los tests con threads
+# esperen los locks en lugar de fallar (en memoria compartida no esperan).
+# 'replica' es otra base (no un espejo de 'default') para que ReplicasTests
+# vea de dónde lee cada request.
+TESTS = sys.argv[1:2] == ['test']
+if TESTS:
+    DATABASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'tests.sqlite3',
+                    'TEST': {'NAME': BASE_DIR / 'tests.sqlite3'}},
+        'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'tests_replica.sqlite3'},
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -145,6 +170,108 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Paginación por cursor de los listados (opcional: ?page_size= / ?cursor=)
+REPAR_PAGE_SIZE = 20
+
+# El feed de un trabajador (feed.py) solo muestra trabajos publicados en los
+# últimos REPAR_FEED_DIAS días: es lo que acota las filas que ordena la base
+REPAR_FEED_DIAS = 30
+
+# Máximo de objetos en un POST con una lista (postulaciones, profesiones de
+# trabajadores, zonas)
+REPAR_LOTE_MAXIMO = 1000
+
+# /api/sync/: solo se entregan los cambios con más de REPAR_SYNC_MARGEN
+# segundos (ver sincronizacion.py), hasta REPAR_SYNC_MAXIMO por tipo en cada
+# respuesta. Las lápidas de lo borrado se guardan REPAR_SYNC_RETENCION_DIAS;
+# un token más viejo recibe 410 y el cliente sincroniza de cero.
+REPAR_SYNC_MARGEN = 2
+REPAR_SYNC_MAXIMO = 500
+REPAR_SYNC_RETENCION_DIAS = 30
+
+# Eventos por WebSocket (ver eventos.py). El broker en memoria reparte solo
+# dentro del proceso: con varios procesos ASGI hace falta uno compartido.
+# REPAR_EVENTOS_COLA es cuántos eventos se guardan por conexión que no lee.
+REPAR_EVENTOS_BROKER = 'reparBackend.eventos.BrokerEnMemoria'
+REPAR_EVENTOS_COLA = 100
+
+# Pool de conexiones a la base, por proceso (ver pool_conexiones.py). Con
+# REPAR_DB_POOL = False se abre y cierra una conexión por request como antes.
+# Las conexiones libres por más de REPAR_DB_POOL_VERIFICAR segundos se
+# verifican con un ping y las de más de REPAR_DB_POOL_RECICLAR se reemplazan
+# (menos que el wait_timeout de MySQL, 8 horas por defecto).
+REPAR_DB_POOL = True
+REPAR_DB_POOL_MAXIMO = 20
+REPAR_DB_POOL_ESPERA = 5
+REPAR_DB_POOL_VERIFICAR = 30
+REPAR_DB_POOL_RECICLAR = 1800
+
+# Réplicas de lectura (ver reparBackend/replicas.py): alias de DATABASES a
+# los que van los GET. Con DB_REPLICA_HOST se agrega una réplica con los
+# mismos datos de conexión que la primaria. Una réplica con más de
+# REPAR_DB_REPLICA_DEMORA_MAXIMA segundos de atraso (medido cada
+# REPAR_DB_REPLICA_CHEQUEO) no se usa, y quien escribe lee de la primaria
+# por REPAR_DB_LECTURA_PROPIA segundos: más que la demora máxima más el
+# chequeo.
+DATABASE_ROUTERS = ['reparBackend.replicas.RouterReplicas']
+REPAR_DB_REPLICAS = []
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {**DATABASES['default'], 'HOST': os.environ['DB_REPLICA_HOST'], 'TEST': {'MIRROR': 'default'}}
+    REPAR_DB_REPLICAS = ['replica']
+REPAR_DB_REPLICA_DEMORA_MAXIMA = 2
+REPAR_DB_REPLICA_CHEQUEO = 5
+REPAR_DB_LECTURA_PROPIA = 10
+
+# Segundos que los clientes pueden reusar los catálogos (profesiones, estados)
+# sin revalidar. Con varios procesos, CACHES tiene que ser compartido
+# (Redis/Memcached) para que la invalidación llegue a todos.
+REPAR_CATALOGO_MAX_AGE = 300
+
+# Instrumentación de requests (ver reparBackend/instrumentacion.py): header
+# Server-Timing en las respuestas y, a partir de cuántos ms, el log del
+# request sale como WARNING.
+REPAR_SERVER_TIMING = True
+REPAR_REQUEST_LENTO_MS = 1000
+
+# Detección de N+1 (ver reparBackend/nplusuno.py): con `manage.py test` una
+# misma query con más de REPAR_NPLUSUNO_UMBRAL parámetros distintos en un
+# request lanza una excepción; si no, se revisa una fracción de los requests
+# y solo se loguea.
+REPAR_NPLUSUNO = os.environ.get('REPAR_NPLUSUNO', 'estricto' if TESTS else 'muestreo')
+REPAR_NPLUSUNO_MUESTREO = 1.0 if DEBUG else 0.05
+REPAR_NPLUSUNO_UMBRAL = 5
+
+# Una línea JSON por request lento en 'reparBackend.instrumentacion' (con el
+# nivel en DEBUG, por cada request) y por cada N+1 detectado en
+# 'reparBackend.nplusuno'. Los tests solo muestran errores.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'mensaje': {'format': '{asctime} {levelname} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': 'mensaje'},
+    },
+    'loggers': {
+        'reparBackend.instrumentacion': {'handlers': ['consola'], 'level': 'ERROR' if TESTS else 'INFO', 'propagate': False},
+        'reparBackend.nplusuno': {'handlers': ['consola'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+REST_FRAMEWORK = {
+    # Mismos bytes que JSONRenderer; usa orjson si esta instalado
+    'DEFAULT_RENDERER_CLASSES': [
+        'reparBackend.renderizado.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'reparBackend.autenticacion.FirebaseAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
 MIDDLEWARE.insert(0, 'corsheaders.middleware.CorsMiddleware')
 
 CORS_ALLOW_ALL_ORIGINS = True  # Permite peticiones desde cualquier origen (para desarrollo)
@@ -0,0 +1,238 @@
+"""
+Sincronización incremental de la app: GET /api/sync/?since=<token>.
+
+Trabajo, Postulacion, Trabajador y las dos calificaciones guardan
+`fecha_actualizacion` (auto_now), y lo que se borra deja una `Eliminacion`
+por cada usuario que lo tenía. El token es la fecha hasta la que el cliente
+ya recibió todo; cada respuesta trae el siguiente en `next`, y sin `since`
+se manda todo lo del usuario.
+
+Solo se entregan los cambios con más de REPAR_SYNC_MARGEN segundos: una
+transacción que todavía no hizo commit puede haber tomado su fecha antes
+que otra que ya lo hizo, y si el token pasara por encima ese cambio no se
+vería nunca; leyendo de una réplica (replicas.py) el margen suma la demora
+que se le tolera. Con más de REPAR_SYNC_MAXIMO cambios de un tipo la
+respuesta corta en una fecha (`mas: true`) y el token siguiente sigue desde
+ahí; lo de otros tipos posterior al corte puede volver a llegar, así que el
+cliente reemplaza por id lo que ya tenía.
+
+Una eliminación de un trabajo o de un trabajador implica la de sus
+postulaciones y calificaciones (se borran en cascada y no dejan lápida
+propia). Los cambios hechos con QuerySet.update() no tocan
+fecha_actualizacion: quien lo use sobre estos modelos la actualiza a mano
+(como ZonaGeograficaManager.fusionar, o SET_NULL_ACTUALIZANDO al borrar una
+zona).
+"""
+
+import base64
+from datetime import datetime, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    CalificacionContratador,
+    CalificacionTrabajador,
+    Contratador,
+    Eliminacion,
+    Postulacion,
+    Trabajador,
+    Trabajo,
+)
+from . import replicas
+from .asincronico import en_paralelo, en_thread
+from .renderizado import plan_filas, serializar_filas
+from .serializers import (
+    CalificacionContratadorSerializer,
+    CalificacionTrabajadorSerializer,
+    PostulacionSerializer,
+    TrabajadorSerializer,
+    TrabajoSerializer,
+)
+
+
+def _alcance_trabajos(contratador, trabajadores):
+    # Los publicados por el usuario, los asignados a él y a los que se postuló
+    return (Q(id_contratador=contratador) | Q(id_trabajador__in=trabajadores)
+            | Q(pk__in=Postulacion.objects.filter(id_trabajador__in=trabajadores).values('id_trabajo')))
+
+
+def _alcance_postulaciones(contratador, trabajadores):
+    return Q(id_trabajador__in=trabajadores) | Q(id_trabajo__id_contratador=contratador)
+
+
+def _alcance_trabajadores(contratador, trabajadores):
+    # El propio y los que se postularon a sus trabajos
+    return Q(pk__in=trabajadores) | Q(pk__in=Postulacion.objects.filter(id_trabajo__id_contratador=contratador).values('id_trabajador'))
+
+
+def _alcance_calificaciones(contratador, trabajadores):
+    return Q(id_contratador=contratador) | Q(id_trabajador__in=trabajadores)
+
+
+# tipo -> (modelo, serializer, filtro de lo que le corresponde al usuario)
+TIPOS = {
+    'trabajos': (Trabajo, TrabajoSerializer, _alcance_trabajos),
+    'postulaciones': (Postulacion, PostulacionSerializer, _alcance_postulaciones),
+    'trabajadores': (Trabajador, TrabajadorSerializer, _alcance_trabajadores),
+    'calificaciones_trabajadores': (CalificacionTrabajador, CalificacionTrabajadorSerializer, _alcance_calificaciones),
+    'calificaciones_contratadores': (CalificacionContratador, CalificacionContratadorSerializer, _alcance_calificaciones),
+}
+TIPO_DE_MODELO = {modelo: tipo for tipo, (modelo, _, _) in TIPOS.items()}
+
+
+def codificar_token(fecha):
+    return base64.urlsafe_b64encode(fecha.isoformat().encode('ascii')).decode('ascii')
+
+
+def leer_token(token):
+    # ValueError si no es un token de codificar_token
+    try:
+        fecha = datetime.fromisoformat(base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii'))
+    except (ValueError, UnicodeError):
+        raise ValueError("Token de sincronización inválido.")
+    if timezone.is_naive(fecha):
+        raise ValueError("Token de sincronización inválido.")
+    return fecha
+
+
+def _cambios(queryset, campo_fecha, columnas, desde, hasta, maximo):
+    # Filas con campo_fecha en (desde, hasta], de la más vieja a la más nueva.
+    # Si son más de `maximo` corta antes de la fecha de la primera que no
+    # entra, así ninguna fecha queda a medias; devuelve (filas, corte).
+    queryset = queryset.filter(**{f'{campo_fecha}__lte': hasta})
+    if desde is not None:
+        queryset = queryset.filter(**{f'{campo_fecha}__gt': desde})
+    columnas = list(dict.fromkeys([*columnas, campo_fecha]))
+    filas = list(queryset.order_by(campo_fecha, 'pk').values(*columnas)[:maximo + 1])
+    if len(filas) <= maximo:
+        return filas, None
+    limite = filas[maximo][campo_fecha]
+    filas = [fila for fila in filas if fila[campo_fecha] < limite]
+    if not filas:
+        # Más de `maximo` con la misma fecha: van todas juntas
+        filas = list(queryset.filter(**{campo_fecha: limite}).values(*columnas))
+    return filas, filas[-1][campo_fecha]
+
+
+def _cambios_de_tipo(tipo, contratador, trabajadores, desde, hasta, maximo):
+    modelo, serializer_class, alcance = TIPOS[tipo]
+    plan = plan_filas(serializer_class)
+    queryset = modelo.objects.filter(alcance(contratador, trabajadores))
+    filas, corte = _cambios(queryset, 'fecha_actualizacion', plan.columnas, desde, hasta, maximo)
+    return serializar_filas(plan, filas), corte
+
+
+def _eliminados(contratador, trabajadores, desde, hasta, maximo):
+    lapidas = Eliminacion.objects.filter(Q(id_contratador=contratador) | Q(id_trabajador__in=trabajadores))
+    filas, corte = _cambios(lapidas, 'fecha_eliminacion', ['tipo', 'id_objeto'], desde, hasta, maximo)
+    eliminados = {tipo: {} for tipo in TIPOS}
+    for fila in filas:
+        eliminados[fila['tipo']][fila['id_objeto']] = None
+    return {tipo: list(ids) for tipo, ids in eliminados.items()}, corte
+
+
+async def sincronizar(contratador, desde=None):
+    # Las consultas de cada tipo no dependen entre sí y corren en paralelo,
+    # cada una en su thread y con su conexión
+    trabajadores = await en_thread(lambda: list(Trabajador.objects.filter(id_contratador=contratador).values_list('pk', flat=True)))
+    # Si se lee de una réplica, lo que todavía no le llegó tampoco puede
+    # quedar detrás del token
+    margen = getattr(settings, 'REPAR_SYNC_MARGEN', 2) + replicas.demora_tolerada()
+    hasta = timezone.now() - timedelta(seconds=margen)
+    maximo = getattr(settings, 'REPAR_SYNC_MAXIMO', 500)
+
+    consultas = [partial(_cambios_de_tipo, tipo, contratador.pk, trabajadores, desde, hasta, maximo) for tipo in TIPOS]
+    if desde is not None:
+        # En la primera sincronización no hay nada que el cliente tenga que borrar
+        consultas.append(partial(_eliminados, contratador.pk, trabajadores, desde, hasta, maximo))
+    resultados = await en_paralelo(*consultas)
+
+    cambios = dict(zip(TIPOS, (datos for datos, _ in resultados)))
+    eliminados = resultados[len(TIPOS)][0] if desde is not None else {tipo: [] for tipo in TIPOS}
+    cortes = [corte for _, corte in resultados if corte is not None]
+    if cortes:
+        siguiente = min(cortes)
+    else:
+        siguiente = hasta if desde is None else max(desde, hasta)
+    return {
+        'next': codificar_token(siguiente),
+        'mas': bool(cortes),
+        **cambios,
+        'eliminados': eliminados,
+    }
+
+
+# --- Lápidas -------------------------------------------------------------
+# Se arman en pre_delete, cuando todavía se pueden consultar las filas que
+# se van a borrar en cascada, y solo en el objeto desde el que empezó el
+# borrado: lo que cae en cascada queda cubierto por la lápida del padre.
+
+def _es_origen(sender, origin):
+    return getattr(origin, 'model', type(origin)) is sender
+
+
+def lapidas_trabajos(trabajos):
+    # trabajos: [(id_trabajo, id_contratador, id_trabajador)]. Avisa al
+    # contratador, al trabajador asignado y a los postulados.
+    lapidas = [Eliminacion(tipo=TIPO_DE_MODELO[Trabajo], id_objeto=pk, id_contratador=contratador, id_trabajador=trabajador)
+               for pk, contratador, trabajador in trabajos]
+    postulados = Postulacion.objects.filter(id_trabajo__in=[pk for pk, _, _ in trabajos]).values_list('id_trabajo', 'id_trabajador')
+    lapidas += [Eliminacion(tipo=TIPO_DE_MODELO[Trabajo], id_objeto=pk, id_trabajador=trabajador) for pk, trabajador in postulados]
+    return lapidas
+
+
+def lapidas_trabajadores(trabajadores):
+    # trabajadores: [(id_trabajador, id_contratador)]. Avisa a su propio
+    # usuario y a los contratadores de los trabajos en los que participa.
+    ids = [pk for pk, _ in trabajadores]
+    lapidas = [Eliminacion(tipo=TIPO_DE_MODELO[Trabajador], id_objeto=pk, id_contratador=contratador, id_trabajador=pk)
+               for pk, contratador in trabajadores]
+    interesados = set(Postulacion.objects.filter(id_trabajador__in=ids).values_list('id_trabajador', 'id_trabajo__id_contratador'))
+    interesados.update(Trabajo.objects.filter(id_trabajador__in=ids).values_list('id_trabajador', 'id_contratador'))
+    lapidas += [Eliminacion(tipo=TIPO_DE_MODELO[Trabajador], id_objeto=pk, id_contratador=contratador) for pk, contratador in interesados]
+    # Sus trabajos asignados quedan sin trabajador (SET_NULL, con un UPDATE
+    # que no toca fecha_actualizacion)
+    Trabajo.objects.filter(id_trabajador__in=ids).update(fecha_actualizacion=timezone.now())
+    return lapidas
+
+
+@receiver(pre_delete, sender=Trabajo)
+def _trabajo_eliminado(sender, instance, origin=None, **kwargs):
+    if _es_origen(sender, origin):
+        Eliminacion.objects.bulk_create(lapidas_trabajos([(instance.pk, instance.id_contratador_id, instance.id_trabajador_id)]))
+
+
+@receiver(pre_delete, sender=Trabajador)
+def _trabajador_eliminado(sender, instance, origin=None, **kwargs):
+    if _es_origen(sender, origin):
+        Eliminacion.objects.bulk_create(lapidas_trabajadores([(instance.pk, instance.id_contratador_id)]))
+
+
+@receiver(pre_delete, sender=Contratador)
+def _contratador_eliminado(sender, instance, origin=None, **kwargs):
+    # Se llevan en cascada sus trabajos y su perfil de trabajador
+    if _es_origen(sender, origin):
+        trabajos = Trabajo.objects.filter(id_contratador=instance).values_list('pk', 'id_contratador', 'id_trabajador')
+        trabajadores = Trabajador.objects.filter(id_contratador=instance).values_list('pk', 'id_contratador')
+        Eliminacion.objects.bulk_create(lapidas_trabajos(list(trabajos)) + lapidas_trabajadores(list(trabajadores)))
+
+
+@receiver(pre_delete, sender=Postulacion)
+def _postulacion_eliminada(sender, instance, origin=None, **kwargs):
+    if _es_origen(sender, origin):
+        contratador = Trabajo.objects.filter(pk=instance.id_trabajo_id).values_list('id_contratador', flat=True).first()
+        Eliminacion.objects.create(tipo=TIPO_DE_MODELO[Postulacion], id_objeto=instance.pk,
+                                   id_contratador=contratador, id_trabajador=instance.id_trabajador_id)
+
+
+@receiver(pre_delete, sender=CalificacionTrabajador)
+@receiver(pre_delete, sender=CalificacionContratador)
+def _calificacion_eliminada(sender, instance, origin=None, **kwargs):
+    if _es_origen(sender, origin):
+        Eliminacion.objects.create(tipo=TIPO_DE_MODELO[sender], id_objeto=instance.pk,
+                                   id_contratador=instance.id_contratador_id, id_trabajador=instance.id_trabajador_id)
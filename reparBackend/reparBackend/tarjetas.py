@@ -0,0 +1,223 @@
+"""
+Tarjetas de trabajos (TarjetaTrabajo): lo que muestran los listados de la
+app para cada trabajo, en una sola fila.
+
+Armar la tarjeta desde las tablas normalizadas necesita los joins a Estado,
+Profesion, ZonaGeografica, Contratador y Trabajador -> Contratador, más
+contar las postulaciones, y el listado de postulaciones repite ese árbol por
+cada una. GET /api/trabajos/tarjetas/ lee solo TarjetaTrabajo, con los
+mismos índices que Trabajo, y GET /api/postulaciones/tarjetas/ lee la página
+de postulaciones y después sus tarjetas por PK.
+
+La tabla se mantiene con señales, en la misma transacción que el cambio:
+
+- guardar un trabajo vuelve a armar su tarjeta (una query con los joins y
+  un UPDATE, o un INSERT si no la tenía); al borrarlo se borra en cascada;
+- crear o borrar una postulación suma o resta en `postulaciones` (las altas
+  en bloque, que no mandan post_save, llaman a `sumar_postulaciones`). Las
+  que se borran en cascada no se restan de a una: las de un trabajo se van
+  con su tarjeta, y las de un trabajador se restan todas juntas antes del
+  DELETE;
+- renombrar un estado, profesión, zona o contratador actualiza con un
+  UPDATE las tarjetas que lo muestran;
+- al borrar un trabajador o una zona, Trabajo queda en NULL (o en la zona
+  que queda, con fusionar_zonas) sin pasar por save(): se vuelven a armar
+  las tarjetas que los tenían.
+
+Lo que se escribe sin el ORM o sin señales (bulk_create, QuerySet.update()
+sobre Trabajo, SQL directo) deja las tarjetas atrasadas hasta `reconstruir`
+(manage.py reconstruir_tarjetas).
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Contratador, Estado, Postulacion, Profesion, TarjetaTrabajo, Trabajador, Trabajo, ZonaGeografica
+
+# Columna de TarjetaTrabajo -> ruta de .values() desde Trabajo
+COLUMNAS = {
+    'titulo': 'titulo',
+    'descripcion': 'descripcion',
+    'fecha_creacion': 'fecha_creacion',
+    'fecha_inicio': 'fecha_inicio',
+    'fecha_fin': 'fecha_fin',
+    'id_estado_id': 'id_estado',
+    'estado_descripcion': 'id_estado__descripcion',
+    'id_profesion_requerida_id': 'id_profesion_requerida',
+    'profesion_nombre': 'id_profesion_requerida__nombre_profesion',
+    'id_zona_geografica_trabajo_id': 'id_zona_geografica_trabajo',
+    'zona_calle': 'id_zona_geografica_trabajo__calle',
+    'zona_ciudad': 'id_zona_geografica_trabajo__ciudad',
+    'zona_provincia': 'id_zona_geografica_trabajo__provincia',
+    'id_contratador_id': 'id_contratador',
+    'contratador_nombre': 'id_contratador__nombre',
+    'contratador_apellido': 'id_contratador__apellido',
+    'id_trabajador_id': 'id_trabajador',
+    'trabajador_nombre': 'id_trabajador__id_contratador__nombre',
+    'trabajador_apellido': 'id_trabajador__id_contratador__apellido',
+}
+
+# Modelo renombrado -> [(filtro de las tarjetas que lo muestran, {columna: campo del modelo})]
+NOMBRES = {
+    Estado: [('id_estado', {'estado_descripcion': 'descripcion'})],
+    Profesion: [('id_profesion_requerida', {'profesion_nombre': 'nombre_profesion'})],
+    ZonaGeografica: [('id_zona_geografica_trabajo', {'zona_calle': 'calle', 'zona_ciudad': 'ciudad', 'zona_provincia': 'provincia'})],
+    Contratador: [
+        ('id_contratador', {'contratador_nombre': 'nombre', 'contratador_apellido': 'apellido'}),
+        ('id_trabajador__id_contratador', {'trabajador_nombre': 'nombre', 'trabajador_apellido': 'apellido'}),
+    ],
+}
+
+
+def _tarjetas(trabajos, chunk_size=2000):
+    # TarjetaTrabajo sin guardar de cada trabajo del queryset, con
+    # `postulaciones` en 0
+    filas = trabajos.values('pk', *COLUMNAS.values()).iterator(chunk_size=chunk_size)
+    for fila in filas:
+        yield TarjetaTrabajo(id_trabajo_id=fila['pk'], **{columna: fila[ruta] for columna, ruta in COLUMNAS.items()})
+
+
+def _postulaciones_por_trabajo():
+    return dict(Postulacion.objects.order_by().values_list('id_trabajo').annotate(Count('pk')))
+
+
+@transaction.atomic
+def actualizar(ids):
+    # Vuelve a armar desde Trabajo las tarjetas de los trabajos `ids` y crea
+    # las que falten; `postulaciones` no se toca
+    for tarjeta in _tarjetas(Trabajo.objects.filter(pk__in=ids)):
+        campos = {columna: getattr(tarjeta, columna) for columna in COLUMNAS}
+        if TarjetaTrabajo.objects.filter(pk=tarjeta.pk).update(**campos):
+            continue
+        tarjeta.postulaciones = Postulacion.objects.filter(id_trabajo=tarjeta.pk).count()
+        try:
+            with transaction.atomic():
+                tarjeta.save(force_insert=True)
+        except IntegrityError:
+            # Otro request la creó entre el UPDATE y el INSERT
+            TarjetaTrabajo.objects.filter(pk=tarjeta.pk).update(**campos)
+
+
+def sumar_postulaciones(postulaciones, signo=1):
+    # Un UPDATE por cada cantidad distinta de postulaciones por trabajo (en
+    # un alta en bloque casi siempre uno solo)
+    por_cantidad = {}
+    for id_trabajo, cantidad in Counter(p.id_trabajo_id for p in postulaciones).items():
+        por_cantidad.setdefault(cantidad, []).append(id_trabajo)
+    for cantidad, ids in por_cantidad.items():
+        tarjetas = TarjetaTrabajo.objects.filter(pk__in=ids)
+        if signo < 0:
+            tarjetas = tarjetas.filter(postulaciones__gte=cantidad)
+        tarjetas.update(postulaciones=F('postulaciones') + signo * cantidad)
+
+
+@transaction.atomic
+def reconstruir(batch_size=2000):
+    TarjetaTrabajo.objects.all().delete()
+    postulaciones = _postulaciones_por_trabajo()
+    cantidad = 0
+    lote = []
+    for tarjeta in _tarjetas(Trabajo.objects.order_by('pk'), chunk_size=batch_size):
+        tarjeta.postulaciones = postulaciones.get(tarjeta.pk, 0)
+        lote.append(tarjeta)
+        if len(lote) >= batch_size:
+            TarjetaTrabajo.objects.bulk_create(lote)
+            cantidad += len(lote)
+            lote = []
+    TarjetaTrabajo.objects.bulk_create(lote)
+    return cantidad + len(lote)
+
+
+def diferencias(batch_size=2000):
+    # IDs de los trabajos cuya tarjeta falta o no coincide con las tablas de
+    # origen (una tarjeta sin trabajo no puede existir: la FK la borra)
+    postulaciones = _postulaciones_por_trabajo()
+    columnas = [*COLUMNAS, 'postulaciones']
+
+    def revisar(lote):
+        guardadas = TarjetaTrabajo.objects.in_bulk([tarjeta.pk for tarjeta in lote])
+        for tarjeta in lote:
+            tarjeta.postulaciones = postulaciones.get(tarjeta.pk, 0)
+            guardada = guardadas.get(tarjeta.pk)
+            if guardada is None or any(getattr(guardada, c) != getattr(tarjeta, c) for c in columnas):
+                yield tarjeta.pk
+
+    lote = []
+    for tarjeta in _tarjetas(Trabajo.objects.order_by('pk'), chunk_size=batch_size):
+        lote.append(tarjeta)
+        if len(lote) >= batch_size:
+            yield from revisar(lote)
+            lote = []
+    yield from revisar(lote)
+
+
+def _rearmar(**filtro):
+    ids = list(TarjetaTrabajo.objects.filter(**filtro).values_list('pk', flat=True))
+    if ids:
+        actualizar(ids)
+
+
+@receiver(post_save, sender=Trabajo)
+def _trabajo_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not set(update_fields) - {'fecha_actualizacion'}):
+        return
+    actualizar([instance.pk])
+
+
+@receiver(post_save, sender=Postulacion)
+def _postulacion_guardada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        sumar_postulaciones([instance])
+
+
+@receiver(post_delete, sender=Postulacion)
+def _postulacion_borrada(sender, instance, origin=None, **kwargs):
+    # `origin` es lo que se pidió borrar (una instancia o un queryset). Si no
+    # es una postulación, esta se borró en cascada: con su trabajo (y la
+    # tarjeta con él) o con su trabajador (ver _trabajador_por_borrar)
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is None or modelo is Postulacion:
+        sumar_postulaciones([instance], -1)
+
+
+@receiver(post_save, sender=Estado)
+@receiver(post_save, sender=Profesion)
+@receiver(post_save, sender=ZonaGeografica)
+@receiver(post_save, sender=Contratador)
+def _nombre_guardado(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    for filtro, columnas in NOMBRES[sender]:
+        if update_fields is not None and not set(columnas.values()) & set(update_fields):
+            # p. ej. una zona a la que solo se le completan las coordenadas
+            continue
+        (TarjetaTrabajo.objects.filter(**{filtro: instance.pk})
+         .update(**{columna: getattr(instance, campo) for columna, campo in columnas.items()}))
+
+
+@receiver(post_save, sender=Trabajador)
+def _trabajador_guardado(sender, instance, created, raw=False, **kwargs):
+    # Puede haber cambiado de contratador, y con eso el nombre de la tarjeta
+    if not created and not raw:
+        _rearmar(id_trabajador=instance.pk)
+
+
+@receiver(pre_delete, sender=Trabajador)
+def _trabajador_por_borrar(sender, instance, **kwargs):
+    # Sus postulaciones se van a borrar en cascada: se restan todas con un
+    # UPDATE en lugar de uno por postulación
+    sumar_postulaciones(Postulacion.objects.filter(id_trabajador=instance).only('id_trabajo'), -1)
+
+
+@receiver(post_delete, sender=Trabajador)
+def _trabajador_borrado(sender, instance, **kwargs):
+    _rearmar(id_trabajador=instance.pk)
+
+
+@receiver(post_delete, sender=ZonaGeografica)
+def _zona_borrada(sender, instance, **kwargs):
+    _rearmar(id_zona_geografica_trabajo=instance.pk)
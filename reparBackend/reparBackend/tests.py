@@ -0,0 +1,843 @@
+"""
+Tests de la API. Corren sobre SQLite (ver TESTS en settings.py):
+
+    python manage.py test reparBackend.tests
+"""
+
+import asyncio
+import base64
+import contextvars
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, path
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import JSONRenderer
+
+from . import busqueda, eventos, replicas, reputacion, tarjetas
+from .autenticacion import ClavesPublicas, TokenInvalido, verificar_id_token
+from .feed import ORDEN_FEED, feed_trabajador
+from .firebase import FirebaseLocal, firebase
+from .instrumentacion import Medicion, _medicion_actual, medir
+from .management.commands.benchmark_api import queries_de_server_timing
+from .models import (
+    ESTADO_ACTIVO,
+    ESTADO_ESPERANDO_CONFIRMACION,
+    ESTADO_FINALIZADO,
+    ESTADO_PUBLICADO,
+    CalificacionContratador,
+    CalificacionTrabajador,
+    Contratador,
+    Estado,
+    PosteoBusqueda,
+    Postulacion,
+    Profesion,
+    ReputacionTrabajador,
+    TarjetaTrabajo,
+    TerminoBusqueda,
+    Trabajador,
+    TrabajadoresProfesion,
+    Trabajo,
+    ZonaGeografica,
+)
+from .nplusuno import ConsultasRepetidas
+from .renderizado import JSONRapidoRenderer
+from .transiciones import TransicionInvalida, actualizar_trabajo
+
+
+def _sqlite_sin_fsync(connection, **kwargs):
+    # La base de test es un archivo que se tira al terminar: no hace falta
+    # esperar al disco en cada commit
+    if connection.vendor == 'sqlite':
+        connection.connection.execute('PRAGMA synchronous = OFF')
+
+
+connection_created.connect(_sqlite_sin_fsync)
+
+ESTADOS = ('Publicado', 'Esperando confirmación', 'Activo', 'Esperando valoración', 'Finalizado',
+           'Oferta cancelada', 'Rechazado')
+
+# Queries de cada listado de urls.py, por query string. {Contratador},
+# {Trabajador}, {Trabajo} y {uid} se reemplazan por filas sembradas. Ninguna
+# cantidad depende de cuántas filas devuelve el listado (las de 2 buscan
+# antes el contratador del uid o el trabajador del feed): una query por
+# fila (N+1) hace fallar el test.
+CONSULTAS = {
+    'zona-lista': {'': 1, '?page_size=3': 1, '?ids=1,2,3': 1},
+    'profesion-lista': {'': 1, '?page_size=3': 1},
+    'estado-lista': {'': 1},
+    'contratador-lista': {'': 1, '?page_size=3': 1, '?uid_firebase={uid}': 1, '?ids=1,2,3': 1},
+    'trabajador-lista': {'': 1, '?page_size=3': 1, '?uid_firebase={uid}': 2,
+                         '?lat=-31.4&lng=-64.2&radius_km=10&page_size=3': 1, '?ids=1,2,3': 1},
+    'trabajador-feed': {'': 2, '?page_size=3': 2},
+    'trabajo-lista': {'': 1, '?page_size=3': 1, '?id_estado=1,2&page_size=3': 1,
+                      '?profesiones=1,2&id_estado=1': 1, '?id_contratador={Contratador}': 1,
+                      '?uid_firebase={uid}': 2, '?id_trabajador={Trabajador}': 1,
+                      '?lat=-31.4&lng=-64.2&radius_km=10&page_size=3': 1, '?expand=&page_size=3': 1,
+                      '?ids=1,2,3': 1},
+    'trabajo-busqueda': {'?q=pintar rejas': 5, '?q=perdida&id_estado=5': 5},
+    'trabajo-tarjetas': {'': 1, '?page_size=3': 1, '?id_estado=1,2&page_size=3': 1,
+                         '?id_contratador={Contratador}': 1, '?id_trabajador={Trabajador}': 1, '?ids=1,2,3': 1},
+    'postulacion-lista': {'': 1, '?page_size=3': 1, '?id_trabajo={Trabajo}': 1,
+                          '?id_trabajador={Trabajador}': 1, '?expand=trabajo.estado&page_size=3': 1,
+                          '?ids=1,2,3': 1},
+    'postulacion-tarjetas': {'': 2, '?page_size=3': 2, '?id_trabajador={Trabajador}': 2},
+    'calif-trabajador-lista': {'': 1, '?page_size=3': 1, '?id_trabajador={Trabajador}': 1},
+    'calif-contratador-lista': {'': 1, '?page_size=3': 1, '?id_contratador={Contratador}': 1},
+    'trabajador-profesion-lista': {'': 1, '?page_size=3': 1, '?id_trabajador={Trabajador}': 1},
+}
+# Vistas async (asincronico.py): sus queries corren en threads con su propia
+# conexión, que assertNumQueries no ve; se cuentan con el Server-Timing del
+# middleware, que suma las de todos los threads del request.
+CONSULTAS_ASYNC = {
+    'calificaciones-general': {'': 2},
+    'sync': {'': 7},
+}
+# Listados que llevan en el path el id de un trabajador
+LISTADOS_CON_ID = {'trabajador-feed'}
+# Rutas GET sin id que no listan filas de la base
+SIN_LISTADO = {'metricas'}
+
+
+def sembrar(cantidad):
+    # `cantidad` filas de cada tabla, relacionadas entre sí: más que
+    # REPAR_NPLUSUNO_UMBRAL, así una consulta por fila se nota
+    ahora = timezone.now()
+    for i, descripcion in enumerate(ESTADOS, start=1):
+        Estado.objects.create(id_estado=i, descripcion=descripcion)
+    profesiones = [Profesion.objects.create(nombre_profesion=f'Profesión {i}') for i in range(3)]
+    contratadores, trabajadores = [], []
+    for i in range(cantidad):
+        zona = ZonaGeografica.objects.create(calle=f'Calle {i}', ciudad='Córdoba', provincia='Córdoba',
+                                             latitud=-31.4 + i / 1000, longitud=-64.2)
+        contratador = Contratador.objects.create(
+            id_zona_geografica_contratador=zona, nombre=f'Nombre {i}', apellido=f'Apellido {i}',
+            email_contratador=f'c{i}@repar.ar', telefono_contratador=3510000000 + i, dni=30000000 + i,
+            uid_firebase=f'uid-{i}',
+        )
+        trabajador = Trabajador.objects.create(id_contratador=contratador, id_zona_geografica_trabajador=zona,
+                                               telefono_trabajador=3510000000 + i, mail_trabajador=f't{i}@repar.ar')
+        TrabajadoresProfesion.objects.create(id_trabajador=trabajador, id_profesion=profesiones[i % 3])
+        contratadores.append(contratador)
+        trabajadores.append(trabajador)
+    for i, contratador in enumerate(contratadores):
+        otro = trabajadores[(i + 1) % cantidad]
+        zona = contratador.id_zona_geografica_contratador
+        finalizado = Trabajo.objects.create(
+            id_contratador=contratador, id_trabajador=otro, id_profesion_requerida=profesiones[i % 3],
+            id_zona_geografica_trabajo=zona, id_estado_id=ESTADO_FINALIZADO,
+            titulo=f'Arreglar la pérdida {i}', descripcion='Pérdida de agua en la cocina.',
+            fecha_creacion=ahora - timedelta(days=10, minutes=i),
+        )
+        publicado = Trabajo.objects.create(
+            id_contratador=contratador, id_profesion_requerida=profesiones[i % 3],
+            id_zona_geografica_trabajo=zona, id_estado_id=ESTADO_PUBLICADO,
+            titulo=f'Pintar rejas {i}', descripcion='Pintar las rejas del frente.',
+            fecha_creacion=ahora - timedelta(minutes=i),
+        )
+        for trabajo in (publicado, finalizado):
+            Postulacion.objects.create(id_trabajo=trabajo, id_trabajador=otro, fecha_postulacion=ahora)
+        CalificacionTrabajador.objects.create(id_contratador=contratador, id_trabajador=otro, id_trabajo=finalizado,
+                                              calificacion=4, comentario='Muy bien.', fecha_calificacion=ahora)
+        CalificacionContratador.objects.create(id_contratador=contratador, id_trabajador=otro, id_trabajo=finalizado,
+                                               calificacion=5, comentario='Pagó a tiempo.', fecha_calificacion=ahora)
+    return contratadores, trabajadores
+
+
+def rutas_de_listado():
+    # (nombre, path) de las rutas GET de urls.py sin id, más LISTADOS_CON_ID
+    for patron in get_resolver().url_patterns:
+        vista = getattr(getattr(patron, 'callback', None), 'view_class', None)
+        if not isinstance(patron, URLPattern) or vista is None or not hasattr(vista, 'get'):
+            continue
+        if 'id' not in patron.pattern.converters or patron.name in LISTADOS_CON_ID:
+            yield patron.name, '/' + str(patron.pattern)
+
+
+class ListadosTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.contratadores, cls.trabajadores = sembrar(8)
+
+    def setUp(self):
+        # Los catálogos quedan en el cache entre requests
+        cache.clear()
+
+    def url(self, nombre, path, consulta):
+        contratador, trabajador = self.contratadores[1], self.trabajadores[1]
+        if nombre in LISTADOS_CON_ID:
+            path = path.replace('<int:id>', str(trabajador.pk))
+        trabajo = Trabajo.objects.filter(id_contratador=contratador).values_list('pk', flat=True).first()
+        return path + consulta.format(Contratador=contratador.pk, Trabajador=trabajador.pk, Trabajo=trabajo,
+                                      uid=contratador.uid_firebase)
+
+
+# En modo estricto un N+1 en cualquier listado hace fallar el test con
+# ConsultasRepetidas, aunque la cantidad de queries esperada esté mal
+@override_settings(REPAR_NPLUSUNO='estricto')
+class ConsultasPorListadoTests(ListadosTestCase):
+
+    def test_todos_los_listados_tienen_cantidad(self):
+        # Un listado nuevo en urls.py tiene que agregarse a CONSULTAS
+        nombres = {nombre for nombre, _ in rutas_de_listado()}
+        self.assertEqual(nombres, set(CONSULTAS) | set(CONSULTAS_ASYNC) | SIN_LISTADO)
+
+    def test_consultas_por_listado(self):
+        for nombre, path in rutas_de_listado():
+            for consulta, cantidad in CONSULTAS.get(nombre, {}).items():
+                url = self.url(nombre, path, consulta)
+                with self.subTest(url=url):
+                    cache.clear()
+                    with self.assertNumQueries(cantidad):
+                        respuesta = self.client.get(url)
+                    self.assertEqual(respuesta.status_code, 200, respuesta.content[:300])
+                    self.assertTrue(respuesta.json())
+
+
+def contratadores_uno_por_uno(request):
+    # N+1 a propósito: una query por trabajo para traer su contratador
+    return JsonResponse([trabajo.id_contratador.nombre for trabajo in Trabajo.objects.all()], safe=False)
+
+
+# Solo para NPlusUnoTests (ROOT_URLCONF)
+urlpatterns = [path('n-mas-uno/', contratadores_uno_por_uno)]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class NPlusUnoTests(ListadosTestCase):
+
+    @override_settings(REPAR_NPLUSUNO='estricto')
+    def test_estricto_lanza_error(self):
+        # El 500 igual se loguea antes de que el cliente relance la excepción
+        with self.assertLogs('reparBackend.nplusuno', 'WARNING'), \
+                self.assertRaisesRegex(ConsultasRepetidas, r'tests\.py:\d+ contratadores_uno_por_uno'):
+            self.client.get('/n-mas-uno/')
+
+    @override_settings(REPAR_NPLUSUNO='muestreo', REPAR_NPLUSUNO_MUESTREO=1.0)
+    def test_muestreo_solo_loguea(self):
+        with self.assertLogs('reparBackend.nplusuno', 'WARNING') as logs:
+            respuesta = self.client.get('/n-mas-uno/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['path'], '/n-mas-uno/')
+
+
+@override_settings(REPAR_FIREBASE='reparBackend.firebase.FirebaseLocal')
+class AutenticacionFirebaseTests(SimpleTestCase):
+    # Contra FirebaseLocal: firma sus tokens con una clave propia y los
+    # verifica igual que a los de Google, sin red ni credenciales
+
+    def test_token_valido(self):
+        claims = verificar_id_token(firebase().crear_token('uid-1', email='a@repar.ar'))
+        self.assertEqual(claims['uid'], 'uid-1')
+        self.assertEqual(claims['email'], 'a@repar.ar')
+
+    def test_token_vencido(self):
+        with self.assertRaisesRegex(TokenInvalido, 'expired'):
+            verificar_id_token(firebase().crear_token('uid-1', duracion=-10))
+
+    def test_audiencia_o_emisor_de_otro_proyecto(self):
+        for claims in ({'aud': 'otro-proyecto'}, {'iss': 'https://securetoken.google.com/otro-proyecto'}):
+            with self.subTest(claims=claims), self.assertRaises(TokenInvalido):
+                verificar_id_token(firebase().crear_token('uid-1', **claims))
+
+    def test_clave_desconocida(self):
+        # Firmado por otro proveedor local: su 'kid' no está entre las claves
+        firebase().certificados()
+        token = FirebaseLocal(project_id=firebase().project_id).crear_token('uid-1')
+        with self.assertRaisesRegex(TokenInvalido, 'clave desconocida'):
+            verificar_id_token(token)
+
+    def test_token_en_cache_no_se_vuelve_a_verificar(self):
+        token = firebase().crear_token('uid-1')
+        claims = verificar_id_token(token)
+        with mock.patch('jwt.decode', side_effect=AssertionError("se volvió a verificar")) as decode:
+            self.assertEqual(verificar_id_token(token), claims)
+        decode.assert_not_called()
+
+    def test_claves_se_renuevan_al_vencer_el_max_age(self):
+        # Google rota las claves: cada descarga devuelve las de un proveedor
+        # nuevo, válidas por 60 s según su Cache-Control
+        proveedores = [FirebaseLocal(), FirebaseLocal()]
+        kids = [next(iter(proveedor.certificados()[0])) for proveedor in proveedores]
+        descargas = []
+
+        def fuente():
+            descargas.append(None)
+            return proveedores[len(descargas) - 1].certificados()[0], 60
+
+        claves = ClavesPublicas(fuente)
+        with mock.patch('reparBackend.autenticacion.time.monotonic', return_value=1000.0) as reloj:
+            primera = claves.get(kids[0])
+            reloj.return_value = 1059.0
+            self.assertIs(claves.get(kids[0]), primera)
+            self.assertEqual(len(descargas), 1)
+
+            reloj.return_value = 1060.0
+            with self.assertRaisesRegex(TokenInvalido, 'clave desconocida'):
+                claves.get(kids[0])
+            self.assertEqual(len(descargas), 2)
+            self.assertIsNotNone(claves.get(kids[1]))
+
+    def test_metricas_con_token(self):
+        # Token válido: autenticado pero no staff (403); vencido: 401
+        valido = firebase().crear_token('uid-1')
+        vencido = firebase().crear_token('uid-1', duracion=-10)
+        self.assertEqual(self.client.get('/api/metricas/', HTTP_AUTHORIZATION=f'Bearer {valido}').status_code, 403)
+        self.assertEqual(self.client.get('/api/metricas/', HTTP_AUTHORIZATION=f'Bearer {vencido}').status_code, 401)
+
+
+class CursorTests(ListadosTestCase):
+
+    def recorrer(self, url):
+        # Pide página por página siguiendo `next`; devuelve todos los items
+        items = []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200, respuesta.content[:300])
+            items += respuesta.json()['results']
+            url = respuesta.json()['next']
+        return items
+
+    def test_las_paginas_cubren_el_listado(self):
+        for path, pk in (('/api/trabajos/', 'id_trabajo'), ('/api/postulaciones/', 'id_postulacion'),
+                         (f'/api/trabajadores/{self.trabajadores[1].pk}/feed/', 'id_trabajo')):
+            with self.subTest(path=path):
+                completo = [item[pk] for item in self.recorrer(path + '?page_size=100')]
+                self.assertTrue(completo)
+                self.assertEqual([item[pk] for item in self.recorrer(path + '?page_size=3')], completo)
+
+    def test_cursor_invalido(self):
+        for valores in ('no es json', ['abc', 1], ['2026-01-01T00:00:00+00:00', 'x'], [{}, []], [None, 1], [1]):
+            crudo = valores.encode() if isinstance(valores, str) else json.dumps(valores).encode()
+            cursor = base64.urlsafe_b64encode(crudo).decode()
+            with self.subTest(valores=valores):
+                respuesta = self.client.get('/api/trabajos/', {'cursor': cursor})
+                self.assertEqual(respuesta.status_code, 404)
+                self.assertEqual(respuesta.json(), {'detail': 'Cursor inválido.'})
+
+
+class TransicionesTests(ListadosTestCase):
+    # Dos lecturas del mismo trabajo que se actualizan una después de la
+    # otra: el orden en que dos PATCH simultáneos llegan al UPDATE. Con
+    # threads de verdad en TransicionesConcurrentesTests.
+
+    def setUp(self):
+        super().setUp()
+        self.publicado = Trabajo.objects.filter(id_estado=ESTADO_PUBLICADO).first()
+        self.a, self.b, self.c = self.trabajadores[:3]
+
+    def dos_lecturas(self):
+        return Trabajo.objects.get(pk=self.publicado.pk), Trabajo.objects.get(pk=self.publicado.pk)
+
+    def test_asignar_a_la_vez_en_estado_abierto(self):
+        primero, segundo = self.dos_lecturas()
+        actualizar_trabajo(primero, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.a.pk})
+        with self.assertRaisesRegex(TransicionInvalida, 'otro trabajador'):
+            actualizar_trabajo(segundo, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.b.pk})
+        self.assertEqual(Trabajo.objects.get(pk=self.publicado.pk).id_trabajador_id, self.a.pk)
+
+    def test_cambiar_de_trabajador_sin_cambiar_de_estado(self):
+        actualizar_trabajo(self.publicado, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.a.pk})
+        primero, segundo = self.dos_lecturas()
+        for trabajo, trabajador in ((primero, self.b), (segundo, self.c)):
+            with self.assertRaisesRegex(TransicionInvalida, 'otro trabajador'):
+                actualizar_trabajo(trabajo, {'id_trabajador_id': trabajador.pk})
+        self.assertEqual(Trabajo.objects.get(pk=self.publicado.pk).id_trabajador_id, self.a.pk)
+
+    def test_cambiar_de_trabajador_al_confirmar(self):
+        actualizar_trabajo(self.publicado, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.a.pk})
+        primero, segundo = self.dos_lecturas()
+        actualizar_trabajo(primero, {'id_estado_id': ESTADO_ACTIVO, 'id_trabajador_id': self.b.pk})
+        with self.assertRaisesRegex(TransicionInvalida, 'otro trabajador'):
+            actualizar_trabajo(segundo, {'id_estado_id': ESTADO_ACTIVO, 'id_trabajador_id': self.c.pk})
+        self.assertEqual(Trabajo.objects.get(pk=self.publicado.pk).id_trabajador_id, self.b.pk)
+
+    def test_sacar_el_trabajador_en_estado_abierto(self):
+        actualizar_trabajo(self.publicado, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.a.pk})
+        actualizar_trabajo(self.publicado, {'id_trabajador_id': None})
+        actualizar_trabajo(self.publicado, {'id_trabajador_id': self.b.pk})
+        self.assertEqual(Trabajo.objects.get(pk=self.publicado.pk).id_trabajador_id, self.b.pk)
+
+    def test_patch_saca_el_trabajador(self):
+        actualizar_trabajo(self.publicado, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.a.pk})
+        respuesta = self.client.patch(f'/api/trabajos/{self.publicado.pk}/', {'id_trabajador': None},
+                                      content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        trabajo = Trabajo.objects.get(pk=self.publicado.pk)
+        self.assertEqual((trabajo.id_estado_id, trabajo.id_trabajador_id), (ESTADO_ESPERANDO_CONFIRMACION, None))
+        self.assertIsNone(TarjetaTrabajo.objects.get(pk=self.publicado.pk).id_trabajador_id)
+
+    def test_patch_devuelve_409_con_lo_que_quedo(self):
+        actualizar_trabajo(self.publicado, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': self.a.pk})
+        respuesta = self.client.patch(f'/api/trabajos/{self.publicado.pk}/', {'id_trabajador': self.b.pk},
+                                      content_type='application/json')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json(), {'error': 'El trabajo ya tiene otro trabajador asignado.',
+                                            'id_estado': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador': self.a.pk})
+
+
+class TransicionesConcurrentesTests(TransactionTestCase):
+    # Varios threads, cada uno con su conexión, leen el mismo trabajo y
+    # después compiten por el UPDATE condicional. La base de test es un
+    # archivo (TEST['NAME'] en settings.py): con SQLite en memoria
+    # compartida un UPDATE bloqueado falla en lugar de esperar.
+    HILOS = 8
+
+    def setUp(self):
+        self.contratadores, self.trabajadores = sembrar(self.HILOS + 1)
+        self.trabajo = Trabajo.objects.filter(id_estado=ESTADO_PUBLICADO).first()
+
+    def en_paralelo(self, campos_por_hilo):
+        juntos = threading.Barrier(len(campos_por_hilo))
+        resultados = [None] * len(campos_por_hilo)
+
+        def aplicar(i, campos):
+            try:
+                trabajo = Trabajo.objects.get(pk=self.trabajo.pk)
+                juntos.wait()
+                with transaction.atomic():
+                    actualizar_trabajo(trabajo, campos)
+                resultados[i] = campos['id_trabajador_id']
+            except Exception as e:
+                resultados[i] = e
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=aplicar, args=(i, campos)) for i, campos in enumerate(campos_por_hilo)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        ganadores = [r for r in resultados if not isinstance(r, Exception)]
+        perdedores = [r for r in resultados if isinstance(r, Exception)]
+        self.assertEqual(len(ganadores), 1, resultados)
+        for error in perdedores:
+            self.assertIsInstance(error, TransicionInvalida)
+        self.assertEqual(Trabajo.objects.get(pk=self.trabajo.pk).id_trabajador_id, ganadores[0])
+        return ganadores[0]
+
+    def test_asignar_en_estado_abierto(self):
+        self.en_paralelo([{'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION, 'id_trabajador_id': trabajador.pk}
+                          for trabajador in self.trabajadores[:self.HILOS]])
+
+    def test_confirmar_a_otro_trabajador(self):
+        actualizar_trabajo(self.trabajo, {'id_estado_id': ESTADO_ESPERANDO_CONFIRMACION,
+                                          'id_trabajador_id': self.trabajadores[-1].pk})
+        ganador = self.en_paralelo([{'id_estado_id': ESTADO_ACTIVO, 'id_trabajador_id': trabajador.pk}
+                                    for trabajador in self.trabajadores[:self.HILOS]])
+        self.assertEqual(Trabajo.objects.get(pk=self.trabajo.pk).id_estado_id, ESTADO_ACTIVO)
+        self.assertEqual(TarjetaTrabajo.objects.get(pk=self.trabajo.pk).id_trabajador_id, ganador)
+
+
+class TarjetasTests(ListadosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Un trabajador postulado a todos los trabajos publicados
+        self.trabajador = self.trabajadores[0]
+        ahora = timezone.now()
+        for trabajo in Trabajo.objects.filter(id_estado=ESTADO_PUBLICADO).exclude(postulacion__id_trabajador=self.trabajador):
+            Postulacion.objects.create(id_trabajo=trabajo, id_trabajador=self.trabajador, fecha_postulacion=ahora)
+
+    def borrar(self, instancia):
+        # Cantidad de UPDATE a `postulaciones` de las tarjetas
+        with CaptureQueriesContext(connection) as queries:
+            instancia.delete()
+        self.assertEqual(list(tarjetas.diferencias()), [])
+        return sum('SET "postulaciones"' in query['sql'] for query in queries.captured_queries)
+
+    def test_borrar_postulacion(self):
+        self.assertEqual(self.borrar(Postulacion.objects.filter(id_trabajador=self.trabajador).first()), 1)
+
+    def test_borrar_trabajo_con_postulaciones(self):
+        trabajo = Trabajo.objects.filter(postulacion__id_trabajador=self.trabajador).first()
+        self.assertEqual(self.borrar(trabajo), 0)
+
+    def test_borrar_trabajador_con_postulaciones(self):
+        self.assertGreater(Postulacion.objects.filter(id_trabajador=self.trabajador).count(), 5)
+        self.assertEqual(self.borrar(self.trabajador), 1)
+
+    def test_borrar_contratador(self):
+        # En cascada sus trabajos (con sus postulaciones) y su trabajador
+        # (con las suyas en trabajos de otros)
+        self.assertEqual(self.borrar(self.trabajador.id_contratador), 1)
+
+
+class FeedTests(ListadosTestCase):
+
+    def test_plan_lee_un_rango_del_indice(self):
+        # El orden siempre es en memoria (TEMP B-TREE), pero solo de lo que
+        # entra en el rango de fechas de cada profesión y estado abierto
+        plan = feed_trabajador(self.trabajadores[1]).order_by(*ORDEN_FEED).explain()
+        trabajos = [linea for linea in plan.splitlines() if 'reparBackend_trabajo ' in linea]
+        self.assertEqual(len(trabajos), 1, plan)
+        self.assertIn('SEARCH reparBackend_trabajo USING INDEX trabajo_profesion_estado_idx', trabajos[0])
+        self.assertIn('fecha_creacion>?', trabajos[0])
+
+    def test_fuera_de_la_ventana(self):
+        trabajador = self.trabajadores[1]
+        ids = set(feed_trabajador(trabajador).values_list('pk', flat=True))
+        self.assertTrue(ids)
+        viejo = Trabajo.objects.get(pk=min(ids))
+        viejo.fecha_creacion = timezone.now() - timedelta(days=settings.REPAR_FEED_DIAS, minutes=1)
+        viejo.save()
+        self.assertEqual(set(feed_trabajador(trabajador).values_list('pk', flat=True)), ids - {viejo.pk})
+
+
+class BusquedaTests(ListadosTestCase):
+
+    def indice(self):
+        posteos = set(PosteoBusqueda.objects.values_list('id_trabajo', 'termino', 'frecuencia', 'longitud'))
+        return posteos, dict(TerminoBusqueda.objects.filter(documentos__gt=0).values_list('termino', 'documentos'))
+
+    def renombrar(self, profesion, nombre):
+        # Queries al índice
+        profesion.nombre_profesion = nombre
+        with CaptureQueriesContext(connection) as queries:
+            profesion.save()
+        return [query['sql'] for query in queries.captured_queries if 'busqueda' in query['sql']]
+
+    def test_renombrar_profesion(self):
+        profesion = Profesion.objects.first()
+        trabajos = Trabajo.objects.filter(id_profesion_requerida=profesion).count()
+        self.assertGreater(trabajos, 2)
+        queries = self.renombrar(profesion, 'Gasista matriculado')
+        # Un solo lote: los posteos de todos los trabajos se leen y se borran
+        # juntos, no de a un trabajo
+        self.assertEqual(sum(sql.startswith('SELECT') and 'posteo' in sql for sql in queries), 1)
+        self.assertEqual(sum(sql.startswith('DELETE') for sql in queries), 1)
+        self.assertEqual(len(busqueda.buscar('gasista', limite=100)), trabajos)
+        self.assertFalse(PosteoBusqueda.objects.filter(id_trabajo__id_profesion_requerida=profesion, termino='profesion').exists())
+
+        indice = self.indice()
+        busqueda.reconstruir()
+        self.assertEqual(indice, self.indice())
+
+    def test_mismo_nombre_no_reindexa(self):
+        profesion = Profesion.objects.first()
+        self.assertEqual(self.renombrar(profesion, profesion.nombre_profesion), [])
+        self.assertEqual(self.renombrar(profesion, profesion.nombre_profesion.upper()), [])
+
+
+class ZonasTests(ListadosTestCase):
+    # Reapuntar o dejar en NULL la zona de un trabajo o un trabajador tiene
+    # que mover su fecha_actualizacion, o /api/sync/ no lo vuelve a mandar
+
+    def setUp(self):
+        super().setUp()
+        self.antes = timezone.now() - timedelta(days=1)
+        Trabajo.objects.update(fecha_actualizacion=self.antes)
+        Trabajador.objects.update(fecha_actualizacion=self.antes)
+        self.zona, self.otra = (trabajador.id_zona_geografica_trabajador for trabajador in self.trabajadores[:2])
+
+    def assertActualizados(self):
+        for modelo in (Trabajo, Trabajador):
+            fechas = modelo.objects.filter(**{modelo._meta.pk.name + '__in': self.afectados[modelo]}).values_list('fecha_actualizacion', flat=True)
+            self.assertTrue(fechas)
+            self.assertTrue(all(fecha > self.antes for fecha in fechas))
+            self.assertEqual(modelo.objects.filter(fecha_actualizacion__gt=self.antes).count(), len(fechas))
+
+    def afectar(self):
+        self.afectados = {
+            Trabajo: list(Trabajo.objects.filter(id_zona_geografica_trabajo=self.zona).values_list('pk', flat=True)),
+            Trabajador: list(Trabajador.objects.filter(id_zona_geografica_trabajador=self.zona).values_list('pk', flat=True)),
+        }
+
+    def test_fusionar(self):
+        self.afectar()
+        ZonaGeografica.objects.fusionar({self.zona.pk: self.otra.pk})
+        self.assertActualizados()
+        self.assertFalse(Trabajo.objects.filter(id_zona_geografica_trabajo=self.zona.pk).exists())
+
+    def test_borrar_zona(self):
+        self.afectar()
+        self.zona.delete()
+        self.assertActualizados()
+        self.assertFalse(Trabajo.objects.filter(pk__in=self.afectados[Trabajo], id_zona_geografica_trabajo__isnull=False).exists())
+
+
+class ReputacionTests(ListadosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Un trabajador calificado en todos los trabajos finalizados, con
+        # calificaciones distintas para que el histograma tenga de todo
+        self.trabajador = self.trabajadores[1]
+        ahora = timezone.now()
+        for i, trabajo in enumerate(Trabajo.objects.filter(id_estado=ESTADO_FINALIZADO).exclude(id_trabajador=self.trabajador)):
+            CalificacionTrabajador.objects.create(id_contratador_id=trabajo.id_contratador_id, id_trabajador=self.trabajador,
+                                                  id_trabajo=trabajo, calificacion=Decimal(1 + i % 9) / 2 + 1,
+                                                  comentario='Bien.', fecha_calificacion=ahora)
+            CalificacionContratador.objects.create(id_contratador_id=trabajo.id_contratador_id, id_trabajador=self.trabajador,
+                                                   id_trabajo=trabajo, calificacion=Decimal(i % 5) + 1,
+                                                   comentario='Bien.', fecha_calificacion=ahora)
+        for modelo in reputacion.FUENTES:
+            reputacion.recalcular(modelo)
+
+    def borrar(self, instancia):
+        # Cantidad de UPDATE a las reputaciones
+        with CaptureQueriesContext(connection) as queries:
+            instancia.delete()
+        for modelo in reputacion.FUENTES:
+            self.assertEqual(list(reputacion.diferencias(modelo)), [])
+        return sum(query['sql'].startswith('UPDATE') and '_reputacion' in query['sql']
+                   for query in queries.captured_queries)
+
+    def test_borrar_calificacion(self):
+        antes = ReputacionTrabajador.objects.get(pk=self.trabajador.pk)
+        self.assertEqual(self.borrar(CalificacionTrabajador.objects.filter(id_trabajador=self.trabajador).last()), 1)
+        self.assertEqual(ReputacionTrabajador.objects.get(pk=self.trabajador.pk).cantidad, antes.cantidad - 1)
+
+    def test_borrar_trabajo_con_calificaciones(self):
+        trabajo = Trabajo.objects.filter(id_estado=ESTADO_FINALIZADO).exclude(id_trabajador=self.trabajador).first()
+        self.assertEqual(self.borrar(trabajo), 2)
+
+    def test_borrar_trabajador(self):
+        # Se restan de los contratadores que calificó; su propia reputación
+        # se borra con él
+        self.assertEqual(self.borrar(self.trabajador), 2)
+
+    def test_borrar_contratador(self):
+        # En cascada su trabajador y sus trabajos, con todas sus calificaciones
+        self.assertEqual(self.borrar(self.trabajador.id_contratador), 2)
+
+
+class RenderizadoTests(SimpleTestCase):
+
+    def test_mismos_bytes_que_json_renderer(self):
+        data = {'a': [1, 2.5, 1e16, 0.00001, 'ñ\u2028', None, True], 'b': {'c': Decimal('1.10')}}
+        self.assertEqual(JSONRapidoRenderer().render(data), JSONRenderer().render(data))
+
+    def test_floats_no_finitos_lanzan_error(self):
+        for valor in (float('nan'), float('inf'), -float('inf'), Decimal('NaN')):
+            with self.subTest(valor=valor):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({'a': [{'b': valor}]})
+                with self.assertRaises(ValueError):
+                    JSONRapidoRenderer().render({'a': [{'b': valor}]})
+
+
+class InstrumentacionTests(SimpleTestCase):
+
+    def test_tramos_en_threads_simultaneos(self):
+        # Dos threads de la misma vista async serializan a la vez: cuentan
+        # los dos, y uno anidado dentro de otro solo una vez
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        juntos = threading.Barrier(2)
+
+        def serializar():
+            with medir('serializer'):
+                juntos.wait()
+                with medir('serializer'):
+                    time.sleep(0.05)
+
+        try:
+            threads = [threading.Thread(target=contextvars.copy_context().run, args=(serializar,))
+                       for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            _medicion_actual.reset(token)
+        self.assertGreaterEqual(medicion.tramos['serializer'], 0.1)
+        self.assertLess(medicion.tramos['serializer'], 0.15)
+
+
+@override_settings(REPAR_FIREBASE='reparBackend.firebase.FirebaseLocal', REPAR_NPLUSUNO='estricto')
+class ConsultasPorListadoAsyncTests(TransactionTestCase):
+    # Los threads de las vistas async no ven la transacción de un TestCase:
+    # los datos se confirman y se borran al terminar cada test
+
+    def setUp(self):
+        cache.clear()
+        self.contratadores, self.trabajadores = sembrar(8)
+
+    def test_consultas_por_listado_async(self):
+        token = firebase().crear_token(self.contratadores[1].uid_firebase)
+        for nombre, path in rutas_de_listado():
+            for consulta, cantidad in CONSULTAS_ASYNC.get(nombre, {}).items():
+                with self.subTest(url=path + consulta):
+                    respuesta = self.client.get(path + consulta, HTTP_AUTHORIZATION=f'Bearer {token}')
+                    self.assertEqual(respuesta.status_code, 200, respuesta.content[:300])
+                    self.assertEqual(queries_de_server_timing(respuesta['Server-Timing']), cantidad)
+
+
+class ConexionFalsa:
+    # El par receive/send de un WebSocket: el test escribe en `entrantes` lo
+    # que manda el cliente y lee de `salientes` lo que le manda la app
+
+    def __init__(self):
+        self.entrantes = asyncio.Queue()
+        self.salientes = asyncio.Queue()
+
+    async def receive(self):
+        return await self.entrantes.get()
+
+    async def send(self, mensaje):
+        await self.salientes.put(mensaje)
+
+    async def siguiente(self):
+        return await asyncio.wait_for(self.salientes.get(), 5)
+
+
+@override_settings(REPAR_FIREBASE='reparBackend.firebase.FirebaseLocal')
+class EventosTests(TransactionTestCase):
+    # canales_de_usuario cierra las conexiones viejas: dentro de la
+    # transacción de un TestCase eso la rompería
+
+    def setUp(self):
+        cache.clear()
+        self.contratadores, self.trabajadores = sembrar(2)
+        self.broker = eventos.BrokerEnMemoria(maximo_cola=3)
+        parche = mock.patch.object(eventos, '_broker', self.broker)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.app = eventos.EventosWebSocket()
+        self.canal = eventos.canal_contratador(self.contratadores[0].pk)
+
+    def scope(self, uid='uid-0', path=eventos.RUTA):
+        headers = [(b'authorization', f'Bearer {firebase().crear_token(uid)}'.encode())] if uid else []
+        return {'type': 'websocket', 'path': path, 'headers': headers, 'query_string': b''}
+
+    async def conectar(self, scope):
+        conexion = ConexionFalsa()
+        await conexion.entrantes.put({'type': 'websocket.connect'})
+        conexion.tarea = asyncio.ensure_future(self.app(scope, conexion.receive, conexion.send))
+        return conexion
+
+    async def abrir(self):
+        conexion = await self.conectar(self.scope())
+        self.assertEqual(await conexion.siguiente(), {'type': 'websocket.accept'})
+        return conexion
+
+    async def cerrar(self, conexion):
+        await conexion.entrantes.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(conexion.tarea, 5)
+        self.assertEqual(self.broker.conexiones(), 0)
+
+    async def evento(self, conexion):
+        mensaje = await conexion.siguiente()
+        self.assertEqual(mensaje['type'], 'websocket.send')
+        return json.loads(mensaje['text'])
+
+    async def test_rechazos(self):
+        casos = [
+            (self.scope(path='/ws/otra/'), eventos.CIERRE_NO_ENCONTRADO),
+            (self.scope(uid=None), eventos.CIERRE_NO_AUTENTICADO),
+            ({**self.scope(), 'headers': [(b'authorization', b'Bearer no.es.un.token')]}, eventos.CIERRE_NO_AUTENTICADO),
+            (self.scope(uid='uid-sin-perfil'), eventos.CIERRE_SIN_PERFIL),
+        ]
+        for scope, codigo in casos:
+            with self.subTest(codigo=codigo):
+                conexion = await self.conectar(scope)
+                self.assertEqual(await conexion.siguiente(), {'type': 'websocket.close', 'code': codigo})
+                await asyncio.wait_for(conexion.tarea, 5)
+        self.assertEqual(self.broker.conexiones(), 0)
+
+    async def test_entrega_despues_del_commit(self):
+        conexion = await self.abrir()
+
+        def publicar():
+            with mock.patch.object(self.broker, 'publicar', wraps=self.broker.publicar) as publicar:
+                with transaction.atomic():
+                    eventos.publicar_al_confirmar([self.canal], {'tipo': 'prueba'})
+                    publicar.assert_not_called()
+                publicar.assert_called_once()
+
+        await sync_to_async(publicar)()
+        self.assertEqual(await self.evento(conexion), {'tipo': 'prueba'})
+        await self.cerrar(conexion)
+
+    async def test_nada_despues_de_un_rollback(self):
+        conexion = await self.abrir()
+
+        def publicar():
+            try:
+                with transaction.atomic():
+                    eventos.publicar_al_confirmar([self.canal], {'tipo': 'revertido'})
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            eventos.publicar_al_confirmar([self.canal], {'tipo': 'confirmado'})
+
+        await sync_to_async(publicar)()
+        self.assertEqual(await self.evento(conexion), {'tipo': 'confirmado'})
+        self.assertTrue(conexion.salientes.empty())
+        await self.cerrar(conexion)
+
+    async def test_cola_desbordada(self):
+        # Con la cola de 3 llena se descartan los eventos 3 y 4, y después
+        # del último que quedó se avisa una sola vez
+        conexion = await self.abrir()
+        for n in range(5):
+            self.broker.publicar([self.canal], {'n': n})
+        self.assertEqual([await self.evento(conexion) for _ in range(4)],
+                         [{'n': 0}, {'n': 1}, {'n': 2}, {'tipo': 'eventos.perdidos'}])
+        self.broker.publicar([self.canal], {'n': 5})
+        self.assertEqual(await self.evento(conexion), {'n': 5})
+        await self.cerrar(conexion)
+
+
+def replica_atrasada(conexion):
+    return 10.0
+
+
+@override_settings(REPAR_DB_REPLICAS=['replica'], REPAR_FIREBASE='reparBackend.firebase.FirebaseLocal')
+class ReplicasTests(TransactionTestCase):
+    # 'default' y 'replica' tienen datos distintos: la calle de las zonas que
+    # devuelve el listado dice de qué base leyó el request. Con TestCase
+    # todo correría dentro de una transacción, que siempre lee de la primaria.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        # Sin las demoras medidas por otros tests
+        self.enterContext(mock.patch.object(replicas, 'demoras', replicas.Demoras()))
+        # TransactionTestCase no vacía la réplica: el router no la migra
+        ZonaGeografica.objects.using('replica').all().delete()
+        ZonaGeografica.objects.using('default').create(calle='Primaria', ciudad='Córdoba', provincia='Córdoba')
+        ZonaGeografica.objects.using('replica').create(calle='Réplica', ciudad='Córdoba', provincia='Córdoba')
+
+    def calles(self, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        respuesta = self.client.get('/api/zonas-geograficas/', **headers)
+        self.assertEqual(respuesta.status_code, 200)
+        return sorted(zona['calle'] for zona in respuesta.json())
+
+    def test_get_lee_de_la_replica(self):
+        self.assertEqual(self.calles(), ['Réplica'])
+        self.assertEqual(replicas.demoras.contadores, {'replica': 1})
+
+    def test_escritura_va_a_la_primaria_y_quien_escribe_lee_de_ella(self):
+        token = firebase().crear_token('uid-escribe')
+        respuesta = self.client.post('/api/zonas-geograficas/', {'calle': 'Nueva', 'ciudad': 'Córdoba', 'provincia': 'Córdoba'},
+                                     content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        self.assertTrue(ZonaGeografica.objects.using('default').filter(calle='Nueva').exists())
+        self.assertFalse(ZonaGeografica.objects.using('replica').filter(calle='Nueva').exists())
+
+        # Por REPAR_DB_LECTURA_PROPIA segundos quien escribió lee de la
+        # primaria; los demás siguen en la réplica
+        self.assertEqual(self.calles(token), ['Nueva', 'Primaria'])
+        self.assertEqual(self.calles(firebase().crear_token('uid-otro')), ['Réplica'])
+        self.assertEqual(self.calles(), ['Réplica'])
+
+    @override_settings(REPAR_DB_REPLICA_DEMORA='reparBackend.tests.replica_atrasada')
+    def test_replica_atrasada_lee_de_la_primaria(self):
+        self.assertEqual(self.calles(), ['Primaria'])
+        self.assertEqual(replicas.demoras.contadores, {'primaria_sin_replica': 1})
@@ -0,0 +1,89 @@
+"""
+Cambios de estado y de trabajador de un Trabajo sin pisar los de otros
+requests.
+
+El PATCH leía la fila, le cambiaba los campos y la guardaba entera: dos
+"aceptar" al mismo tiempo sobre el mismo trabajo terminaban bien los dos y
+quedaba asignado el último. `actualizar_trabajo` escribe solo los campos
+que cambian, con un UPDATE condicionado al estado y al trabajador leídos:
+
+    UPDATE ... SET ... WHERE id_trabajo = %s AND id_estado = <leído> AND id_trabajador = <leído>
+
+Si otro request los cambió en el medio, el UPDATE no toca ninguna fila: se
+vuelve a leer el trabajo y la transición se revisa contra lo que hay ahora
+(aceptar otra vez al mismo trabajador no cambia nada; aceptar a otro falla
+con TransicionInvalida). No hay SELECT ... FOR UPDATE: la fila queda
+bloqueada solo desde el UPDATE hasta el commit, así que muchos requests
+sobre el mismo trabajo no hacen cola esperando locks.
+
+Las transiciones permitidas entre estados son TRANSICIONES (models.py).
+QuerySet.update() no manda post_save, así que se manda a mano con
+`update_fields`, para el índice de búsqueda y lo demás que escucha a Trabajo.
+"""
+
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .models import ESTADOS_ABIERTOS, ESTADOS_CON_TRABAJADOR, TRANSICIONES, Trabajo
+
+# Cada reintento es porque otro request cambió el estado; como los estados
+# no vuelven atrás, alcanza con pocos
+REINTENTOS = 5
+
+
+class TransicionInvalida(ValueError):
+
+    def __init__(self, mensaje, trabajo):
+        super().__init__(mensaje)
+        # Lo que tiene el trabajo ahora, para que el cliente se actualice
+        self.id_estado = trabajo.id_estado_id
+        self.id_trabajador = trabajo.id_trabajador_id
+
+
+def validar_transicion(trabajo, id_estado, id_trabajador):
+    actual = trabajo.id_estado_id
+    asignado = trabajo.id_trabajador_id
+    if id_estado != actual and id_estado not in TRANSICIONES.get(actual, ()):
+        raise TransicionInvalida(f"Un trabajo en estado {actual} no puede pasar al estado {id_estado}.", trabajo)
+    if id_trabajador != asignado and actual not in ESTADOS_ABIERTOS:
+        if asignado is not None:
+            raise TransicionInvalida("El trabajo ya tiene otro trabajador asignado.", trabajo)
+        raise TransicionInvalida(f"A un trabajo en estado {actual} ya no se le puede asignar un trabajador.", trabajo)
+    # En un estado abierto se asigna un trabajador al trabajo que no tiene, o
+    # se le saca; cambiar uno por otro solo junto con el paso a un estado
+    # cerrado. Si no, de dos PATCH con trabajadores distintos el segundo
+    # reintenta contra el trabajador que dejó el primero y lo pisa.
+    if (id_trabajador != asignado and asignado is not None and id_trabajador is not None
+            and id_estado in ESTADOS_ABIERTOS):
+        raise TransicionInvalida("El trabajo ya tiene otro trabajador asignado.", trabajo)
+    if id_estado in ESTADOS_CON_TRABAJADOR and id_trabajador is None:
+        raise TransicionInvalida(f"Para pasar al estado {id_estado} hace falta id_trabajador.", trabajo)
+
+
+def actualizar_trabajo(trabajo, campos):
+    # campos: {attname: valor} (id_estado_id, id_trabajador_id, titulo, ...).
+    # Devuelve (id_estado, id_trabajador) que tenía el trabajo justo antes
+    # del cambio, y deja `trabajo` con los valores nuevos. Si el trabajo se
+    # borró en el medio lanza Trabajo.DoesNotExist.
+    for _ in range(REINTENTOS):
+        anterior = (trabajo.id_estado_id, trabajo.id_trabajador_id)
+        validar_transicion(
+            trabajo,
+            campos.get('id_estado_id', anterior[0]),
+            campos.get('id_trabajador_id', anterior[1]),
+        )
+        cambios = {campo: valor for campo, valor in campos.items() if getattr(trabajo, campo) != valor}
+        if not cambios:
+            return anterior
+        cambios['fecha_actualizacion'] = timezone.now()
+        actualizadas = (Trabajo.objects
+                        .filter(pk=trabajo.pk, id_estado=anterior[0], id_trabajador=anterior[1])
+                        .update(**cambios))
+        if actualizadas:
+            for campo, valor in cambios.items():
+                setattr(trabajo, campo, valor)
+            post_save.send(sender=Trabajo, instance=trabajo, created=False, update_fields=frozenset(cambios),
+                           raw=False, using=trabajo._state.db)
+            return anterior
+        trabajo.refresh_from_db()
+    raise TransicionInvalida("El trabajo cambió de estado varias veces mientras se actualizaba; volver a intentar.", trabajo)
@@ -14,7 +14,15 @@ from .views import (
     CalificacionContratadorView,
     TrabajadoresProfesionView,
     FirebaseLoginView, 
-    FirebaseRegisterView
+    FirebaseRegisterView,
+    ReputacionTrabajadorView,
+    ReputacionContratadorView,
+    FeedTrabajadorView,
+    TrabajoBusquedaView,
+    TarjetaTrabajoView,
+    PostulacionTarjetaView,
+    MetricasView,
+    SyncView
 )
 
 urlpatterns = [
@@ -31,15 +39,21 @@ urlpatterns = [
     
     path('api/contratadores/', ContratadorView.as_view(), name='contratador-lista'),
     path('api/contratadores/<int:id>/', ContratadorView.as_view(), name='contratador-detalle'),
+    path('api/contratadores/<int:id>/reputacion/', ReputacionContratadorView.as_view(), name='contratador-reputacion'),
     
     path('api/trabajadores/', TrabajadorView.as_view(), name='trabajador-lista'),
     path('api/trabajadores/<int:id>/', TrabajadorView.as_view(), name='trabajador-detalle'),
+    path('api/trabajadores/<int:id>/reputacion/', ReputacionTrabajadorView.as_view(), name='trabajador-reputacion'),
+    path('api/trabajadores/<int:id>/feed/', FeedTrabajadorView.as_view(), name='trabajador-feed'),
     
     path('api/trabajos/', TrabajoView.as_view(), name='trabajo-lista'),
     path('api/trabajos/<int:id>/', TrabajoView.as_view(), name='trabajo-detalle'),
+    path('api/trabajos/search/', TrabajoBusquedaView.as_view(), name='trabajo-busqueda'),
+    path('api/trabajos/tarjetas/', TarjetaTrabajoView.as_view(), name='trabajo-tarjetas'),
     
     path('api/postulaciones/', PostulacionView.as_view(), name='postulacion-lista'),
     path('api/postulaciones/<int:id>/', PostulacionView.as_view(), name='postulacion-detalle'),
+    path('api/postulaciones/tarjetas/', PostulacionTarjetaView.as_view(), name='postulacion-tarjetas'),
     
     path('api/calificaciones/', CalificacionesView.as_view(), name='calificaciones-general'),
     
@@ -54,5 +68,8 @@ urlpatterns = [
     
     path('api/auth/firebase-login/', FirebaseLoginView.as_view(), name='firebase-login'),
     path('api/auth/firebase-register/', FirebaseRegisterView.as_view(), name='firebase-register'),
+
+    path('api/metricas/', MetricasView.as_view(), name='metricas'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
     
 ]
\ No newline at end of file
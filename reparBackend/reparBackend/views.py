@@ -1,9 +1,18 @@
+import logging
+import os
+from datetime import timedelta
+from functools import partial
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 
-from firebase_admin import auth as firebase_auth
 from django.db import transaction, IntegrityError
 
 from .models import (
@@ -16,7 +25,10 @@ from .models import (
     Postulacion,
     CalificacionTrabajador,
     CalificacionContratador,
-    TrabajadoresProfesion
+    TrabajadoresProfesion,
+    ReputacionTrabajador,
+    ReputacionContratador,
+    TarjetaTrabajo
 )
 from .serializers import (
     ZonaGeograficaSerializer,
@@ -28,31 +40,111 @@ from .serializers import (
     PostulacionSerializer,
     CalificacionTrabajadorSerializer,
     CalificacionContratadorSerializer,
-    TrabajadoresProfesionSerializer
+    TrabajadoresProfesionSerializer,
+    ReputacionTrabajadorSerializer,
+    ReputacionContratadorSerializer,
+    TarjetaTrabajoSerializer,
+    PostulacionTarjetaSerializer,
+    Seleccion
 )
+from .pagination import leer_page_size, lista_paginada, paginacion_pedida
+from .renderizado import plan_filas, serializar_filas
+from .autenticacion import verificar_id_token
+from .feed import ORDEN_FEED, feed_trabajador
+from .geo import filtrar_por_radio, leer_parametros_radio
+from .busqueda import buscar
+from .catalogos import Catalogo
+from .instrumentacion import histogramas
+from .asincronico import APIViewAsync, en_paralelo, en_thread
+from . import pool_conexiones, replicas
+from .sincronizacion import leer_token, sincronizar
+from .eventos import publicar_postulaciones, publicar_trabajo_actualizado
+from .transiciones import TransicionInvalida
+from .tarjetas import sumar_postulaciones
+
+logger = logging.getLogger('reparBackend.views')
+
+
+def resolver_zona(zona_data, zona_actual=None):
+    # Devuelve (zona canonica, errores). Con zona_actual, zona_data puede ser
+    # parcial y lo que falta se toma de la zona actual, que no se modifica
+    # porque puede estar compartida con otros perfiles.
+    if zona_actual is not None:
+        zona_data = {
+            'calle': zona_actual.calle,
+            'ciudad': zona_actual.ciudad,
+            'provincia': zona_actual.provincia,
+            **zona_data,
+        }
+    zona_serializer = ZonaGeograficaSerializer(data=zona_data)
+    if not zona_serializer.is_valid():
+        return None, zona_serializer.errors
+    return zona_serializer.save(), None
+
+
+def crear_en_bloque(request, serializer_class, despues=None):
+    # POST con una lista: se crean todos en una transaccion o ninguno. Si
+    # algo falla la respuesta es una lista de errores alineada con la
+    # recibida ({} para los objetos validos). Los creados se devuelven en el
+    # mismo orden, armados desde .values() como los listados rapidos.
+    # `despues` recibe los creados, dentro de la transaccion.
+    serializer = serializer_class(
+        data=request.data, many=True, allow_empty=False,
+        max_length=getattr(settings, 'REPAR_LOTE_MAXIMO', 1000), context={'request': request},
+    )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        with transaction.atomic():
+            serializer.save()
+            if despues is not None:
+                despues(serializer.instance)
+    except IntegrityError as e:
+        # Otro request insertó lo mismo entre la validación y el INSERT: se
+        # revisa de nuevo para devolver la lista de errores
+        errores = serializer.errores_de_base(serializer.validated_data)
+        if any(errores):
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"db_error": f"Error de integridad: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    plan = plan_filas(serializer_class, request.query_params.get('fields'), request.query_params.get('expand'))
+    pks = [objeto.pk for objeto in serializer.instance]
+    filas = {fila[plan.pk]: fila for fila in serializer_class.Meta.model.objects.filter(pk__in=set(pks)).values(*plan.columnas)}
+    return Response(serializar_filas(plan, [filas[pk] for pk in pks]), status=status.HTTP_201_CREATED)
 
 
 class ZonaGeograficaView(APIView):
     def get(self, request, id=None):
         if id:
-            item = get_object_or_404(ZonaGeografica, pk=id)
-            serializer = ZonaGeograficaSerializer(item)
+            item = get_object_or_404(ZonaGeograficaSerializer.setup_eager_loading(ZonaGeografica.objects.all(), request), pk=id)
+            serializer = ZonaGeograficaSerializer(item, context={'request': request})
             return Response(serializer.data)
-        items = ZonaGeografica.objects.all()
-        serializer = ZonaGeograficaSerializer(items, many=True)
-        return Response(serializer.data)
+        items = ZonaGeograficaSerializer.setup_eager_loading(ZonaGeografica.objects.all(), request)
+        return lista_paginada(request, items, ZonaGeograficaSerializer, ('id_zona_geografica',))
 
     def post(self, request):
+        if isinstance(request.data, list):
+            return crear_en_bloque(request, ZonaGeograficaSerializer)
         serializer = ZonaGeograficaSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @transaction.atomic
     def patch(self, request, id):
         item = get_object_or_404(ZonaGeografica, pk=id)
         serializer = ZonaGeograficaSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
+            direccion = {campo: serializer.validated_data.get(campo, getattr(item, campo))
+                         for campo in ('calle', 'ciudad', 'provincia')}
+            existente = ZonaGeografica.objects.filter(
+                clave=ZonaGeografica.calcular_clave(**direccion)
+            ).exclude(pk=item.pk).first()
+            if existente:
+                # La direccion nueva ya existe: esta zona se fusiona con esa
+                ZonaGeografica.objects.fusionar({item.pk: existente.pk})
+                return Response(ZonaGeograficaSerializer(existente).data)
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -71,20 +163,33 @@ class ZonaGeograficaView(APIView):
             return Response({"error": f"Ocurrió un error inesperado: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+catalogo_profesiones = Catalogo(
+    'profesiones',
+    lambda: ProfesionSerializer(Profesion.objects.order_by('nombre_profesion', 'id_profesion'), many=True).data,
+    'id_profesion',
+)
+
+
 class ProfesionView(APIView):
     def get(self, request, id=None):
+        # Catalogo casi estatico: se sirve desde cache con ETag
+        if not paginacion_pedida(request) and not Seleccion.pedida(request) and 'ids' not in request.query_params:
+            response = catalogo_profesiones.responder(request, id)
+            if response is not None:
+                return response
+
         if id:
-            item = get_object_or_404(Profesion, pk=id)
-            serializer = ProfesionSerializer(item)
+            item = get_object_or_404(ProfesionSerializer.setup_eager_loading(Profesion.objects.all(), request), pk=id)
+            serializer = ProfesionSerializer(item, context={'request': request})
             return Response(serializer.data)
-        items = Profesion.objects.all().order_by('nombre_profesion')
-        serializer = ProfesionSerializer(items, many=True)
-        return Response(serializer.data)
+        items = ProfesionSerializer.setup_eager_loading(Profesion.objects.all(), request)
+        return lista_paginada(request, items, ProfesionSerializer, ('nombre_profesion', 'id_profesion'))
 
     def post(self, request):
         serializer = ProfesionSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
+            catalogo_profesiones.invalidar()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -93,6 +198,7 @@ class ProfesionView(APIView):
         serializer = ProfesionSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            catalogo_profesiones.invalidar()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -100,6 +206,7 @@ class ProfesionView(APIView):
         item = get_object_or_404(Profesion, pk=id)
         try:
             item.delete()
+            catalogo_profesiones.invalidar()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except IntegrityError as e:
              return Response(
@@ -110,20 +217,33 @@ class ProfesionView(APIView):
             return Response({"error": f"Ocurrió un error inesperado: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+catalogo_estados = Catalogo(
+    'estados',
+    lambda: EstadoSerializer(Estado.objects.order_by('id_estado'), many=True).data,
+    'id_estado',
+)
+
+
 class EstadoView(APIView):
     def get(self, request, id=None):
+        # Catalogo casi estatico: se sirve desde cache con ETag
+        if not paginacion_pedida(request) and not Seleccion.pedida(request) and 'ids' not in request.query_params:
+            response = catalogo_estados.responder(request, id)
+            if response is not None:
+                return response
+
         if id:
-            item = get_object_or_404(Estado, pk=id)
-            serializer = EstadoSerializer(item)
+            item = get_object_or_404(EstadoSerializer.setup_eager_loading(Estado.objects.all(), request), pk=id)
+            serializer = EstadoSerializer(item, context={'request': request})
             return Response(serializer.data)
-        items = Estado.objects.all()
-        serializer = EstadoSerializer(items, many=True)
-        return Response(serializer.data)
+        items = EstadoSerializer.setup_eager_loading(Estado.objects.all(), request)
+        return lista_paginada(request, items, EstadoSerializer, ('id_estado',))
 
     def post(self, request):
         serializer = EstadoSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
+            catalogo_estados.invalidar()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -132,6 +252,7 @@ class EstadoView(APIView):
         serializer = EstadoSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            catalogo_estados.invalidar()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -139,6 +260,7 @@ class EstadoView(APIView):
         item = get_object_or_404(Estado, pk=id)
         try:
             item.delete()
+            catalogo_estados.invalidar()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except IntegrityError as e:
              return Response(
@@ -154,23 +276,22 @@ class ContratadorView(APIView):
         uid_firebase = request.query_params.get('uid_firebase', None)
 
         if id:
-            item = get_object_or_404(Contratador, pk=id)
-            serializer = ContratadorSerializer(item)
+            item = get_object_or_404(ContratadorSerializer.setup_eager_loading(Contratador.objects.all(), request), pk=id)
+            serializer = ContratadorSerializer(item, context={'request': request})
             return Response(serializer.data)
 
         # filtro contratadores por uid firebase
         if uid_firebase:
-            items = Contratador.objects.filter(uid_firebase=uid_firebase)
+            items = ContratadorSerializer.setup_eager_loading(Contratador.objects.filter(uid_firebase=uid_firebase), request)
             item = items.first()
             if item:
-                serializer = ContratadorSerializer(item)
+                serializer = ContratadorSerializer(item, context={'request': request})
                 return Response(serializer.data)
             else:
                  return Response([], status=status.HTTP_200_OK)
 
-        items = Contratador.objects.all()
-        serializer = ContratadorSerializer(items, many=True)
-        return Response(serializer.data)
+        items = ContratadorSerializer.setup_eager_loading(Contratador.objects.all(), request)
+        return lista_paginada(request, items, ContratadorSerializer, ('id_contratador',))
 
     def post(self, request):
         serializer = ContratadorSerializer(data=request.data)
@@ -207,34 +328,42 @@ class TrabajadorView(APIView):
         uid_firebase = request.query_params.get('uid_firebase', None)
         
         if id:
-            item = get_object_or_404(Trabajador, pk=id)
-            serializer = TrabajadorSerializer(item)
+            item = get_object_or_404(TrabajadorSerializer.setup_eager_loading(Trabajador.objects.all(), request), pk=id)
+            serializer = TrabajadorSerializer(item, context={'request': request})
             return Response(serializer.data)
 
         id_contratador = request.query_params.get('id_contratador')
         if id_contratador:
             try:
-                items = Trabajador.objects.filter(id_contratador=int(id_contratador))
+                items = TrabajadorSerializer.setup_eager_loading(Trabajador.objects.filter(id_contratador=int(id_contratador)), request)
             except ValueError:
                  return Response({"error": "id_contratador debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
         else:
-            items = Trabajador.objects.all()
+            items = TrabajadorSerializer.setup_eager_loading(Trabajador.objects.all(), request)
 
         # filtro trabajadores por uid_firebase de su contratador No era necesario xd pero queda por si en util despues
         if uid_firebase:
             contratador = Contratador.objects.filter(uid_firebase=uid_firebase).first()
             if contratador:
-                trabajador = Trabajador.objects.filter(id_contratador=contratador).first()
+                trabajador = TrabajadorSerializer.setup_eager_loading(Trabajador.objects.filter(id_contratador=contratador), request).first()
                 if trabajador:
-                    serializer = TrabajadorSerializer(trabajador)
+                    serializer = TrabajadorSerializer(trabajador, context={'request': request})
                     return Response(serializer.data)
                 else:
                     return Response([], status=status.HTTP_200_OK)
             else:
                 return Response([], status=status.HTTP_200_OK)
 
-        serializer = TrabajadorSerializer(items, many=True)
-        return Response(serializer.data)
+        # ?lat=&lng=&radius_km= -> solo los trabajadores en el radio, del mas cercano al mas lejano
+        try:
+            radio = leer_parametros_radio(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if radio:
+            items = filtrar_por_radio(items, 'id_zona_geografica_trabajador', *radio)
+            return lista_paginada(request, items, TrabajadorSerializer, ('distancia_km', 'id_trabajador'))
+
+        return lista_paginada(request, items, TrabajadorSerializer, ('id_trabajador',))
 
     @transaction.atomic
     def post(self, request):
@@ -243,12 +372,10 @@ class TrabajadorView(APIView):
         id_zona_trabajador = data.get('id_zona_geografica_trabajador')
 
         if zona_data:
-            zona_serializer = ZonaGeograficaSerializer(data=zona_data)
-            if zona_serializer.is_valid():
-                zona = zona_serializer.save()
-                id_zona_trabajador = zona.id_zona_geografica
-            else:
-                 return Response({"zona_errors": zona_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            zona, zona_errors = resolver_zona(zona_data)
+            if zona_errors:
+                 return Response({"zona_errors": zona_errors}, status=status.HTTP_400_BAD_REQUEST)
+            id_zona_trabajador = zona.id_zona_geografica
         elif not id_zona_trabajador:
              return Response({"error": "Se requiere 'id_zona_geografica_trabajador' o 'zona_geografica_trabajador_data'."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -272,20 +399,10 @@ class TrabajadorView(APIView):
         id_zona_trabajador = data.get('id_zona_geografica_trabajador', item.id_zona_geografica_trabajador_id)
 
         if zona_data:
-             if item.id_zona_geografica_trabajador:
-                  zona_serializer = ZonaGeograficaSerializer(item.id_zona_geografica_trabajador, data=zona_data, partial=True)
-                  if zona_serializer.is_valid():
-                       zona_serializer.save()
-                       id_zona_trabajador = item.id_zona_geografica_trabajador_id
-                  else:
-                       return Response({"zona_errors": zona_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
-             else:
-                  zona_serializer = ZonaGeograficaSerializer(data=zona_data)
-                  if zona_serializer.is_valid():
-                       zona = zona_serializer.save()
-                       id_zona_trabajador = zona.id_zona_geografica
-                  else:
-                       return Response({"zona_errors": zona_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+             zona, zona_errors = resolver_zona(zona_data, item.id_zona_geografica_trabajador)
+             if zona_errors:
+                  return Response({"zona_errors": zona_errors}, status=status.HTTP_400_BAD_REQUEST)
+             id_zona_trabajador = zona.id_zona_geografica
 
         data['id_zona_geografica_trabajador'] = id_zona_trabajador
 
@@ -306,20 +423,23 @@ class TrabajadorView(APIView):
             return Response({"error": f"Ocurrió un error inesperado: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class FeedTrabajadorView(APIView):
+    def get(self, request, id):
+        trabajador = get_object_or_404(Trabajador.objects.select_related('id_zona_geografica_trabajador'), pk=id)
+        items = TrabajoSerializer.setup_eager_loading(feed_trabajador(trabajador), request)
+        response = lista_paginada(request, items, TrabajoSerializer, ORDEN_FEED, opcional=False, rapido=True)
+        patch_cache_control(response, private=True, max_age=60)
+        return response
+
+
 class TrabajoView(APIView):
     def get(self, request, id=None):
         if id:
-            item = get_object_or_404(Trabajo, pk=id)
-            serializer = TrabajoSerializer(item)
+            item = get_object_or_404(TrabajoSerializer.setup_eager_loading(Trabajo.objects.all(), request), pk=id)
+            serializer = TrabajoSerializer(item, context={'request': request})
             return Response(serializer.data)
 
-        items = Trabajo.objects.select_related(
-            'id_contratador',
-            'id_trabajador',
-            'id_profesion_requerida',
-            'id_zona_geografica_trabajo',
-            'id_estado'
-        ).all().order_by('-fecha_creacion', '-id_trabajo')
+        items = TrabajoSerializer.setup_eager_loading(Trabajo.objects.all(), request)
 
         id_contratador = request.query_params.get('id_contratador', None)
         uid_firebase = request.query_params.get('uid_firebase', None)
@@ -352,7 +472,6 @@ class TrabajoView(APIView):
                 items = Trabajo.objects.none()
                 
         # Filtro por estado del trabajo
-        # print(f"id_estado: {id_estado}")
         if id_estado:
             if id_estado == "1,2":
                 estados_filtrar = [int(id_estado[0]), int(id_estado[2])]
@@ -366,8 +485,16 @@ class TrabajoView(APIView):
                 except:
                     items = Trabajo.objects.all()
 
-        serializer = TrabajoSerializer(items, many=True)
-        return Response(serializer.data)
+        # ?lat=&lng=&radius_km= -> solo los trabajos en el radio, del mas cercano al mas lejano
+        try:
+            radio = leer_parametros_radio(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if radio:
+            items = filtrar_por_radio(items, 'id_zona_geografica_trabajo', *radio)
+            return lista_paginada(request, items, TrabajoSerializer, ('distancia_km', 'id_trabajo'), rapido=True)
+
+        return lista_paginada(request, items, TrabajoSerializer, ('-fecha_creacion', '-id_trabajo'), rapido=True)
     
         # SI USAS IF SOLO SE APLICA UN FILTRO!!! WACHO
 
@@ -379,20 +506,10 @@ class TrabajoView(APIView):
         id_zona_trabajo = data.get('id_zona_geografica_trabajo')
 
         if zona_data:
-            try:
-                zona_existente = ZonaGeografica.objects.get(
-                    calle=zona_data.get('calle'),
-                    ciudad=zona_data.get('ciudad'),
-                    provincia=zona_data.get('provincia'),
-                )
-                id_zona_trabajo = zona_existente.id_zona_geografica
-            except ZonaGeografica.DoesNotExist:
-                zona_serializer = ZonaGeograficaSerializer(data=zona_data)
-                if zona_serializer.is_valid():
-                    zona = zona_serializer.save()
-                    id_zona_trabajo = zona.id_zona_geografica
-                else:
-                    return Response({"zona_errors": zona_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            zona, zona_errors = resolver_zona(zona_data)
+            if zona_errors:
+                return Response({"zona_errors": zona_errors}, status=status.HTTP_400_BAD_REQUEST)
+            id_zona_trabajo = zona.id_zona_geografica
         elif not id_zona_trabajo:
              return Response({"error": "Se requiere 'id_zona_geografica_trabajo' o 'zona_geografica_trabajo_data'."},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -416,39 +533,37 @@ class TrabajoView(APIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @transaction.atomic
     def patch(self, request, id):
+        # La lectura queda fuera de la transacción: el primer acceso a la
+        # fila dentro es el UPDATE condicional (ver transiciones.py)
         item = get_object_or_404(Trabajo, pk=id)
         data = request.data.copy()
         zona_data = data.pop('zona_geografica_trabajo_data', None)
         id_zona_trabajo = data.get('id_zona_geografica_trabajo', item.id_zona_geografica_trabajo_id)
 
-        if zona_data:
-            if item.id_zona_geografica_trabajo:
-                 zona_serializer = ZonaGeograficaSerializer(item.id_zona_geografica_trabajo, data=zona_data, partial=True)
-                 if zona_serializer.is_valid():
-                      zona_serializer.save()
-                      id_zona_trabajo = item.id_zona_geografica_trabajo_id
-                 else:
-                      return Response({"zona_errors": zona_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                 zona_serializer = ZonaGeograficaSerializer(data=zona_data)
-                 if zona_serializer.is_valid():
-                      zona = zona_serializer.save()
-                      id_zona_trabajo = zona.id_zona_geografica
-                 else:
-                      return Response({"zona_errors": zona_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                if zona_data:
+                    zona, zona_errors = resolver_zona(zona_data, item.id_zona_geografica_trabajo)
+                    if zona_errors:
+                         return Response({"zona_errors": zona_errors}, status=status.HTTP_400_BAD_REQUEST)
+                    id_zona_trabajo = zona.id_zona_geografica
 
-        data['id_zona_geografica_trabajo'] = id_zona_trabajo
+                data['id_zona_geografica_trabajo'] = id_zona_trabajo
 
-        serializer = TrabajoSerializer(item, data=data, partial=True)
-        if serializer.is_valid():
-            try:
+                serializer = TrabajoSerializer(item, data=data, partial=True)
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
                 serializer.save()
-                return Response(serializer.data)
-            except IntegrityError as e:
-                 return Response({"db_error": f"Error de integridad: {e}"}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                publicar_trabajo_actualizado(item, *serializer.anterior)
+        except TransicionInvalida as e:
+            return Response({"error": str(e), "id_estado": e.id_estado, "id_trabajador": e.id_trabajador},
+                            status=status.HTTP_409_CONFLICT)
+        except Trabajo.DoesNotExist:
+            return Response({"error": "El trabajo fue eliminado."}, status=status.HTTP_404_NOT_FOUND)
+        except IntegrityError as e:
+             return Response({"db_error": f"Error de integridad: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializer.data)
 
     def delete(self, request, id):
         item = get_object_or_404(Trabajo, pk=id)
@@ -459,16 +574,93 @@ class TrabajoView(APIView):
             return Response({"error": f"Ocurrió un error inesperado al eliminar el trabajo: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class TrabajoBusquedaView(APIView):
+    # /api/trabajos/search/?q=...&id_estado=1,2&profesiones=3,4
+    max_offset = 1000
+
+    def get(self, request):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response({"error": "Falta el parámetro 'q'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        filtros = {}
+        for parametro in ('id_estado', 'profesiones'):
+            valor = request.query_params.get(parametro, '')
+            try:
+                filtros[parametro] = [int(v) for v in valor.split(',') if v.strip()]
+            except ValueError:
+                return Response({"error": f"El parámetro '{parametro}' debe ser una lista de IDs numéricos separados por comas."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"error": "offset debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+        offset = min(offset, self.max_offset)
+        page_size = leer_page_size(request)
+
+        resultados = buscar(q, estados=filtros['id_estado'], profesiones=filtros['profesiones'],
+                            limite=page_size, desde=offset)
+        trabajos = TrabajoSerializer.setup_eager_loading(Trabajo.objects.all(), request).in_bulk([pk for pk, _ in resultados])
+        data = []
+        for pk, puntaje in resultados:
+            if pk in trabajos:
+                item = TrabajoSerializer(trabajos[pk], context={'request': request}).data
+                item['puntaje'] = round(puntaje, 4)
+                data.append(item)
+
+        siguiente = None
+        if len(resultados) == page_size and offset + page_size <= self.max_offset:
+            siguiente = replace_query_param(request.build_absolute_uri(), 'offset', offset + page_size)
+        return Response({'next': siguiente, 'results': data})
+
+
+class TarjetaTrabajoView(APIView):
+    # /api/trabajos/tarjetas/: los trabajos como TarjetaTrabajo, leídos solo
+    # de esa tabla. Filtros: id_contratador, uid_firebase, id_trabajador,
+    # id_estado y profesiones (IDs separados por comas)
+    def get(self, request):
+        items = TarjetaTrabajo.objects.all()
+
+        for parametro, filtro in (('id_estado', 'id_estado__in'), ('profesiones', 'id_profesion_requerida__in')):
+            valor = request.query_params.get(parametro, '')
+            try:
+                ids = [int(v) for v in valor.split(',') if v.strip()]
+            except ValueError:
+                return Response({"error": f"El parámetro '{parametro}' debe ser una lista de IDs numéricos separados por comas."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if ids:
+                items = items.filter(**{filtro: ids})
+
+        for parametro in ('id_contratador', 'id_trabajador'):
+            valor = request.query_params.get(parametro)
+            if valor:
+                try:
+                    items = items.filter(**{parametro: int(valor)})
+                except ValueError:
+                    return Response({"error": f"{parametro} debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        uid_firebase = request.query_params.get('uid_firebase')
+        if uid_firebase:
+            contratador = Contratador.objects.filter(uid_firebase=uid_firebase).values_list('pk', flat=True).first()
+            items = items.filter(id_contratador=contratador) if contratador else items.none()
+
+        return lista_paginada(request, items, TarjetaTrabajoSerializer, ('-fecha_creacion', '-id_trabajo'), rapido=True)
+
+
+def postulaciones_creadas(postulaciones):
+    # Altas en bloque: bulk_create no manda post_save (ver tarjetas.py)
+    sumar_postulaciones(postulaciones)
+    publicar_postulaciones(postulaciones)
+
+
 class PostulacionView(APIView):
     def get(self, request, id=None):
         if id:
-            item = get_object_or_404(Postulacion, pk=id)
-            serializer = PostulacionSerializer(item)
+            item = get_object_or_404(PostulacionSerializer.setup_eager_loading(Postulacion.objects.all(), request), pk=id)
+            serializer = PostulacionSerializer(item, context={'request': request})
             return Response(serializer.data)
 
-        items = Postulacion.objects.select_related(
-            'id_trabajo', 'id_trabajador', 'id_trabajo__id_contratador', 'id_trabajador__id_contratador'
-        ).all().order_by('-fecha_postulacion')
+        items = PostulacionSerializer.setup_eager_loading(Postulacion.objects.all(), request)
             
         # Filtro postulaciones por id_trabajo
         id_trabajo = request.query_params.get('id_trabajo')
@@ -486,17 +678,26 @@ class PostulacionView(APIView):
              except ValueError:
                  return Response({"error": "id_trabajador debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = PostulacionSerializer(items, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, items, PostulacionSerializer, ('-fecha_postulacion', '-id_postulacion'), rapido=True)
 
     def post(self, request):
+        if isinstance(request.data, list):
+            return crear_en_bloque(request, PostulacionSerializer, despues=postulaciones_creadas)
         serializer = PostulacionSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                serializer.save()
+                with transaction.atomic():
+                    serializer.save()
+                    publicar_postulaciones([serializer.instance])
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             except IntegrityError as e:
-                 return Response({"db_error": f"Error de integridad: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+                # Sin consulta previa: la restricción postulacion_unica decide
+                # también entre dos postulaciones iguales al mismo tiempo
+                datos = serializer.validated_data
+                if Postulacion.objects.filter(id_trabajo=datos['id_trabajo'], id_trabajador=datos['id_trabajador']).exists():
+                    return Response({"non_field_errors": [PostulacionSerializer.mensaje_repetido]},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                return Response({"db_error": f"Error de integridad: {e}"}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def patch(self, request, id):
@@ -511,16 +712,31 @@ class PostulacionView(APIView):
              return Response({"error": f"Ocurrió un error inesperado: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class PostulacionTarjetaView(APIView):
+    # /api/postulaciones/tarjetas/?id_trabajador=: las postulaciones con la
+    # tarjeta de su trabajo, que se lee aparte por PK solo para la página
+    def get(self, request):
+        items = Postulacion.objects.all()
+        for parametro in ('id_trabajo', 'id_trabajador'):
+            valor = request.query_params.get(parametro)
+            if valor:
+                try:
+                    items = items.filter(**{parametro: int(valor)})
+                except ValueError:
+                    return Response({"error": f"{parametro} debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return lista_paginada(request, items, PostulacionTarjetaSerializer, ('-fecha_postulacion', '-id_postulacion'),
+                              rapido=True, por_pk={'id_trabajo': TarjetaTrabajo})
+
+
 class CalificacionTrabajadorView(APIView):
     def get(self, request, id=None):
         if id:
-            item = get_object_or_404(CalificacionTrabajador, pk=id)
-            serializer = CalificacionTrabajadorSerializer(item)
+            item = get_object_or_404(CalificacionTrabajadorSerializer.setup_eager_loading(CalificacionTrabajador.objects.all(), request), pk=id)
+            serializer = CalificacionTrabajadorSerializer(item, context={'request': request})
             return Response(serializer.data)
 
-        items = CalificacionTrabajador.objects.select_related(
-            'id_contratador', 'id_trabajador', 'id_trabajo'
-        ).all().order_by('-fecha_calificacion')
+        items = CalificacionTrabajadorSerializer.setup_eager_loading(CalificacionTrabajador.objects.all(), request)
 
         id_trabajador = request.query_params.get('id_trabajador')
         if id_trabajador:
@@ -529,8 +745,7 @@ class CalificacionTrabajadorView(APIView):
             except ValueError:
                  return Response({"error": "id_trabajador debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = CalificacionTrabajadorSerializer(items, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, items, CalificacionTrabajadorSerializer, ('-fecha_calificacion', '-id_calificacion_trabajador'))
 
     def post(self, request):
         serializer = CalificacionTrabajadorSerializer(data=request.data)
@@ -552,13 +767,11 @@ class CalificacionTrabajadorView(APIView):
 class CalificacionContratadorView(APIView):
     def get(self, request, id=None):
         if id:
-            item = get_object_or_404(CalificacionContratador, pk=id)
-            serializer = CalificacionContratadorSerializer(item)
+            item = get_object_or_404(CalificacionContratadorSerializer.setup_eager_loading(CalificacionContratador.objects.all(), request), pk=id)
+            serializer = CalificacionContratadorSerializer(item, context={'request': request})
             return Response(serializer.data)
 
-        items = CalificacionContratador.objects.select_related(
-             'id_contratador', 'id_trabajador', 'id_trabajo'
-        ).all().order_by('-fecha_calificacion')
+        items = CalificacionContratadorSerializer.setup_eager_loading(CalificacionContratador.objects.all(), request)
 
         id_contratador = request.query_params.get('id_contratador')
         if id_contratador:
@@ -567,8 +780,7 @@ class CalificacionContratadorView(APIView):
              except ValueError:
                  return Response({"error": "id_contratador debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = CalificacionContratadorSerializer(items, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, items, CalificacionContratadorSerializer, ('-fecha_calificacion', '-id_calificacion_contratador'))
 
     def post(self, request):
         serializer = CalificacionContratadorSerializer(data=request.data)
@@ -590,11 +802,11 @@ class CalificacionContratadorView(APIView):
 class TrabajadoresProfesionView(APIView):
     def get(self, request, id=None):
         if id:
-            item = get_object_or_404(TrabajadoresProfesion.objects.select_related('id_trabajador', 'id_profesion'), pk=id)
-            serializer = TrabajadoresProfesionSerializer(item)
+            item = get_object_or_404(TrabajadoresProfesionSerializer.setup_eager_loading(TrabajadoresProfesion.objects.all(), request), pk=id)
+            serializer = TrabajadoresProfesionSerializer(item, context={'request': request})
             return Response(serializer.data)
 
-        items = TrabajadoresProfesion.objects.select_related('id_trabajador', 'id_profesion').all()
+        items = TrabajadoresProfesionSerializer.setup_eager_loading(TrabajadoresProfesion.objects.all(), request)
 
         id_trabajador = request.query_params.get('id_trabajador')
         if id_trabajador:
@@ -610,12 +822,12 @@ class TrabajadoresProfesionView(APIView):
             except ValueError:
                 return Response({"error": "id_profesion debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
 
-        items = items.order_by('id_profesion__nombre_profesion')
-
-        serializer = TrabajadoresProfesionSerializer(items, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, items, TrabajadoresProfesionSerializer,
+                              ('id_profesion__nombre_profesion', 'id_trabajador_profesion'))
 
     def post(self, request):
+        if isinstance(request.data, list):
+            return crear_en_bloque(request, TrabajadoresProfesionSerializer)
         serializer = TrabajadoresProfesionSerializer(data=request.data)
         if serializer.is_valid():
             try:
@@ -651,47 +863,69 @@ class TrabajadoresProfesionView(APIView):
 
 
 
-class CalificacionesView(APIView):
-    def get(self, request):
-        calif_trabajadores = CalificacionTrabajador.objects.select_related(
-             'id_contratador', 'id_trabajador', 'id_trabajo'
-        ).all().order_by('-fecha_calificacion')[:20]
-        serializer_trab = CalificacionTrabajadorSerializer(calif_trabajadores, many=True)
+class CalificacionesView(APIViewAsync):
+    async def get(self, request):
+        # Las dos listas son independientes: cada una en su thread y con su conexion
+        def ultimas(modelo, serializer_class):
+            items = serializer_class.setup_eager_loading(modelo.objects.all(), request).order_by('-fecha_calificacion')[:20]
+            return serializer_class(items, many=True, context={'request': request}).data
 
-        calif_contratadores = CalificacionContratador.objects.select_related(
-             'id_contratador', 'id_trabajador', 'id_trabajo'
-        ).all().order_by('-fecha_calificacion')[:20]
-        serializer_contr = CalificacionContratadorSerializer(calif_contratadores, many=True)
+        calif_trabajadores, calif_contratadores = await en_paralelo(
+            partial(ultimas, CalificacionTrabajador, CalificacionTrabajadorSerializer),
+            partial(ultimas, CalificacionContratador, CalificacionContratadorSerializer),
+        )
 
         datos_combinados = {
-            'calificaciones_a_trabajadores': serializer_trab.data,
-            'calificaciones_a_contratadores': serializer_contr.data
+            'calificaciones_a_trabajadores': calif_trabajadores,
+            'calificaciones_a_contratadores': calif_contratadores
         }
 
         return Response(datos_combinados, status=status.HTTP_200_OK)
 
 
+class ReputacionTrabajadorView(APIView):
+    def get(self, request, id):
+        item = ReputacionTrabajador.objects.filter(pk=id).first()
+        if item is None:
+            # Sin calificaciones todavia: agregado en cero si el trabajador existe
+            item = ReputacionTrabajador(id_trabajador=get_object_or_404(Trabajador, pk=id))
+        serializer = ReputacionTrabajadorSerializer(item, context={'request': request})
+        return Response(serializer.data)
+
 
+class ReputacionContratadorView(APIView):
+    def get(self, request, id):
+        item = ReputacionContratador.objects.filter(pk=id).first()
+        if item is None:
+            item = ReputacionContratador(id_contratador=get_object_or_404(Contratador, pk=id))
+        serializer = ReputacionContratadorSerializer(item, context={'request': request})
+        return Response(serializer.data)
 
-class FirebaseLoginView(APIView):
-    def post(self, request):
+
+
+
+class FirebaseLoginView(APIViewAsync):
+    async def post(self, request):
         token = request.data.get('token')
         if not token:
             return Response({"error": "Falta el token ID de Firebase."}, status=status.HTTP_400_BAD_REQUEST)
 
+        def perfil(uid):
+            contratador = ContratadorSerializer.setup_eager_loading(Contratador.objects.filter(uid_firebase=uid), request).first()
+            return ContratadorSerializer(contratador, context={'request': request}).data if contratador else None
+
         try:
-            decoded_token = firebase_auth.verify_id_token(token)
+            # Puede tener que descargar las claves de Google: fuera del event loop
+            decoded_token = await en_thread(verificar_id_token, token)
             uid = decoded_token.get('uid')
             email_firebase = decoded_token.get('email')
 
             if not uid:
                  raise ValueError("Token inválido o no contiene UID.")
 
-            contratador = Contratador.objects.filter(uid_firebase=uid).first()
+            data = await en_thread(perfil, uid)
 
-            if contratador:
-                serializer = ContratadorSerializer(contratador)
-                data = serializer.data
+            if data is not None:
                 data['registrado'] = True
                 return Response(data, status=status.HTTP_200_OK)
             else:
@@ -704,8 +938,8 @@ class FirebaseLoginView(APIView):
 
         except ValueError as e:
              return Response({"error": f"Error verificando token: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-        except Exception as e:
-            print(f"Error inesperado en FirebaseLoginView: {e}")
+        except Exception:
+            logger.exception("Error inesperado en FirebaseLoginView")
             return Response({"error": "Ocurrió un error en el servidor durante la autenticación."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -733,17 +967,17 @@ class FirebaseRegisterView(APIView):
 
         try:
 
-            zona, created = ZonaGeografica.objects.get_or_create(
+            zona, created = ZonaGeografica.objects.obtener_o_crear(
                 calle=zona_data['calle'],
                 ciudad=zona_data['ciudad'],
                 provincia=zona_data['provincia'],
             )
             zona_id = zona.id_zona_geografica
-        except IntegrityError as e:
-             print(f"Error en get_or_create ZonaGeografica: {e}")
+        except IntegrityError:
+             logger.exception("Error en obtener_o_crear ZonaGeografica")
              return Response({"error": "No se pudo crear o encontrar la zona geográfica."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except Exception as e:
-             print(f"Error inesperado con ZonaGeografica: {e}")
+        except Exception:
+             logger.exception("Error inesperado con ZonaGeografica")
              return Response({"error": "Error procesando la dirección."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         contratador_data = {
@@ -762,12 +996,51 @@ class FirebaseRegisterView(APIView):
                 contratador = contratador_serializer.save()
                 return Response({
                     "mensaje": "Usuario registrado y perfil creado con éxito.",
-                    "contratador": ContratadorSerializer(contratador).data,
+                    "contratador": ContratadorSerializer(contratador, context={'request': request}).data,
                 }, status=status.HTTP_201_CREATED)
-            except IntegrityError as e:
-                 print(f"IntegrityError al guardar Contratador: {e}")
+            except IntegrityError:
+                 logger.exception("IntegrityError al guardar Contratador")
                  return Response({"error": "Error al guardar el perfil, posible duplicado inesperado."}, status=status.HTTP_400_BAD_REQUEST)
         else:
 
             return Response(contratador_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class MetricasView(APIView):
+    # Latencias por ruta de este proceso (ver instrumentacion.py). Solo para
+    # usuarios staff (sesion del admin o Basic).
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        minutos = request.query_params.get('minutos')
+        try:
+            minutos = int(minutos) if minutos else None
+        except ValueError:
+            return Response({"error": "minutos debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'pid': os.getpid(), **histogramas.resumen(minutos), 'pool_conexiones': pool_conexiones.estadisticas(),
+                         'replicas': replicas.demoras.estadisticas()})
+
+
+class SyncView(APIViewAsync):
+    # Cambios del usuario autenticado desde el token `since` (ver
+    # sincronizacion.py). Sin `since` devuelve todo lo suyo.
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        uid = getattr(request.user, 'uid', None)
+        contratador = await en_thread(lambda: Contratador.objects.filter(uid_firebase=uid).first()) if uid else None
+        if contratador is None:
+            return Response({"error": "El usuario no tiene perfil de contratador."}, status=status.HTTP_404_NOT_FOUND)
+
+        desde = None
+        since = request.query_params.get('since')
+        if since:
+            try:
+                desde = leer_token(since)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            retencion = timedelta(days=getattr(settings, 'REPAR_SYNC_RETENCION_DIAS', 30))
+            if desde < timezone.now() - retencion:
+                return Response({"error": "El token es más viejo que las eliminaciones guardadas: hay que sincronizar sin since."},
+                                status=status.HTTP_410_GONE)
+        return Response(await sincronizar(contratador, desde))